@@ -175,4 +175,7 @@ CORS_ALLOW_HEADERS = list(default_headers) + [
 
 NEO4JURI = os.environ.get('NEO4jURI')
 NEO4JUSER = os.environ.get('NEO4jUSER')
-NEO4JPASSWORD = os.environ.get('NEO4jPASSWORD')
\ No newline at end of file
+NEO4JPASSWORD = os.environ.get('NEO4jPASSWORD')
+
+# Addresses allowed to scrape the Prometheus /metrics/ endpoint
+METRICS_ALLOWED_IPS = os.environ.get('METRICS_ALLOWED_IPS', '127.0.0.1,::1').split(',')
@@ -0,0 +1,65 @@
+from django.core.management.base import BaseCommand
+
+from upload_and_get_resume.utils.vectorise_v1 import (
+    Neo4jResumeProcessor,
+    NEO4J_URI,
+    NEO4J_USER,
+    NEO4J_PASSWORD,
+    normalize_email,
+    normalize_phone,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Set normalizedEmail/normalizedPhone on candidates written before upsert on "
+        "re-upload existed, so their next resume updates them instead of creating a duplicate."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Candidates updated per transaction"
+        )
+
+    def handle(self, *args, **options):
+        processor = Neo4jResumeProcessor(uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD)
+        try:
+            processor.create_indexes()
+            total = 0
+            with processor.driver.session() as session:
+                while True:
+                    candidates = list(session.run(
+                        """
+                        MATCH (c:Candidate)
+                        WHERE c.normalizedEmail IS NULL AND c.normalizedPhone IS NULL
+                          AND NOT coalesce(c.keysBackfilled, false)
+                        RETURN c.candidateId as candidate_id, c.email as email, c.phoneNumber as phone
+                        LIMIT $batch_size
+                        """,
+                        {"batch_size": options["batch_size"]},
+                    ))
+                    if not candidates:
+                        break
+                    rows = [
+                        {
+                            "candidate_id": record["candidate_id"],
+                            "email": normalize_email(record["email"]),
+                            "phone": normalize_phone(record["phone"]),
+                        }
+                        for record in candidates
+                    ]
+                    # keysBackfilled marks candidates without any usable email or phone as done
+                    session.execute_write(lambda tx: tx.run(
+                        """
+                        UNWIND $rows AS row
+                        MATCH (c:Candidate {candidateId: row.candidate_id})
+                        SET c.normalizedEmail = row.email,
+                            c.normalizedPhone = row.phone,
+                            c.keysBackfilled = true
+                        """,
+                        {"rows": rows},
+                    ).consume())
+                    total += len(rows)
+                    self.stdout.write(f"Backfilled {total} candidates")
+        finally:
+            processor.close()
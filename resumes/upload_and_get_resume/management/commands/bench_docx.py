@@ -0,0 +1,143 @@
+import glob
+import io
+import multiprocessing
+import os
+import random
+import resource
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from docx import Document
+from docx.opc.constants import RELATIONSHIP_TYPE
+from docx.oxml import OxmlElement
+from docx.oxml.ns import qn
+
+from upload_and_get_resume.utils.docx_stream import extract_docx
+
+
+# Python-Docx Extract
+def python_docx_extract(source):
+    """Previous approach: the python-docx object model, body paragraphs and every hyperlink relationship"""
+    doc = Document(source if isinstance(source, str) else io.BytesIO(source))
+    text_parts = [para.text for para in doc.paragraphs]
+    links = []
+    rels = doc.part.rels
+    for rel in rels:
+        if rels[rel].reltype == RELATIONSHIP_TYPE.HYPERLINK:
+            links.append(("Linked text (not reliably extracted)", rels[rel].target_ref))
+    return {"text": "\n".join(text_parts), "hyperlinks": links}
+
+
+EXTRACTORS = {"python-docx": python_docx_extract, "stream": extract_docx}
+
+
+# Add Hyperlink
+def add_hyperlink(paragraph, text, url):
+    """python-docx has no hyperlink API; append a w:hyperlink run bound to a new relationship"""
+    rel_id = paragraph.part.relate_to(url, RELATIONSHIP_TYPE.HYPERLINK, is_external=True)
+    hyperlink = OxmlElement("w:hyperlink")
+    hyperlink.set(qn("r:id"), rel_id)
+    run = OxmlElement("w:r")
+    text_elem = OxmlElement("w:t")
+    text_elem.text = text
+    run.append(text_elem)
+    hyperlink.append(run)
+    paragraph._p.append(hyperlink)
+
+
+# Synthetic DOCX
+def synthetic_docx(sections, seed=0):
+    """A resume-like DOCX: per section a heading, bullet paragraphs with links and a table, as bytes"""
+    rng = random.Random(seed)
+    words = ["python", "django", "neo4j", "project", "github", "led", "built", "team", "data", "pipeline"]
+    doc = Document()
+    for section in range(sections):
+        doc.add_heading(f"Section {section}", level=2)
+        for item in range(6):
+            paragraph = doc.add_paragraph(" ".join(rng.choice(words) for _ in range(16)) + " ")
+            if item % 2 == 0:
+                add_hyperlink(paragraph, f"project {section}.{item}", f"https://example.com/{section}/{item}")
+        table = doc.add_table(rows=4, cols=3)
+        for row in table.rows:
+            for cell in row.cells:
+                cell.text = " ".join(rng.choice(words) for _ in range(4))
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
+
+
+# Resident Memory
+def resident_memory():
+    """(current, peak) resident set of this process in KB, from /proc/self/status"""
+    with open("/proc/self/status") as f:
+        fields = dict(line.split(":", 1) for line in f)
+    return int(fields["VmRSS"].split()[0]), int(fields["VmHWM"].split()[0])
+
+
+# Measure Peak Memory
+def measure_peak_memory(name, data):
+    """Runs in a fresh process: growth of the peak resident set during one extraction, in KB"""
+    try:
+        # Reset the peak to the current resident set (Linux)
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        before, _ = resident_memory()
+        EXTRACTORS[name](data)
+        return resident_memory()[1] - before
+    except OSError:
+        before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        EXTRACTORS[name](data)
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark DOCX extraction: streaming word/document.xml through lxml iterparse "
+        "against the python-docx object model, for time and peak memory. Runs on given "
+        "DOCX files or on synthetic resumes of growing size."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*", help="DOCX files or directories of them")
+        parser.add_argument(
+            "--sections", default="2,10,50,200", help="Comma separated section counts for synthetic resumes"
+        )
+        parser.add_argument("--repeat", type=int, default=5, help="Passes per timing")
+
+    def handle(self, *args, **options):
+        if options["paths"]:
+            documents = []
+            for path in options["paths"]:
+                files = sorted(glob.glob(os.path.join(path, "**", "*.docx"), recursive=True)) if os.path.isdir(path) else [path]
+                for file_path in files:
+                    with open(file_path, "rb") as f:
+                        documents.append((os.path.basename(file_path), f.read()))
+            if not documents:
+                raise CommandError("No DOCX files found")
+        else:
+            documents = [
+                (f"{count} sections", synthetic_docx(count))
+                for count in (int(value) for value in options["sections"].split(","))
+            ]
+
+        context = multiprocessing.get_context("spawn")
+        for label, data in documents:
+            timings = {}
+            peaks = {}
+            results = {}
+            for name, extract in EXTRACTORS.items():
+                start = time.perf_counter()
+                for _ in range(options["repeat"]):
+                    results[name] = extract(data)
+                timings[name] = (time.perf_counter() - start) / options["repeat"]
+                # A fresh process per measurement, so earlier runs do not mask the peak
+                with context.Pool(1) as pool:
+                    peaks[name] = pool.apply(measure_peak_memory, (name, data))
+            self.stdout.write(
+                f"{label} ({len(data) / 1024:.0f} KB): "
+                f"python-docx {timings['python-docx'] * 1000:.2f} ms / +{peaks['python-docx'] / 1024:.1f} MB, "
+                f"stream {timings['stream'] * 1000:.2f} ms / +{peaks['stream'] / 1024:.1f} MB, "
+                f"{timings['python-docx'] / timings['stream']:.1f}x; "
+                f"text {len(results['python-docx']['text'])} -> {len(results['stream']['text'])} chars, "
+                f"links with anchor text {len(results['stream']['hyperlinks'])}"
+            )
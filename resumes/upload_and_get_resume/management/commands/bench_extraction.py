@@ -0,0 +1,93 @@
+import asyncio
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from upload_and_get_resume.management.commands.import_resumes import find_resume_files
+from upload_and_get_resume.processes.extract_keys import analyse_resume
+from upload_and_get_resume.utils.extract_text_link import extract_text_and_links
+from upload_and_get_resume.utils.resume_parser import parse_resume_response
+
+
+# Populated Fields
+def populated_fields(parsed):
+    """Number of values the graph writer gets out of a parsed report"""
+    data = parsed.to_graph_data()
+    return len(data["personal_info"]) + sum(
+        len(data[key])
+        for key in ("education", "skills", "languages", "achievements", "projects", "suitable_roles", "links")
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the LLM extraction modes on the same resumes: the header-formatted text "
+        "report versus JSON-schema structured output. Reports latency, prompt and output "
+        "tokens, and how many fields reach the graph writer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", help="Directory of .pdf/.docx resumes")
+        parser.add_argument("--modes", default="text,json", help="Comma separated modes to compare")
+        parser.add_argument("--limit", type=int, default=10, help="Resumes to run through each mode")
+
+    def handle(self, *args, **options):
+        modes = [mode.strip() for mode in options["modes"].split(",")]
+        for mode in modes:
+            if mode not in ("text", "json"):
+                raise CommandError(f"Unknown mode: {mode}")
+
+        resumes = []
+        for path in islice(find_resume_files(options["directory"]), options["limit"]):
+            result = extract_text_and_links(path)
+            if not isinstance(result, dict) and result[0].strip():
+                resumes.append(result)
+        if not resumes:
+            raise CommandError("No resumes with extractable text found")
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            for mode in modes:
+                self.report(mode, loop.run_until_complete(self.run_mode(mode, resumes)))
+        finally:
+            loop.close()
+
+    # Run Mode (Async)
+    async def run_mode(self, mode, resumes):
+        """One extraction per resume, in sequence so latencies do not interfere"""
+        results = []
+        for details, links in resumes:
+            trace = {}
+            start = time.perf_counter()
+            response = await analyse_resume(details=details, links=links, trace=trace, mode=mode)
+            elapsed = time.perf_counter() - start
+            if not response:
+                results.append(None)
+                continue
+            tokens = trace.get("llm_tokens", {})
+            results.append({
+                "seconds": elapsed,
+                "prompt": tokens.get("prompt", 0),
+                "completion": tokens.get("completion", 0),
+                "fields": populated_fields(parse_resume_response(response)),
+            })
+        return results
+
+    def report(self, mode, results):
+        ok = [result for result in results if result]
+        if not ok:
+            self.stdout.write(f"{mode:>5}: all {len(results)} extractions failed")
+            return
+
+        def mean(key):
+            return sum(result[key] for result in ok) / len(ok)
+
+        latencies = sorted(result["seconds"] for result in ok)
+        self.stdout.write(
+            f"{mode:>5}: {len(ok)}/{len(results)} ok, "
+            f"latency mean {mean('seconds'):.2f}s p95 {latencies[int(0.95 * (len(latencies) - 1))]:.2f}s, "
+            f"tokens prompt {mean('prompt'):.0f} output {mean('completion'):.0f}, "
+            f"fields {mean('fields'):.1f}"
+        )
@@ -0,0 +1,117 @@
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from upload_and_get_resume.utils.vectorise_v1 import (
+    Neo4jResumeProcessor,
+    NEO4J_URI,
+    NEO4J_USER,
+    NEO4J_PASSWORD,
+    INGEST_WRITE_RETRIES,
+)
+
+# Benchmark candidates are tagged through their resume path so they can be removed afterwards
+BENCH_PREFIX = "bench://ingest/"
+
+
+# Load Responses
+def load_responses(path):
+    """Load LLM evaluation responses from a .txt file or a directory of them"""
+    if os.path.isdir(path):
+        files = sorted(
+            os.path.join(path, name) for name in os.listdir(path) if name.endswith(".txt")
+        )
+    else:
+        files = [path]
+    responses = []
+    for file_path in files:
+        with open(file_path, encoding="utf-8") as f:
+            responses.append(f.read())
+    return responses
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark Neo4j ingest throughput of the graph writer: one managed write "
+        "transaction per resume versus one auto-commit transaction per statement, "
+        "at increasing numbers of parallel ingests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("responses", help="LLM response .txt file or directory of them")
+        parser.add_argument("--count", type=int, default=50, help="Resumes to write per mode")
+        parser.add_argument(
+            "--modes",
+            default="autocommit,transaction",
+            help="Comma separated write modes to compare (autocommit, transaction)",
+        )
+        parser.add_argument(
+            "--concurrency",
+            default="1",
+            help="Comma separated numbers of parallel ingests, e.g. 1,2,4,8,16",
+        )
+        parser.add_argument(
+            "--keep", action="store_true", help="Keep the benchmark candidates in the graph"
+        )
+
+    def handle(self, *args, **options):
+        responses = load_responses(options["responses"])
+        if not responses:
+            raise CommandError("No .txt responses found")
+
+        processor = Neo4jResumeProcessor(uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD)
+        try:
+            processor.create_indexes()
+            parsed = [processor.parse_resume_data(response) for response in responses]
+            # A fixed embedding keeps model inference out of the measured write path
+            embedding = processor.model.encode("benchmark", normalize_embeddings=True).tolist()
+
+            count = options["count"]
+            levels = [int(level) for level in options["concurrency"].split(",")]
+            for mode in options["modes"].split(","):
+                mode = mode.strip()
+                if mode not in ("autocommit", "transaction"):
+                    raise CommandError(f"Unknown mode: {mode}")
+
+                baseline = None
+                for workers in levels:
+                    def ingest(i, mode=mode, workers=workers):
+                        processor.write_candidate(
+                            str(uuid.uuid4()),
+                            parsed[i % len(parsed)],
+                            embedding,
+                            f"{BENCH_PREFIX}{mode}/{workers}/{i}",
+                            None,
+                            0,
+                            autocommit=(mode == "autocommit"),
+                        )
+
+                    retries_before = INGEST_WRITE_RETRIES.total()
+                    start = time.perf_counter()
+                    with ThreadPoolExecutor(max_workers=workers) as pool:
+                        # list() re-raises the first failed ingest
+                        list(pool.map(ingest, range(count)))
+                    elapsed = time.perf_counter() - start
+
+                    throughput = count / elapsed
+                    baseline = baseline or throughput
+                    self.stdout.write(
+                        f"{mode:>12} x{workers:<3}: {count} resumes in {elapsed:.2f}s "
+                        f"-> {throughput:.1f} resumes/s ({throughput / baseline:.2f}x), "
+                        f"{INGEST_WRITE_RETRIES.total() - retries_before} retries"
+                    )
+        finally:
+            if not options["keep"]:
+                with processor.driver.session() as session:
+                    session.run(
+                        """
+                        MATCH (c:Candidate) WHERE c.resumePath STARTS WITH $prefix
+                        OPTIONAL MATCH (c)-[:ACHIEVED|WORKED_ON]->(owned)
+                        DETACH DELETE c, owned
+                        """,
+                        {"prefix": BENCH_PREFIX},
+                    )
+            processor.close()
@@ -0,0 +1,61 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand
+
+from upload_and_get_resume.management.commands.bench_pdf_links import synthetic_resume
+from upload_and_get_resume.utils.extract_text_link import (
+    extract_page_range,
+    extract_pages_parallel,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark sequential against page-parallel PDF extraction (text and links) "
+        "on synthetic resumes of growing page count, to pick PARALLEL_PAGE_THRESHOLD."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--pages", default="2,4,8,16,24,32,48", help="Comma separated page counts to measure"
+        )
+        parser.add_argument(
+            "--workers", type=int, default=multiprocessing.cpu_count(), help="Page pool size"
+        )
+        parser.add_argument("--links-per-page", type=int, default=10, help="Links per synthetic page")
+        parser.add_argument("--repeat", type=int, default=3, help="Passes per measurement")
+
+    def handle(self, *args, **options):
+        workers = options["workers"]
+        self.stdout.write(f"{workers} workers, {multiprocessing.cpu_count()} CPUs")
+        crossover = None
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            # Start every worker before measuring; the pool lives for the whole process in use
+            list(pool.map(extract_page_range, [synthetic_resume(1, 0)] * workers, [0] * workers, [1] * workers))
+
+            for page_count in (int(value) for value in options["pages"].split(",")):
+                data = synthetic_resume(page_count, options["links_per_page"])
+                timings = {}
+                for name, extract in (
+                    ("sequential", lambda: extract_page_range(data, 0, page_count)),
+                    ("parallel", lambda: extract_pages_parallel(data, page_count, pool=pool, workers=workers)),
+                ):
+                    start = time.perf_counter()
+                    for _ in range(options["repeat"]):
+                        extract()
+                    timings[name] = (time.perf_counter() - start) / options["repeat"]
+                speedup = timings["sequential"] / timings["parallel"]
+                if crossover is None and speedup > 1:
+                    crossover = page_count
+                self.stdout.write(
+                    f"{page_count:>4} pages: sequential {timings['sequential'] * 1000:8.1f} ms, "
+                    f"parallel {timings['parallel'] * 1000:8.1f} ms, {speedup:.2f}x"
+                )
+        if crossover is None:
+            self.stdout.write("Parallel extraction never won; keep PAGE_WORKERS=1 on this host")
+        else:
+            self.stdout.write(f"Parallel extraction wins from {crossover} pages")
@@ -0,0 +1,52 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from upload_and_get_resume.management.commands.bench_ingest import load_responses
+from upload_and_get_resume.utils.resume_parser import parse_resume_response
+
+
+# Parse Once
+def parse_once(response):
+    """What ingest does: one parse feeding both the JSON export and the graph writer"""
+    parsed = parse_resume_response(response)
+    return parsed.to_json(), parsed.to_graph_data()
+
+
+# Parse Per Consumer
+def parse_per_consumer(response):
+    """The JSON export and the graph writer each parsing the response themselves"""
+    return parse_resume_response(response).to_json(), parse_resume_response(response).to_graph_data()
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark LLM response parsing over a corpus of saved responses: one shared "
+        "parse for the JSON export and the graph writer versus a parse per consumer."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("responses", help="LLM response .txt file or directory of them")
+        parser.add_argument(
+            "--repeat", type=int, default=20, help="Passes over the corpus per measurement"
+        )
+
+    def handle(self, *args, **options):
+        responses = load_responses(options["responses"])
+        if not responses:
+            raise CommandError("No .txt responses found")
+        total = len(responses) * options["repeat"]
+        self.stdout.write(f"{len(responses)} responses, {options['repeat']} passes")
+
+        baseline = None
+        for label, parse in (("per consumer", parse_per_consumer), ("shared", parse_once)):
+            start = time.perf_counter()
+            for _ in range(options["repeat"]):
+                for response in responses:
+                    parse(response)
+            elapsed = time.perf_counter() - start
+            baseline = baseline or elapsed
+            self.stdout.write(
+                f"{label:>12}: {elapsed / total * 1e6:8.1f} us/resume, "
+                f"{total / elapsed:8.0f} resumes/s, {baseline / elapsed:.2f}x"
+            )
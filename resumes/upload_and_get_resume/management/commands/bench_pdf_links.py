@@ -0,0 +1,102 @@
+import glob
+import os
+import random
+import time
+
+import fitz
+from django.core.management.base import BaseCommand, CommandError
+
+from upload_and_get_resume.utils.link_index import extract_page_links
+
+
+# Scan Page Links
+def scan_page_links(page):
+    """Previous approach: word boxes of every page, every word tested against every link"""
+    links = []
+    words = page.get_text("words")
+    for link in page.get_links():
+        if "uri" in link:
+            rect = link["from"]
+            linked_words = [word[4] for word in words if fitz.Rect(word[:4]).intersects(rect)]
+            link_text = " ".join(linked_words).strip()
+            if link_text:
+                links.append((link_text, link["uri"]))
+    return links
+
+
+# Synthetic Resume
+def synthetic_resume(pages, links_per_page, seed=0):
+    """A dense multi-page PDF with links over random words, as PDF bytes"""
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for page_number in range(pages):
+        page = doc.new_page()
+        y = 50
+        while y < page.rect.height - 50:
+            words = " ".join(
+                rng.choice(["python", "django", "neo4j", "project", "github", "led", "built", "team"])
+                for _ in range(12)
+            )
+            page.insert_text((40, y), words, fontsize=9)
+            y += 12
+        words = page.get_text("words")
+        for word in rng.sample(words, min(links_per_page, len(words))):
+            page.insert_link({
+                "kind": fitz.LINK_URI,
+                "from": fitz.Rect(word[:4]),
+                "uri": f"https://example.com/{page_number}/{word[4]}",
+            })
+    data = doc.tobytes()
+    doc.close()
+    return data
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark hyperlink anchor text extraction from PDFs: the grid index over word "
+        "boxes against testing every word for every link. Runs on given PDFs or on "
+        "synthetic link-heavy resumes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="*", help="PDF files or directories of them")
+        parser.add_argument("--pages", type=int, default=4, help="Pages per synthetic resume")
+        parser.add_argument(
+            "--links-per-page", default="0,5,20,80", help="Comma separated link counts for synthetic resumes"
+        )
+        parser.add_argument("--repeat", type=int, default=5, help="Passes per measurement")
+
+    def handle(self, *args, **options):
+        if options["paths"]:
+            documents = []
+            for path in options["paths"]:
+                files = sorted(glob.glob(os.path.join(path, "**", "*.pdf"), recursive=True)) if os.path.isdir(path) else [path]
+                for file_path in files:
+                    with open(file_path, "rb") as f:
+                        documents.append((os.path.basename(file_path), f.read()))
+            if not documents:
+                raise CommandError("No PDFs found")
+        else:
+            documents = [
+                (f"{options['pages']} pages x {count} links", synthetic_resume(options["pages"], count))
+                for count in (int(value) for value in options["links_per_page"].split(","))
+            ]
+
+        for label, data in documents:
+            doc = fitz.open(stream=data, filetype="pdf")
+            try:
+                timings = {}
+                results = {}
+                for name, extract in (("scan", scan_page_links), ("grid", extract_page_links)):
+                    start = time.perf_counter()
+                    for _ in range(options["repeat"]):
+                        results[name] = [link for page in doc for link in extract(page)]
+                    timings[name] = (time.perf_counter() - start) / options["repeat"]
+            finally:
+                doc.close()
+            if results["scan"] != results["grid"]:
+                raise CommandError(f"{label}: grid index disagrees with the full scan")
+            self.stdout.write(
+                f"{label}: {len(results['grid'])} links, scan {timings['scan'] * 1000:.2f} ms, "
+                f"grid {timings['grid'] * 1000:.2f} ms, {timings['scan'] / timings['grid']:.1f}x"
+            )
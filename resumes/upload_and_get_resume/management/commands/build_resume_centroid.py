@@ -0,0 +1,57 @@
+import os
+from itertools import islice
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from upload_and_get_resume.management.commands.import_resumes import find_resume_files
+from upload_and_get_resume.utils.embeddings import get_sentence_model
+from upload_and_get_resume.utils.extract_text_link import extract_text_and_links
+from upload_and_get_resume.utils.prevalidation import (
+    LIKENESS_SAMPLE_CHARS,
+    RESUME_CENTROID_PATH,
+    RESUME_LIKENESS_FLAG,
+    RESUME_LIKENESS_REJECT,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Build the resume centroid used by upload pre-validation from a directory of "
+        "known resumes, and print how the corpus scores against it so the "
+        "RESUME_LIKENESS_REJECT/RESUME_LIKENESS_FLAG thresholds can be checked."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", help="Directory searched recursively for .pdf/.docx resumes")
+        parser.add_argument("--output", default=RESUME_CENTROID_PATH, help="Where the centroid .npy is written")
+        parser.add_argument("--limit", type=int, help="Use at most this many resumes")
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(options["directory"]):
+            raise CommandError(f"Not a directory: {options['directory']}")
+        texts = []
+        for path in islice(find_resume_files(options["directory"]), options["limit"]):
+            result = extract_text_and_links(path)
+            if isinstance(result, dict) or not result[0].strip():
+                self.stdout.write(f"Skipping {path}: no text extracted")
+                continue
+            texts.append(result[0][:LIKENESS_SAMPLE_CHARS])
+        if not texts:
+            raise CommandError("No resumes with text found")
+
+        vectors = get_sentence_model().encode(texts, normalize_embeddings=True, batch_size=32)
+        centroid = vectors.mean(axis=0)
+        centroid /= np.linalg.norm(centroid)
+        if os.path.dirname(options["output"]):
+            os.makedirs(os.path.dirname(options["output"]), exist_ok=True)
+        np.save(options["output"], centroid)
+
+        scores = vectors @ centroid
+        self.stdout.write(
+            f"Centroid of {len(texts)} resumes written to {options['output']}. Likeness: "
+            f"min {scores.min():.3f}, p5 {np.percentile(scores, 5):.3f}, "
+            f"median {np.median(scores):.3f}; {int((scores < RESUME_LIKENESS_REJECT).sum())} below "
+            f"the reject threshold {RESUME_LIKENESS_REJECT}, {int((scores < RESUME_LIKENESS_FLAG).sum())} "
+            f"below the flag threshold {RESUME_LIKENESS_FLAG}"
+        )
@@ -0,0 +1,466 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from upload_and_get_resume.processes.extract_keys import (
+    connect_to_server,
+    analyse_resume,
+    cleanup,
+    sanitize_filename,
+)
+from upload_and_get_resume.utils.extract_text_link import extract_text_and_links
+from upload_and_get_resume.utils.import_ledger import ImportLedger
+from upload_and_get_resume.utils.near_duplicate import (
+    get_near_duplicate_index,
+    link_near_duplicate,
+    minhash_signature,
+)
+from upload_and_get_resume.utils.prevalidation import ResumeRejected, prevalidate_resume
+from upload_and_get_resume.utils.resume_parser import parse_resume_response
+from upload_and_get_resume.utils.resume_registry import (
+    ResumeRegistry,
+    file_sha256,
+    normalized_text_hash,
+)
+from upload_and_get_resume.utils.save_json import parse_response_to_json
+from upload_and_get_resume.utils.upload_dropbox import save_to_dropbox
+from upload_and_get_resume.utils.vectorise_v1 import (
+    INGEST_UPSERT,
+    Neo4jResumeProcessor,
+    NEO4J_URI,
+    NEO4J_USER,
+    NEO4J_PASSWORD,
+)
+
+RESUME_EXTENSIONS = (".pdf", ".docx")
+STAGES = ("extract", "analyse", "upload", "store")
+# Marks the end of the stream on a stage queue
+DONE = None
+
+
+# Find Resume Files
+def find_resume_files(directory):
+    """Yield resume files below a directory in a stable order"""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(RESUME_EXTENSIONS):
+                yield os.path.abspath(os.path.join(root, name))
+
+
+# Run Coroutine In Thread
+def run_coroutine(coroutine_function, *args):
+    """Run an async helper that blocks on I/O to completion on its own event loop"""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coroutine_function(*args))
+    finally:
+        loop.close()
+
+
+# Stage Stats Class
+class StageStats:
+    """Items, failures and busy time of each pipeline stage"""
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.done = defaultdict(int)
+        self.failed = defaultdict(int)
+        self.busy = defaultdict(float)
+        # Files already stored by an earlier upload or import, by file or text hash
+        self.known = 0
+        # Copies of a file or text seen earlier in this run
+        self.duplicates = 0
+
+    def report(self):
+        elapsed = time.perf_counter() - self.start
+        lines = [f"after {elapsed:.1f}s:"]
+        for stage in STAGES:
+            busy = self.busy[stage]
+            lines.append(
+                f"  {stage:>8}: {self.done[stage]} done, {self.failed[stage]} failed, "
+                f"{self.done[stage] / elapsed:.2f}/s overall, "
+                f"{(self.done[stage] / busy) if busy else 0:.2f}/s while busy"
+            )
+        if self.known:
+            lines.append(f"  {'known':>8}: {self.known} already stored, not analysed again")
+        if self.duplicates:
+            lines.append(f"  {'copies':>8}: {self.duplicates} duplicates in this run, skipped")
+        return "\n".join(lines)
+
+
+class Command(BaseCommand):
+    help = (
+        "Import a directory of resumes through the upload pipeline: text extraction in "
+        "a process pool, LLM analysis with capped concurrency, and Dropbox uploads and "
+        "Neo4j writes in batches. Progress is kept in a ledger so a rerun resumes "
+        "where the previous run stopped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("directory", help="Directory searched recursively for .pdf/.docx resumes")
+        parser.add_argument(
+            "--ledger", help="Progress ledger path (default: <directory>/.import_ledger.jsonl)"
+        )
+        parser.add_argument(
+            "--extract-workers", type=int, default=os.cpu_count() or 1,
+            help="Processes used for text extraction",
+        )
+        parser.add_argument(
+            "--llm-concurrency", type=int, default=4, help="LLM calls in flight at once"
+        )
+        parser.add_argument(
+            "--upload-batch", type=int, default=8, help="Dropbox uploads run together"
+        )
+        parser.add_argument(
+            "--write-batch", type=int, default=25, help="Candidates written per Neo4j transaction"
+        )
+        parser.add_argument(
+            "--progress-every", type=float, default=30, help="Seconds between throughput reports"
+        )
+        parser.add_argument(
+            "--retry-failed", action="store_true",
+            help="Also retry files whose previous attempt failed (they are skipped otherwise)",
+        )
+
+    def handle(self, *args, **options):
+        directory = options["directory"]
+        if not os.path.isdir(directory):
+            raise CommandError(f"Not a directory: {directory}")
+        ledger = ImportLedger(
+            options["ledger"] or os.path.join(directory, ".import_ledger.jsonl")
+        )
+
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            stats = loop.run_until_complete(self.import_directory(directory, ledger, options))
+        finally:
+            loop.close()
+        self.stdout.write(stats.report())
+
+    # Import Directory (Async)
+    async def import_directory(self, directory, ledger, options):
+        """Stream the directory's resumes through the bounded stage queues"""
+        stats = StageStats()
+        # Bounded queues keep at most a few batches of work between stages
+        extract_q = asyncio.Queue(maxsize=options["extract_workers"] * 2)
+        analyse_q = asyncio.Queue(maxsize=options["llm_concurrency"] * 2)
+        upload_q = asyncio.Queue(maxsize=options["upload_batch"] * 2)
+        store_q = asyncio.Queue(maxsize=options["write_batch"] * 2)
+
+        processor = Neo4jResumeProcessor(uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD)
+        processor.create_indexes()
+        registry = ResumeRegistry(driver=processor.driver)
+        claimed = claimed_hashes(ledger)
+        await connect_to_server()
+
+        async def produce():
+            skipped = 0
+            for path in find_resume_files(directory):
+                entry = ledger.entries.get(path, {})
+                if entry.get("status") == "skipped" or (
+                    entry.get("status") == "failed" and not options["retry_failed"]
+                ):
+                    skipped += 1
+                    continue
+                status = ledger.status(path)
+                if status == "stored":
+                    skipped += 1
+                elif status == "uploaded":
+                    await store_q.put(entry)
+                elif status == "analysed":
+                    await upload_q.put(entry)
+                else:
+                    await extract_q.put(path)
+            if skipped:
+                self.stdout.write(f"Skipping {skipped} files already handled by the ledger")
+            await extract_q.put(DONE)
+
+        async def report_progress():
+            while True:
+                await asyncio.sleep(options["progress_every"])
+                self.stdout.write(stats.report())
+
+        try:
+            # Spawned workers do not inherit the driver and MCP connection threads
+            with ProcessPoolExecutor(
+                max_workers=options["extract_workers"],
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as pool:
+                reporter = asyncio.create_task(report_progress())
+                await asyncio.gather(
+                    produce(),
+                    self.extract_stage(pool, registry, claimed, extract_q, analyse_q, ledger, stats, options),
+                    self.analyse_stage(analyse_q, upload_q, ledger, stats, options),
+                    self.upload_stage(upload_q, store_q, ledger, stats, options),
+                    self.store_stage(processor, registry, store_q, ledger, stats, options),
+                )
+                reporter.cancel()
+        finally:
+            await cleanup()
+            processor.close()
+        return stats
+
+    # Extract Stage (Async)
+    async def extract_stage(self, pool, registry, claimed, inbox, outbox, ledger, stats, options):
+        """
+        Extract text and links of each file in the process pool, skipping known resumes
+        and copies of a file or text already claimed earlier in this run
+        """
+        loop = asyncio.get_running_loop()
+
+        async def worker():
+            while True:
+                path = await inbox.get()
+                if path is DONE:
+                    # Let the sibling workers see the end of the stream too
+                    await inbox.put(DONE)
+                    return
+                start = time.perf_counter()
+                duplicate_of = known = None
+                try:
+                    # Known file bytes are not even extracted
+                    file_hash = await asyncio.to_thread(file_sha256, path)
+                    duplicate_of = claim_first_copy(claimed, path, ("file", file_hash))
+                    if not duplicate_of:
+                        known = await asyncio.to_thread(registry.lookup, file_hash=file_hash)
+                    if not duplicate_of and not known:
+                        result = await loop.run_in_executor(pool, extract_text_and_links, path)
+                        if isinstance(result, dict):
+                            raise ValueError(result["error"])
+                        details, links = result
+                        if not details.strip():
+                            raise ValueError("no text extracted")
+                        report = await asyncio.to_thread(
+                            prevalidate_resume, details, path if path.lower().endswith(".pdf") else None
+                        )
+                        if report.rejected:
+                            raise ResumeRejected(report)
+                        text_hash = normalized_text_hash(details)
+                        # The same text in another file or format is analysed once
+                        duplicate_of = claim_first_copy(claimed, path, ("text", text_hash))
+                        if not duplicate_of:
+                            known = await asyncio.to_thread(registry.lookup, text_hash=text_hash)
+                        if known:
+                            await asyncio.to_thread(registry.register_alias, file_hash, text_hash, known)
+                except Exception as e:
+                    stats.failed["extract"] += 1
+                    ledger.record(path, "failed", stage="extract", error=str(e))
+                    continue
+                finally:
+                    stats.busy["extract"] += time.perf_counter() - start
+                if duplicate_of:
+                    stats.duplicates += 1
+                    ledger.record(path, "skipped", duplicate_of=duplicate_of)
+                    continue
+                if known:
+                    stats.known += 1
+                    ledger.record(path, "stored", candidate_id=known["candidate_id"], known=True)
+                    continue
+                stats.done["extract"] += 1
+                await outbox.put({
+                    "path": path,
+                    "details": details,
+                    "links": links,
+                    "file_hash": file_hash,
+                    "text_hash": text_hash,
+                    "signature": minhash_signature(details).tolist(),
+                })
+
+        await asyncio.gather(*(worker() for _ in range(options["extract_workers"])))
+        await outbox.put(DONE)
+
+    # Analyse Stage (Async)
+    async def analyse_stage(self, inbox, outbox, ledger, stats, options):
+        """Run the LLM evaluation with at most --llm-concurrency calls in flight"""
+
+        async def worker():
+            while True:
+                item = await inbox.get()
+                if item is DONE:
+                    await inbox.put(DONE)
+                    return
+                start = time.perf_counter()
+                try:
+                    response = await analyse_resume(details=item["details"], links=item["links"])
+                    if not response:
+                        raise ValueError("no response received from the LLM")
+                    parsed = parse_resume_response(response)
+                    json_data, years_of_experience = parse_response_to_json(response, parsed=parsed)
+                    candidate_name = sanitize_filename(json_data["candidate_profile"]["name"])
+                except Exception as e:
+                    stats.failed["analyse"] += 1
+                    ledger.record(item["path"], "failed", stage="analyse", error=str(e))
+                    continue
+                finally:
+                    stats.busy["analyse"] += time.perf_counter() - start
+                stats.done["analyse"] += 1
+                ledger.record(
+                    item["path"],
+                    "analysed",
+                    response=response,
+                    candidate_name=candidate_name,
+                    years_of_experience=years_of_experience or 0,
+                    file_hash=item["file_hash"],
+                    text_hash=item["text_hash"],
+                    signature=item["signature"],
+                )
+                # Later stages reuse the parse; it is kept in memory only, resumed files re-parse
+                ledger.entries[item["path"]]["parsed"] = parsed
+                await outbox.put(ledger.entries[item["path"]])
+
+        await asyncio.gather(*(worker() for _ in range(options["llm_concurrency"])))
+        await outbox.put(DONE)
+
+    # Upload Stage (Async)
+    async def upload_stage(self, inbox, outbox, ledger, stats, options):
+        """Upload resumes and analysis JSON to Dropbox a batch at a time"""
+
+        def upload_group(entries):
+            # Same-name candidates share versioned Dropbox paths, so upload them one by one
+            results = []
+            for entry in entries:
+                json_data, _ = parse_response_to_json(entry["response"], parsed=entry.get("parsed"))
+                results.append(
+                    run_coroutine(save_to_dropbox, entry["path"], json_data, entry["candidate_name"])
+                )
+            return results
+
+        while True:
+            batch, finished = await take_batch(inbox, options["upload_batch"])
+            if batch:
+                groups = defaultdict(list)
+                for entry in batch:
+                    groups[entry["candidate_name"]].append(entry)
+                start = time.perf_counter()
+                results = await asyncio.gather(
+                    *(asyncio.to_thread(upload_group, entries) for entries in groups.values()),
+                    return_exceptions=True,
+                )
+                stats.busy["upload"] += time.perf_counter() - start
+
+                for entries, group_results in zip(groups.values(), results):
+                    if isinstance(group_results, Exception):
+                        group_results = [group_results] * len(entries)
+                    for entry, result in zip(entries, group_results):
+                        if not result or isinstance(result, Exception):
+                            stats.failed["upload"] += 1
+                            ledger.record(
+                                entry["path"], "failed", stage="upload",
+                                error=str(result or "Dropbox upload failed"),
+                            )
+                            continue
+                        stats.done["upload"] += 1
+                        ledger.record(
+                            entry["path"],
+                            "uploaded",
+                            resume_link=result["resume_link"],
+                            json_link=result["json_link"],
+                            version=result["version"],
+                        )
+                        await outbox.put(ledger.entries[entry["path"]])
+            if finished:
+                await outbox.put(DONE)
+                return
+
+    # Store Stage (Async)
+    async def store_stage(self, processor, registry, inbox, ledger, stats, options):
+        """Write candidates to Neo4j, one transaction per batch, then fingerprint them"""
+        while True:
+            batch, finished = await take_batch(inbox, options["write_batch"])
+            if batch:
+                start = time.perf_counter()
+                try:
+                    stored = await asyncio.to_thread(processor.store_resumes_batch, batch, INGEST_UPSERT)
+                except Exception as e:
+                    stats.failed["store"] += len(batch)
+                    for entry in batch:
+                        ledger.record(entry["path"], "failed", stage="store", error=str(e))
+                else:
+                    stats.done["store"] += len(batch)
+                    for entry, (candidate_id, created) in zip(batch, stored):
+                        try:
+                            await asyncio.to_thread(register_stored, registry, entry, candidate_id, created)
+                        except Exception as e:
+                            # The candidate is stored; only the re-import short-circuit is lost
+                            self.stderr.write(f"Could not register {entry['path']}: {e}")
+                        ledger.record(entry["path"], "stored", candidate_id=candidate_id)
+                finally:
+                    stats.busy["store"] += time.perf_counter() - start
+            if finished:
+                return
+
+
+# Claimed Hashes
+def claimed_hashes(ledger):
+    """File and text hashes of the files a rerun resumes after extraction, by path"""
+    claimed = {}
+    for path, entry in ledger.entries.items():
+        if ledger.status(path) in ("analysed", "uploaded"):
+            for kind in ("file", "text"):
+                if entry.get(f"{kind}_hash"):
+                    claimed[(kind, entry[f"{kind}_hash"])] = path
+    return claimed
+
+
+# Claim First Copy
+def claim_first_copy(claimed, path, key):
+    """Claim a file or text hash for path; return the path that claimed it first, if another"""
+    first = claimed.setdefault(key, path)
+    return first if first != path else None
+
+
+# Register Stored
+def register_stored(registry, entry, candidate_id, created):
+    """
+    Index a stored candidate for near-duplicate lookups, linking it to its canonical
+    candidate, and record its resume fingerprint, as the upload path does. Entries
+    resumed from a ledger written without hashes are skipped.
+    """
+    if entry.get("signature"):
+        signature = np.array(entry["signature"], dtype=np.uint64)
+        index = get_near_duplicate_index()
+        near_duplicate = index.find_canonical(signature)
+        index.add(candidate_id, signature, near_duplicate[0] if near_duplicate else None)
+        # An updated candidate is naturally close to its own previous resume
+        if near_duplicate and created and near_duplicate[0] != candidate_id:
+            link_near_duplicate(registry.driver, candidate_id, *near_duplicate)
+    if entry.get("file_hash"):
+        json_data, _ = parse_response_to_json(entry["response"], parsed=entry.get("parsed"))
+        registry.register(
+            entry["file_hash"], entry.get("text_hash"), candidate_id,
+            entry["resume_link"], entry["json_link"], json_data,
+        )
+
+
+# Take Batch (Async)
+async def take_batch(queue, size, wait=1.0):
+    """
+    Wait for one item, then gather more for up to `wait` seconds until the batch is full.
+    Returns the batch and whether the end of the stream was reached.
+    """
+    batch = []
+    item = await queue.get()
+    if item is DONE:
+        return batch, True
+    batch.append(item)
+    deadline = time.perf_counter() + wait
+    while len(batch) < size:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        try:
+            item = await asyncio.wait_for(queue.get(), remaining)
+        except asyncio.TimeoutError:
+            break
+        if item is DONE:
+            return batch, True
+        batch.append(item)
+    return batch, False
@@ -0,0 +1,52 @@
+from django.core.management.base import BaseCommand
+
+from upload_and_get_resume.utils.vectorise_v1 import (
+    Neo4jResumeProcessor,
+    NEO4J_URI,
+    NEO4J_USER,
+    NEO4J_PASSWORD,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Move missing-field information from edges to the shared NAValue node into "
+        "the Candidate.missingFields property, then delete the edges, the NAValue "
+        "node and its index."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000, help="Candidates migrated per transaction"
+        )
+
+    def handle(self, *args, **options):
+        processor = Neo4jResumeProcessor(uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD)
+        try:
+            with processor.driver.session() as session:
+                # CALL { } IN TRANSACTIONS needs an auto-commit transaction, so use session.run
+                summary = session.run(
+                    """
+                    MATCH (c:Candidate) WHERE EXISTS { (c)-->(:NAValue) }
+                    CALL {
+                        WITH c
+                        MATCH (c)-[r]->(:NAValue)
+                        WITH c, collect(r) as rels, collect(DISTINCT r.field) as fields
+                        SET c.missingFields = fields +
+                            [field IN coalesce(c.missingFields, []) WHERE NOT field IN fields]
+                        FOREACH (r IN rels | DELETE r)
+                    } IN TRANSACTIONS OF $batch_size ROWS
+                    """,
+                    {"batch_size": options["batch_size"]},
+                ).consume()
+                self.stdout.write(
+                    f"Migrated {summary.counters.properties_set} candidates, "
+                    f"deleted {summary.counters.relationships_deleted} N/A edges"
+                )
+
+                # The node has no edges left, so a plain DELETE is enough
+                session.run("MATCH (na:NAValue) DELETE na").consume()
+                session.run("DROP INDEX na_value_index IF EXISTS").consume()
+                self.stdout.write("Removed the NAValue node and na_value_index")
+        finally:
+            processor.close()
@@ -0,0 +1,226 @@
+import json
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from upload_and_get_resume.processes.saved_search import SavedSearchEngine
+from upload_and_get_resume.utils.embeddings import (
+    EMBEDDING_CONFIG_TTL,
+    embedding_property,
+    get_active_embedding_model,
+    get_sentence_model,
+    set_active_embedding_model,
+)
+from upload_and_get_resume.utils.vectorise_v1 import (
+    Neo4jResumeProcessor,
+    NEO4J_URI,
+    NEO4J_USER,
+    NEO4J_PASSWORD,
+)
+
+# Candidates without stored resume text are embedded from their graph profile
+CANDIDATE_BATCH_QUERY = """
+MATCH (c:Candidate)
+WHERE c.candidateId > $cursor AND ($all OR c[$property] IS NULL)
+RETURN c.candidateId as candidate_id, c.resumeText as text, c.name as name,
+       [(c)-[:HAS_DESIGNATION]->(d) | d.name] as designations,
+       [(c)-[:WORKING_WORKED_AT|WORKED_AT]->(co) | co.companyName] as companies,
+       [(c)-[:HAS_SKILL]->(s) | s.skillName] as skills,
+       [(c)-[:SUITABLE_FOR]->(r) | r.roleName] as roles,
+       [(c)-[:LOCATED_IN]->(l) | l.name] as locations,
+       [(c)-[:STUDIED_AT]->(e) | e.degree + ' ' + e.institutionName] as education
+ORDER BY c.candidateId
+LIMIT $batch_size
+"""
+
+
+# Profile Text
+def profile_text(record):
+    """Text a candidate is embedded from: the stored resume text, else its graph profile"""
+    if record["text"]:
+        return record["text"]
+    parts = [f"Name: {record['name']}"]
+    for label, key in (
+        ("Designation", "designations"),
+        ("Companies", "companies"),
+        ("Skills", "skills"),
+        ("Suitable roles", "roles"),
+        ("Location", "locations"),
+        ("Education", "education"),
+    ):
+        values = [value for value in record[key] if value]
+        if values:
+            parts.append(f"{label}: {', '.join(values)}")
+    return "\n".join(parts)
+
+
+class Command(BaseCommand):
+    help = (
+        "Re-embed every candidate and saved search with another model into that model's "
+        "own property, in throttled batches. Progress is kept in the graph, so an "
+        "interrupted run resumes where it stopped. Search keeps using the active model "
+        "until --activate switches to the new one."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("model", help="SentenceTransformer model to re-embed with")
+        parser.add_argument(
+            "--batch-size", type=int, default=256, help="Candidates embedded and written per transaction"
+        )
+        parser.add_argument(
+            "--max-rate", type=float, default=0,
+            help="Maximum candidates per second, to leave room for live traffic (0 = unthrottled)",
+        )
+        parser.add_argument(
+            "--restart", action="store_true", help="Ignore saved progress and start from the first candidate"
+        )
+        parser.add_argument(
+            "--activate", action="store_true",
+            help="Switch search and ingest to the model once the backfill is complete",
+        )
+
+    def handle(self, *args, **options):
+        model_name = options["model"]
+        self.property = embedding_property(model_name)
+        processor = Neo4jResumeProcessor(uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD)
+        try:
+            processor.create_indexes()
+            self.driver = processor.driver
+            self.model = get_sentence_model(model_name)
+            self.stdout.write(
+                f"Active model: {get_active_embedding_model(self.driver)}; "
+                f"re-embedding with {model_name} into Candidate.{self.property}"
+            )
+
+            cursor, processed = self.load_progress(model_name, options["restart"])
+            if cursor:
+                self.stdout.write(f"Resuming after {processed} candidates")
+            self.backfill_candidates(model_name, cursor, processed, options, all_candidates=True)
+            self.backfill_saved_searches()
+
+            if options["activate"]:
+                set_active_embedding_model(self.driver, model_name)
+                # Other processes keep writing the old property until their cached model expires
+                self.stdout.write(f"Activated {model_name}; catching up after {EMBEDDING_CONFIG_TTL}s")
+                time.sleep(EMBEDDING_CONFIG_TTL)
+                self.backfill_candidates(model_name, "", 0, options, all_candidates=False)
+                self.backfill_saved_searches()
+        finally:
+            processor.close()
+
+    # Load Progress
+    def load_progress(self, model_name, restart):
+        with self.driver.session() as session:
+            record = session.run(
+                """
+                MERGE (b:EmbeddingBackfill {model: $model})
+                ON CREATE SET b.cursor = '', b.processed = 0, b.startedDate = $now
+                SET b.property = $property
+                SET b.cursor = CASE WHEN $restart THEN '' ELSE b.cursor END,
+                    b.processed = CASE WHEN $restart THEN 0 ELSE b.processed END
+                RETURN b.cursor as cursor, b.processed as processed
+                """,
+                {
+                    "model": model_name,
+                    "property": self.property,
+                    "restart": restart,
+                    "now": datetime.now().isoformat(),
+                },
+            ).single()
+        return record["cursor"], record["processed"]
+
+    # Backfill Candidates
+    def backfill_candidates(self, model_name, cursor, processed, options, all_candidates):
+        """Walk candidates by id, embedding a batch and saving the cursor in one transaction"""
+        batch_size = options["batch_size"]
+        min_batch_seconds = batch_size / options["max_rate"] if options["max_rate"] else 0
+        start = time.perf_counter()
+        with self.driver.session() as session:
+            while True:
+                batch_start = time.perf_counter()
+                records = list(session.run(
+                    CANDIDATE_BATCH_QUERY,
+                    {
+                        "cursor": cursor,
+                        "all": all_candidates,
+                        "property": self.property,
+                        "batch_size": batch_size,
+                    },
+                ))
+                if not records:
+                    break
+                embeddings = self.model.encode(
+                    [profile_text(record) for record in records],
+                    batch_size=64,
+                    normalize_embeddings=True,
+                ).tolist()
+                rows = [
+                    {"candidate_id": record["candidate_id"], "props": {self.property: embedding}}
+                    for record, embedding in zip(records, embeddings)
+                ]
+                cursor = records[-1]["candidate_id"]
+                processed += len(rows)
+                session.execute_write(lambda tx: tx.run(
+                    """
+                    UNWIND $rows AS row
+                    MATCH (c:Candidate {candidateId: row.candidate_id})
+                    SET c += row.props
+                    WITH count(*) as written
+                    MATCH (b:EmbeddingBackfill {model: $model})
+                    SET b.cursor = $cursor, b.processed = $processed, b.updatedDate = $now
+                    """,
+                    {
+                        "rows": rows,
+                        "model": model_name,
+                        "cursor": cursor,
+                        "processed": processed,
+                        "now": datetime.now().isoformat(),
+                    },
+                ).consume())
+
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f"Re-embedded {processed} candidates ({processed / elapsed:.0f}/s)")
+                # Throttle to --max-rate
+                remaining = min_batch_seconds - (time.perf_counter() - batch_start)
+                if remaining > 0:
+                    time.sleep(remaining)
+
+        with self.driver.session() as session:
+            session.run(
+                "MATCH (b:EmbeddingBackfill {model: $model}) SET b.completedDate = $now",
+                {"model": model_name, "now": datetime.now().isoformat()},
+            ).consume()
+
+    # Backfill Saved Searches
+    def backfill_saved_searches(self):
+        """Re-embed saved-search queries so percolation compares like with like"""
+        # Only the search-text builder is used; it needs no model or driver of its own
+        builder = SavedSearchEngine.__new__(SavedSearchEngine)
+        with self.driver.session() as session:
+            searches = [
+                (record["search_id"], builder._build_search_text(json.loads(record["search_params"] or "{}")))
+                for record in session.run(
+                    "MATCH (s:SavedSearch) RETURN s.searchId as search_id, s.searchParams as search_params"
+                )
+            ]
+            searches = [(search_id, text) for search_id, text in searches if text]
+            if not searches:
+                return
+            embeddings = self.model.encode(
+                [text for _, text in searches], normalize_embeddings=True
+            ).tolist()
+            session.execute_write(lambda tx: tx.run(
+                """
+                UNWIND $rows AS row
+                MATCH (s:SavedSearch {searchId: row.search_id})
+                SET s += row.props
+                """,
+                {
+                    "rows": [
+                        {"search_id": search_id, "props": {self.property: embedding}}
+                        for (search_id, _), embedding in zip(searches, embeddings)
+                    ]
+                },
+            ).consume())
+        self.stdout.write(f"Re-embedded {len(searches)} saved searches")
@@ -1,5 +1,6 @@
-from upload_and_get_resume.utils.extract_text_link_v2 import extract_text_and_links
-from upload_and_get_resume.utils.upload_dropbox_v2 import save_to_dropbox
+from upload_and_get_resume.utils.extract_text_link import extract_text_and_links_from_dropbox
+from upload_and_get_resume.utils.upload_dropbox_v2 import get_shared_link_revision, save_to_dropbox
+from upload_and_get_resume.utils.text_compactor import compact_for_llm
 from upload_and_get_resume.utils.extract_name_write_pdf import (
     write_response_to_pdf,
     extract_candidate_name,
@@ -19,6 +20,8 @@ from typing import Any, Dict, List
 import logging
 from openai import AsyncOpenAI
 
+# Logs are not tracked, so create the directory on first run
+os.makedirs("logs", exist_ok=True)
 logging.basicConfig(
     filename="logs/analysis_resume.log",
     filemode="a",
@@ -376,14 +379,19 @@ async def analyse_resume(url, search_params, output_pdf_path):
         # if "name" in search_params or "email" in search_params or "phone" in search_params:
 
         response = None
-        # Extracts detailes and links form the resume already present in the dropbox.
-        details, links = extract_text_and_links(url=url)
+        # Extracts detailes and links form the resume already present in the dropbox,
+        # or takes them from the extraction cache.
+        details, links = extract_text_and_links_from_dropbox(
+            url, revision=get_shared_link_revision(url)
+        )
 
         # connects to MCP server
         await connect_to_server()
 
         # Processses the resume and does the Analysis
-        response = await process_resume(details, links, search_params)
+        response = await process_resume(
+            compact_for_llm(details, stage="match").text, links, search_params
+        )
         candidate_name = extract_candidate_name(details)
 
         if output_pdf_path and response:
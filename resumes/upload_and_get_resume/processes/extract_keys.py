@@ -1,7 +1,30 @@
-from upload_and_get_resume.utils.extract_text_link import extract_text_and_links
+from upload_and_get_resume.utils.extract_text_link import ResumeSource, extract_text_and_links
+from upload_and_get_resume.utils.extraction_cache import get_extraction_cache
 from upload_and_get_resume.utils.save_json import save_analysis_to_json, parse_response_to_json
-from upload_and_get_resume.utils.vectorise_v1 import store_resume_to_neo4j
+from upload_and_get_resume.utils.resume_parser import (
+    parse_resume_response,
+    render_resume_text,
+    RESUME_JSON_SCHEMA,
+)
+from upload_and_get_resume.utils.metrics import EXTRACTION_SECONDS, EXTRACTION_TOKENS
+from upload_and_get_resume.utils.vectorise_v1 import (
+    store_resume_to_neo4j,
+    attach_resume_links,
+    delete_candidate,
+)
+from upload_and_get_resume.processes.search_resume import timed_stage
+from upload_and_get_resume.utils.text_compactor import compact_for_llm
+from upload_and_get_resume.utils.prevalidation import ResumeRejected, prevalidate_resume
 from upload_and_get_resume.utils.upload_dropbox import save_to_dropbox
+from upload_and_get_resume.utils.resume_registry import (
+    ResumeRegistry,
+    normalized_text_hash,
+)
+from upload_and_get_resume.utils.near_duplicate import (
+    get_near_duplicate_index,
+    minhash_signature,
+    link_near_duplicate,
+)
 import os
 from dotenv import load_dotenv
 import asyncio
@@ -21,6 +44,8 @@ from dropbox.files import WriteMode
 import logging
 
 
+# Logs are not tracked, so create the directory on first run
+os.makedirs("logs", exist_ok=True)
 logging.basicConfig(
     filename="logs/extract_keys.log",
     filemode="a",
@@ -36,6 +61,8 @@ load_dotenv()
 
 GROQ_MODEL = os.getenv("GROQ_MODEL")
 OPENAI_API_MODEL = os.getenv("OPENAI_API_MODEL")
+# "text": header-formatted report parsed by resume_parser; "json": provider structured output
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "text").lower()
 session = None
 exit_stack = AsyncExitStack()
 groq_client = AsyncGroq(api_key=os.getenv("GROQ_API_KEY"))
@@ -109,13 +136,26 @@ async def cleanup():
         print(f"[ERROR] Cleanup failed: {str(e)}")
         logging.error(f"Cleanup failed: {str(e)}")
 
+# Record LLM Usage
+def record_llm_usage(mode, response, trace=None):
+    """Count the prompt and completion tokens of one LLM call, in the metrics and the trace"""
+    usage = getattr(response, "usage", None)
+    if usage is None:
+        return
+    for kind, count in (("prompt", usage.prompt_tokens), ("completion", usage.completion_tokens)):
+        EXTRACTION_TOKENS.inc(count or 0, mode=mode, kind=kind)
+        if trace is not None:
+            tokens = trace.setdefault("llm_tokens", {})
+            tokens[kind] = tokens.get(kind, 0) + (count or 0)
+
 # Process Details
-async def process_details(details, links):
+async def process_details(details, links, trace=None):
     """
     Process extracted details and links to generate a structured evaluation report.
     parameters:
     details (str): Candidate's resume text
     links (str): Candidate's provided links
+    trace (dict): Optional; receives the token counts under "llm_tokens"
     return:
     str: Structured evaluation report
     """
@@ -243,6 +283,7 @@ Institution:
             # tool_choice="auto",
         )
 
+        record_llm_usage("text", response, trace)
         print("\n[DEBUG] Initial response received")
         logging.info("Initial response received")
         choice = response.choices[0]
@@ -424,6 +465,7 @@ Institution:
                 ],
             )
 
+            record_llm_usage("text", final_response, trace)
             print("[DEBUG] Final response received after tool execution")
             logging.info("Final response received after tool execution")
             # Extract final response
@@ -438,6 +480,72 @@ Institution:
         print(f"[ERROR] Unable to extract keys from resume : {e}")
         logging.error(f"Unable to extract keys from resume: {e}")
 
+# Process Details Structured (Async)
+async def process_details_structured(details, links, trace=None):
+    """
+    Same evaluation as process_details, returned through the provider's JSON-schema
+    structured output instead of a header-formatted report.
+    return:
+    str: The extraction written in the report format (see render_resume_text), or None
+    """
+    try:
+        response = await groq_client.chat.completions.create(
+            model=GROQ_MODEL,
+            max_tokens=2048,
+            temperature=0.1,
+            response_format={
+                "type": "json_schema",
+                "json_schema": {"name": "resume_evaluation", "schema": RESUME_JSON_SCHEMA},
+            },
+            messages=[
+                {
+                    "role": "system",
+                    "content": """
+You are a senior talent acquisition specialist and industry expert across all professional domains. Analyze the candidate's resume and links and fill in the JSON schema.
+
+**CRITICAL INSTRUCTIONS**:
+1. Use null for missing single values and [] for missing lists; never write 'N/A'.
+2. Extract the candidate's full name; names may belong to any global ethnicity or culture. If none is found, use LinkedIn patterns or email prefixes as clues, or 'Unknown Candidate' and mention it under red_flags.
+3. years_experience is a number (1.2 for 1 year 2 months); 0 for freshers or unclear experience.
+4. previous_employers lists all previous employers, including internships, most recent first.
+5. skills are grouped by sub-category; suitable_roles may be inferred.
+6. analysis: be brutally honest, evidence-based and concise, comparing experience, skills, seniority and industry knowledge to market standards.
+""",
+                },
+                {"role": "user", "content": details},
+                {"role": "user", "content": links},
+            ],
+        )
+        record_llm_usage("json", response, trace)
+        data = json.loads(response.choices[0].message.content or "")
+        return render_resume_text(data)
+
+    except Exception as e:
+        print(f"[ERROR] Structured extraction failed: {e}")
+        logging.error(f"Structured extraction failed: {e}")
+        return None
+
+# Analyse Resume (Async)
+async def analyse_resume(details, links, trace=None, mode=None):
+    """
+    Run the LLM evaluation in EXTRACTION_MODE and return the report text.
+    A failed structured extraction falls back to the text format.
+    The resume text is compacted to the token budget first.
+    """
+    mode = mode or EXTRACTION_MODE
+    # Headers, footers and layout whitespace are only billed input tokens
+    details = compact_for_llm(details, stage="ingest", trace=trace).text
+    start = time.perf_counter()
+    response = None
+    if mode == "json":
+        response = await process_details_structured(details=details, links=links, trace=trace)
+        if response is None:
+            mode = "json_fallback"
+    if response is None:
+        response = await process_details(details=details, links=links, trace=trace)
+    EXTRACTION_SECONDS.observe(time.perf_counter() - start, mode=mode)
+    return response
+
 def sanitize_filename(name):
     try:
         return re.sub(r'[\\/*?:"<>|]', "", name)
@@ -465,21 +573,73 @@ def get_unique_output_paths(output_dir, base_name):
         i += 1
 
 # Extract Keys (Async)
-async def extract_keys(file_path):
+async def extract_keys(resume):
     """
     Extraction of text and keys from the resume and processing.
 
     Parameters:
-    file_path (str): The path to the resume file.
+    resume (ResumeSource | str): The uploaded resume buffer, or the path to the resume file.
 
     Returns:
     dict: A dictionary containing the parsed resume data and analysis report.
     """
+    registry = ResumeRegistry()
+    # Wall-clock time of each ingest stage, logged when the resume is stored
+    trace = {}
     try:
         response = None
-        if os.path.dirname(file_path):
+        if isinstance(resume, str):
+            resume = ResumeSource.from_path(resume)
+        if resume.data is not None or os.path.dirname(resume.path):
+            # Known file bytes short-circuit before extraction and the LLM call
+            file_hash = resume.sha256()
+            known = registry.lookup(file_hash=file_hash)
+            if known:
+                print(f"[INFO] Resume already processed as candidate {known['candidate_id']}")
+                logging.info(f"Resume already processed as candidate {known['candidate_id']}")
+                return known["result"]
+
             # Extract Text and links from the resume
-            details, links = extract_text_and_links(file_path=file_path)
+            with timed_stage(trace, "extraction"):
+                extracted = await asyncio.to_thread(extract_text_and_links, resume)
+            if isinstance(extracted, dict):
+                raise ValueError(extracted["error"])
+            details, links = extracted
+
+            # Scans, empty and non-resume files stop here, before the MCP connection,
+            # the LLM call and the Dropbox upload
+            with timed_stage(trace, "prevalidation"):
+                report = await asyncio.to_thread(
+                    prevalidate_resume,
+                    details,
+                    resume.open_source() if resume.extension == ".pdf" else None,
+                )
+            trace["prevalidation"] = report.stats
+            if report.rejected:
+                raise ResumeRejected(report)
+            if report.reasons:
+                print(f"[WARN] Resume flagged by pre-validation: {'; '.join(report.reasons)}")
+                logging.warning(f"Resume flagged by pre-validation: {'; '.join(report.reasons)}")
+
+            # Seed the extraction cache, so analysing this resume later skips the parse
+            try:
+                get_extraction_cache().put(file_hash, details, links)
+            except Exception as e:
+                print(f"[WARN] Could not cache the extracted text: {e}")
+                logging.warning(f"Could not cache the extracted text: {e}")
+
+            # Same text in a different file (re-export, re-save) is the same resume
+            text_hash = normalized_text_hash(details)
+            known = registry.lookup(text_hash=text_hash)
+            if known:
+                registry.register_alias(file_hash, text_hash, known)
+                print(f"[INFO] Resume text already processed as candidate {known['candidate_id']}")
+                logging.info(f"Resume text already processed as candidate {known['candidate_id']}")
+                return known["result"]
+
+            # Lightly edited resubmissions are stored, but linked to their canonical candidate
+            signature = minhash_signature(details)
+            near_duplicate = get_near_duplicate_index().find_canonical(signature)
 
             # print(f"[DEBUG] Extracted details: {details}")
             # print(f"[DEBUG] Extracted links: {links}")
@@ -488,15 +648,18 @@ async def extract_keys(file_path):
             await connect_to_server()
 
             # Process all the detailes and links extracted from resume using LLM
-            response = await process_details(details=details, links=links)
+            with timed_stage(trace, "llm_analysis"):
+                response = await analyse_resume(details=details, links=links, trace=trace)
 
             if response is None:
                 response = "No response received from the server."
             
             # print(f"[DEBUG] Response from server: {response}")
             
+            # Parse the response once; the Json export and the graph store both use the result.
             # Convert whole response received into Json and also extract Years of Experience from that.
-            json_data, years_of_experience = parse_response_to_json(response)
+            parsed = parse_resume_response(response)
+            json_data, years_of_experience = parse_response_to_json(response, parsed=parsed)
             
             # Make File name using candidate's name
             candidate_name = sanitize_filename(json_data["candidate_profile"]["name"])
@@ -522,33 +685,80 @@ async def extract_keys(file_path):
 
             # await save_analysis_to_json(json_data, json_path)
 
-            # Save Resume and Json to Dropbox
-            dropbox_result = await save_to_dropbox(file_path, json_data, candidate_name)
+            # Dropbox upload and the Neo4j store are independent once the response is parsed,
+            # so run them concurrently; the candidate gets its Dropbox links afterwards.
+            async def upload():
+                with timed_stage(trace, "dropbox_upload"):
+                    return await save_to_dropbox(resume.read(), json_data, candidate_name)
+
+            async def store():
+                # Stores All the data into Neo4J Graph DB by converting all the data into nodes and connecting them with relevent reletionships(edges)
+                with timed_stage(trace, "neo4j_store"):
+                    return await store_resume_to_neo4j(
+                        details=response,
+                        resume_file_path=None,
+                        json_file_path=None,
+                        years_of_experience=years_of_experience,
+                        source_text_hash=text_hash,
+                        parsed=parsed,
+                    )
+
+            with timed_stage(trace, "upload_and_store"):
+                dropbox_result, (candidate_id, created) = await asyncio.gather(upload(), store())
+
             if not dropbox_result:
                 print("[ERROR] Dropbox upload failed")
                 logging.error("Dropbox upload failed")
+                # Do not leave a new candidate without its resume behind
+                if candidate_id and created:
+                    await delete_candidate(candidate_id)
                 return None
 
             print(f"[INFO] Resume and JSON saved to Dropbox: {dropbox_result}")
             logging.info(f"Resume and JSON saved to Dropbox: {dropbox_result}")
-            # Stores All the data into Neo4J Graph DB by converting all the data into nodes and connecting them with relevent reletionships(edges)
-            await  store_resume_to_neo4j(
-                details=response,
-                resume_file_path=dropbox_result["resume_link"],
-                json_file_path=dropbox_result["json_link"],
-                years_of_experience=years_of_experience,
+            if candidate_id:
+                with timed_stage(trace, "attach_links"):
+                    await attach_resume_links(
+                        candidate_id, dropbox_result["resume_link"], dropbox_result["json_link"]
+                    )
+                get_near_duplicate_index().add(
+                    candidate_id, signature, near_duplicate[0] if near_duplicate else None
+                )
+                # An updated candidate is naturally close to its own previous resume
+                if near_duplicate and created and near_duplicate[0] != candidate_id:
+                    canonical_id, similarity = near_duplicate
+                    link_near_duplicate(registry.driver, candidate_id, canonical_id, similarity)
+                    print(f"[INFO] Candidate {candidate_id} is a near-duplicate of {canonical_id} ({similarity:.2f})")
+                    logging.info(f"Candidate {candidate_id} is a near-duplicate of {canonical_id} ({similarity:.2f})")
+                registry.register(
+                    file_hash,
+                    text_hash,
+                    candidate_id,
+                    dropbox_result["resume_link"],
+                    dropbox_result["json_link"],
+                    json_data,
+                )
+            logging.info(
+                f"Ingest stage timings (ms): {trace.get('timings_ms', {})}, "
+                f"LLM tokens ({EXTRACTION_MODE}): {trace.get('llm_tokens', {})}, "
+                f"compaction: {trace.get('compaction', {})}"
             )
             print(f"[INFO] Saved as version _{dropbox_result['version']}")
             logging.info(f"Saved as version _{dropbox_result['version']}")
             # print(f"[INFO] Saved as version _{version}")
             # logging.info(f"Saved as version _{version}")
             return json_data
+    except ResumeRejected as e:
+        print(f"[INFO] {e}")
+        logging.info(f"{e} ({e.report.stats})")
+        raise e
     except Exception as e:
         print(f"[ERROR] An error occurred while extracting keys: {e}")
         logging.error(f"An error occurred while extracting keys: {e}")
         raise e
     finally:
         # Cleanup
+        registry.close()
         await cleanup()
 
 
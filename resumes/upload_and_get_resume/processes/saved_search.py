@@ -0,0 +1,252 @@
+import json
+import uuid
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from upload_and_get_resume.processes.search_resume import (
+    CandidateSearchEngine,
+    match_candidate_row,
+    NEO4jURI,
+    NEO4jUSER,
+    NEO4jPASSWORD,
+)
+
+
+# Saved Search Engine Class
+class SavedSearchEngine(CandidateSearchEngine):
+    """
+    Standing searches stored in Neo4j with their precomputed query embeddings.
+    New candidates are percolated against every saved search on ingest, so
+    recruiters see new arrivals without rerunning the full search.
+    """
+
+    # Save Search (Async)
+    async def save_search(
+        self,
+        name: str,
+        search_query: str,
+        search_params: Dict[str, Any],
+        from_experience: float = 0,
+        to_experience: Optional[float] = None,
+        similarity_threshold: float = 0.4,
+    ) -> Dict[str, Any]:
+        """Store a search with its structured criteria and query embedding"""
+        search_text = self._build_search_text(search_params)
+        embedding = await self.get_embedding(search_text) if search_text else None
+        search_id = str(uuid.uuid4())
+
+        with self.driver.session() as session:
+            session.run(
+                """
+                CREATE (s:SavedSearch {
+                    searchId: $search_id,
+                    name: $name,
+                    searchQuery: $search_query,
+                    searchParams: $search_params,
+                    fromExperience: $from_exp,
+                    toExperience: $to_exp,
+                    similarityThreshold: $threshold,
+                    createdDate: $created_date
+                })
+                SET s += $embedding_props
+                """,
+                {
+                    "search_id": search_id,
+                    "name": name,
+                    "search_query": search_query,
+                    "search_params": json.dumps(search_params),
+                    "from_exp": from_experience,
+                    "to_exp": to_experience,
+                    "threshold": similarity_threshold,
+                    "embedding_props": {self.embedding_property: embedding} if embedding else {},
+                    "created_date": datetime.now().isoformat(),
+                },
+            )
+
+        return {
+            "search_id": search_id,
+            "name": name,
+            "search_query": search_query,
+            "search_params": search_params,
+            "from_experience": from_experience,
+            "to_experience": to_experience,
+            "similarity_threshold": similarity_threshold,
+        }
+
+    # List Saved Searches
+    def list_saved_searches(self) -> List[Dict[str, Any]]:
+        """List saved searches with the number of candidates matched so far"""
+        with self.driver.session() as session:
+            results = session.run(
+                """
+                MATCH (s:SavedSearch)
+                OPTIONAL MATCH (s)-[m:MATCHED]->(:Candidate)
+                RETURN s, count(m) as match_count
+                ORDER BY s.createdDate DESC
+                """
+            )
+            return [
+                {
+                    "search_id": record["s"]["searchId"],
+                    "name": record["s"]["name"],
+                    "search_query": record["s"]["searchQuery"],
+                    "from_experience": record["s"]["fromExperience"],
+                    "to_experience": record["s"]["toExperience"],
+                    "similarity_threshold": record["s"]["similarityThreshold"],
+                    "created_date": record["s"]["createdDate"],
+                    "match_count": record["match_count"],
+                }
+                for record in results
+            ]
+
+    # Get Saved Search Matches
+    def get_matches(self, search_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Return the candidates recorded as matches of a saved search, best first"""
+        with self.driver.session() as session:
+            results = session.run(
+                """
+                MATCH (s:SavedSearch {searchId: $search_id})-[m:MATCHED]->(c:Candidate)
+                RETURN c, m.score as score, m.matchedDate as matched_date
+                ORDER BY score DESC
+                LIMIT $limit
+                """,
+                {"search_id": search_id, "limit": limit},
+            )
+            return [
+                {
+                    "candidate_id": record["c"].get("candidateId"),
+                    "name": record["c"].get("name"),
+                    "email": record["c"].get("email"),
+                    "years_experience": record["c"].get("yearsOfExperience"),
+                    "resume_path": record["c"].get("resumePath"),
+                    "json_path": record["c"].get("jsonPath"),
+                    "score": record["score"],
+                    "matched_date": record["matched_date"],
+                }
+                for record in results
+            ]
+
+    # Percolate Candidate
+    def percolate_candidate(
+        self,
+        candidate_id: str,
+        row: Dict[str, Any],
+        embedding: Optional[List[float]],
+    ) -> List[Dict[str, Any]]:
+        """
+        Score one newly ingested candidate against all saved searches at once
+        and record the matches above each search's threshold.
+
+        Args:
+            candidate_id: Id of the stored Candidate node
+            row: Candidate row in the shape of the search templates' unfiltered result
+            embedding: Candidate's resume embedding
+
+        Returns:
+            List of recorded matches (search_id, score)
+        """
+        with self.driver.session() as session:
+            saved = list(
+                session.run(
+                    """
+                    MATCH (s:SavedSearch)
+                    RETURN s.searchId as search_id, s.searchParams as search_params,
+                           s.fromExperience as from_exp, s.toExperience as to_exp,
+                           s.similarityThreshold as threshold, s[$embedding_property] as embedding
+                    """,
+                    {"embedding_property": self.embedding_property},
+                )
+            )
+            if not saved:
+                return []
+
+            # Vectorized similarity of the candidate against the saved-query matrix
+            similarity = np.zeros(len(saved))
+            has_embedding = np.array(
+                [bool(s["embedding"]) and bool(embedding) for s in saved]
+            )
+            if has_embedding.any():
+                query_matrix = np.array(
+                    [s["embedding"] for s, ok in zip(saved, has_embedding) if ok]
+                )
+                vector = np.array(embedding)
+                norm = np.linalg.norm(vector)
+                if norm > 0:
+                    similarity[has_embedding] = query_matrix @ (vector / norm)
+
+            matches = []
+            for i, s in enumerate(saved):
+                search_params = json.loads(s["search_params"] or "{}")
+                record = match_candidate_row(
+                    row,
+                    self._prepare_query_params(search_params),
+                    s["from_exp"] or 0,
+                    s["to_exp"],
+                )
+                if record is None:
+                    continue
+                scores = self._calculate_match_scores(
+                    record,
+                    search_params,
+                    None,
+                    None,
+                    similarity_score=float(similarity[i]) if has_embedding[i] else None,
+                )
+                threshold = s["threshold"] if s["threshold"] is not None else 0.4
+                if scores["total_score"] >= threshold:
+                    matches.append(
+                        {"search_id": s["search_id"], "score": scores["total_score"]}
+                    )
+
+            if matches:
+                session.run(
+                    """
+                    MATCH (c:Candidate {candidateId: $candidate_id})
+                    UNWIND $matches AS match
+                    MATCH (s:SavedSearch {searchId: match.search_id})
+                    MERGE (s)-[m:MATCHED]->(c)
+                    SET m.score = match.score, m.matchedDate = $matched_date
+                    """,
+                    {
+                        "candidate_id": candidate_id,
+                        "matches": matches,
+                        "matched_date": datetime.now().isoformat(),
+                    },
+                )
+            return matches
+
+
+# Save Search (Async)
+async def save_search(name, search_query, search_params, from_experience, to_experience, similarity_threshold):
+    engine = SavedSearchEngine(uri=NEO4jURI, user=NEO4jUSER, password=NEO4jPASSWORD)
+    try:
+        return await engine.save_search(
+            name=name,
+            search_query=search_query,
+            search_params=search_params,
+            from_experience=from_experience,
+            to_experience=to_experience,
+            similarity_threshold=similarity_threshold,
+        )
+    finally:
+        engine.close()
+
+
+# List Saved Searches
+def list_saved_searches():
+    engine = SavedSearchEngine(uri=NEO4jURI, user=NEO4jUSER, password=NEO4jPASSWORD)
+    try:
+        return engine.list_saved_searches()
+    finally:
+        engine.close()
+
+
+# Get Saved Search Matches
+def get_saved_search_matches(search_id, limit=50):
+    engine = SavedSearchEngine(uri=NEO4jURI, user=NEO4jUSER, password=NEO4jPASSWORD)
+    try:
+        return engine.get_matches(search_id, limit=limit)
+    finally:
+        engine.close()
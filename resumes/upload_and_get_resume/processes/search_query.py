@@ -0,0 +1,235 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from upload_and_get_resume.processes.search_resume import (
+    CONSTRAINT_FIELDS,
+    FIELD_SCORES,
+    CompiledSearch,
+    compile_search_params,
+)
+
+# Query field tags as typed, to the search parameter they fill
+QUERY_FIELDS = {
+    "name": "name",
+    "email": "email",
+    "phone number": "phone",
+    "phone": "phone",
+    "skills": "skills",
+    "location": "location",
+    "education": "education",
+    "role": "role",
+}
+
+# Single-pass tokenizer; each match consumes the whitespace before its token. Tags are
+# case-insensitive whole words and may carry a ^weight and a colon; operators are
+# upper-case only, so "research and development" stays text.
+TOKEN_PATTERN = re.compile(
+    r"""
+    \s*(?:
+      (?P<field>(?i:phone\s+number|phone|name|email|skills|location|education|role))
+          (?:\^(?P<weight>\d+(?:\.\d+)?))?(?=[\s:,"]|$):?
+    | "(?P<phrase>[^"]*)(?P<closed>"?)
+    | (?P<op>AND|OR|NOT)(?=[\s,"]|$)
+    | (?P<comma>,)
+    | (?P<word>[^\s,"]+)
+    )
+    """,
+    re.VERBOSE,
+)
+
+# Trailing sentence punctuation is dropped from unquoted terms; + and # are kept for C++/C#
+TRAILING_PUNCTUATION = re.compile(r"[.;:!?]+$")
+
+
+# Query Syntax Error Class
+class QuerySyntaxError(ValueError):
+    """Raised for a search query the compiler cannot make sense of"""
+
+
+# Query AST
+@dataclass(frozen=True)
+class Term:
+    text: str
+    phrase: bool = False
+
+
+@dataclass(frozen=True)
+class FieldClause:
+    """One tag and its terms: any_of are scored, all_of must match, none_of must not"""
+
+    field: str
+    weight: Optional[float] = None
+    any_of: Tuple[Term, ...] = ()
+    all_of: Tuple[Term, ...] = ()
+    none_of: Tuple[Term, ...] = ()
+
+
+@dataclass(frozen=True)
+class SearchQuery:
+    clauses: Tuple[FieldClause, ...] = ()
+
+    # To Search Params
+    def to_search_params(self) -> Dict[str, Any]:
+        """
+        Lower the AST to the engine's search parameters: a flat list of terms per field
+        (scored and required terms, as the original parser produced) plus required,
+        excluded and weights entries only when the query uses them.
+        """
+        params: Dict[str, Any] = {}
+        required: Dict[str, List[str]] = {}
+        excluded: Dict[str, List[str]] = {}
+        weights: Dict[str, float] = {}
+
+        def extend(target, field, terms):
+            values = target.setdefault(field, [])
+            for term in terms:
+                if term.text not in values:
+                    values.append(term.text)
+
+        for clause in self.clauses:
+            if clause.any_of or clause.all_of:
+                extend(params, clause.field, clause.any_of + clause.all_of)
+            if clause.all_of:
+                extend(required, clause.field, clause.all_of)
+            if clause.none_of:
+                extend(excluded, clause.field, clause.none_of)
+            if clause.weight is not None:
+                weights[clause.field] = clause.weight
+
+        if required:
+            params["required"] = required
+        if excluded:
+            params["excluded"] = excluded
+        if weights:
+            params["weights"] = weights
+        return params
+
+
+# Tokenize
+def tokenize(query: str) -> Iterator[Tuple[str, Any]]:
+    """Yield (kind, value) tokens"""
+    for match in TOKEN_PATTERN.finditer(query):
+        field, phrase, op, comma, word = match.group("field", "phrase", "op", "comma", "word")
+        if field is not None:
+            tag = " ".join(field.lower().split())
+            weight = match.group("weight")
+            yield "field", (QUERY_FIELDS[tag], float(weight) if weight else None)
+        elif phrase is not None:
+            if not match.group("closed"):
+                raise QuerySyntaxError("Unterminated quoted phrase")
+            yield "phrase", phrase
+        elif op is not None:
+            yield "op", op
+        elif comma is not None:
+            yield "comma", comma
+        elif word is not None:
+            yield "word", word
+
+
+# Clause Builder Class
+class _ClauseBuilder:
+    """Collects the terms of one tag and applies AND/OR/NOT as they arrive"""
+
+    def __init__(self, field: str, weight: Optional[float]):
+        if weight is not None and field not in FIELD_SCORES:
+            raise QuerySyntaxError(f"{field} is not scored and cannot be weighted")
+        self.field = field
+        self.weight = weight
+        self.words: List[str] = []
+        # [term, required, excluded] in query order
+        self.terms: List[list] = []
+        self.pending_and = False
+        self.pending_not = False
+
+    def word(self, word: str):
+        self.words.append(word)
+
+    def operator(self, op: str):
+        self.flush()
+        if op in ("AND", "NOT") and self.field not in CONSTRAINT_FIELDS:
+            raise QuerySyntaxError(f"{op} is only supported for {', '.join(CONSTRAINT_FIELDS)}")
+        if op == "AND":
+            self.pending_and = True
+        elif op == "NOT":
+            self.pending_not = True
+
+    def add(self, term: Term):
+        if not term.text:
+            return
+        excluded, self.pending_not = self.pending_not, False
+        required = self.pending_and and not excluded
+        if self.pending_and and self.terms and not self.terms[-1][2]:
+            # AND requires the terms on both sides
+            self.terms[-1][1] = True
+        self.pending_and = False
+        self.terms.append([term, required, excluded])
+
+    def flush(self):
+        if self.words:
+            text = TRAILING_PUNCTUATION.sub("", " ".join(self.words)).strip()
+            self.words = []
+            self.add(Term(text.lower()))
+
+    def build(self) -> FieldClause:
+        self.flush()
+        if self.pending_not:
+            raise QuerySyntaxError("NOT must be followed by a term")
+        return FieldClause(
+            field=self.field,
+            weight=self.weight,
+            any_of=tuple(term for term, required, excluded in self.terms if not (required or excluded)),
+            all_of=tuple(term for term, required, excluded in self.terms if required),
+            none_of=tuple(term for term, required, excluded in self.terms if excluded),
+        )
+
+
+# Parse Search Query
+def parse_search_query(query: str) -> SearchQuery:
+    """
+    Parse a search query into its AST.
+
+    Text after a tag belongs to that tag until the next one. Commas and OR separate
+    terms, AND makes the terms on both sides required, NOT excludes the next term and
+    "quoted phrases" keep commas, operators and tag words as text. Text before the
+    first tag is ignored. A query of excluded terms alone is rejected.
+
+    Example: 'skills^2 python AND django, NOT php role "data engineer" location pune'
+    """
+    clauses = []
+    builder = None
+    for kind, value in tokenize(query):
+        if kind == "field":
+            if builder:
+                clauses.append(builder.build())
+            builder = _ClauseBuilder(*value)
+        elif builder is None:
+            continue
+        elif kind == "word":
+            builder.word(value)
+        elif kind == "phrase":
+            builder.flush()
+            builder.add(Term(value.strip().lower(), phrase=True))
+        elif kind == "comma":
+            builder.flush()
+        else:
+            builder.operator(value)
+    if builder:
+        clauses.append(builder.build())
+    # Excluded terms only filter; without a term to match, every candidate would score 0
+    if any(clause.none_of for clause in clauses) and not any(
+        clause.any_of or clause.all_of for clause in clauses
+    ):
+        raise QuerySyntaxError("NOT only excludes; add a term to search for, e.g. 'skills python NOT php'")
+    return SearchQuery(clauses=tuple(clauses))
+
+
+# Compile Search Query
+@lru_cache(maxsize=1024)
+def compile_search_query(query: str) -> CompiledSearch:
+    """
+    Parse and compile a query to its search parameters, Cypher parameters and template
+    mask. Memoized on the query text, so repeated searches skip tokenizing and parsing.
+    """
+    return compile_search_params(parse_search_query(query.strip()).to_search_params())
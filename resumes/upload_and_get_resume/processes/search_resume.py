@@ -3,24 +3,575 @@ import json
 import re
 from datetime import datetime
 from neo4j import GraphDatabase
-from sentence_transformers import SentenceTransformer
 import numpy as np
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
 from typing import List, Dict, Any, Optional
 from dotenv import load_dotenv
+from upload_and_get_resume.utils.embeddings import (
+    get_sentence_model,
+    get_active_embedding_model,
+    embedding_property,
+)
 
 load_dotenv()
 NEO4jURI = os.environ.get('NEO4jURI')
 NEO4jUSER = os.environ.get('NEO4jUSER')
 NEO4jPASSWORD = os.environ.get('NEO4jPASSWORD')
 
+# Search Filter Flags
+# Each optional filter of the search query owns one bit. A search's filter-presence
+# bitmask selects one of the precompiled Cypher templates below, so every search with
+# the same shape sends byte-identical query text and reuses Neo4j's cached plan.
+SEARCH_FILTER_FLAGS = {
+    "to_exp": 1 << 0,
+    "email": 1 << 1,
+    "phone": 1 << 2,
+    "name": 1 << 3,
+    "skills": 1 << 4,
+    "role": 1 << 5,
+    "location": 1 << 6,
+    "education": 1 << 7,
+    # Required (AND) and excluded (NOT) terms of the query language
+    "constraints": 1 << 8,
+}
+
+# Score of each weightable field in the total score
+FIELD_SCORES = {
+    "skills": "skill_score",
+    "role": "role_score",
+    "location": "location_score",
+    "education": "education_score",
+}
+
+# Fields that take required/excluded terms, with the Cypher parameter stem of each
+CONSTRAINT_FIELDS = {
+    "skills": "skills",
+    "role": "roles",
+    "location": "locations",
+    "education": "education",
+}
+
+
+# Has Constraints
+def has_constraints(search_params: Dict[str, Any]) -> bool:
+    """Whether the search carries any required or excluded terms"""
+    return any(
+        search_params.get(kind, {}).get(field)
+        for kind in ("required", "excluded")
+        for field in CONSTRAINT_FIELDS
+    )
+
+
+# Search Filter Mask
+def search_filter_mask(
+    search_params: Dict[str, Any], to_experience: Optional[float] = None
+) -> int:
+    """Return the filter-presence bitmask for the given search parameters"""
+    mask = 0
+    if to_experience is not None and to_experience > 0:
+        mask |= SEARCH_FILTER_FLAGS["to_exp"]
+    for key, flag in SEARCH_FILTER_FLAGS.items():
+        if key not in ("to_exp", "constraints") and search_params.get(key):
+            mask |= flag
+    if has_constraints(search_params):
+        mask |= SEARCH_FILTER_FLAGS["constraints"]
+    return mask
+
+
+# Render Search Query
+def _render_search_query(mask: int) -> str:
+    """Render the parameterized Cypher search query for one filter-presence bitmask"""
+
+    def has(key):
+        return bool(mask & SEARCH_FILTER_FLAGS[key])
+
+    query_parts = []
+
+    # Base query
+    query_parts.append(
+        """
+        MATCH (c:Candidate)
+        WHERE c.yearsOfExperience >= $from_exp
+        """
+    )
+
+    if has("to_exp"):
+        query_parts.append("AND c.yearsOfExperience <= $to_exp")
+
+    if has("email"):
+        query_parts.append("AND toLower(c.email) CONTAINS toLower($email)")
+
+    if has("phone"):
+        query_parts.append("AND c.phoneNumber CONTAINS ($phone)")
+
+    if has("name"):
+        query_parts.append("AND toLower(c.name) CONTAINS toLower($name)")
+
+    # Collect additional data
+    query_parts.append(
+        """
+        // Collect skills
+        OPTIONAL MATCH (c)-[:HAS_SKILL]->(s:Skill)
+        WITH c, collect(DISTINCT s.skillName) as all_skills
+        
+        // Collect matched skills if searching by skills
+        """
+    )
+
+    if has("skills"):
+        query_parts.append(
+            """
+            OPTIONAL MATCH (c)-[:HAS_SKILL]->(ms:Skill)
+            WHERE toLower(ms.skillName) IN $skills_lower
+            WITH c, all_skills, collect(DISTINCT ms.skillName) as matched_skills
+            """
+        )
+    else:
+        query_parts.append("WITH c, all_skills, [] as matched_skills")
+
+    # Collect roles (current designation and suitable roles)
+    query_parts.append(
+        """
+        // Collect current designation
+        OPTIONAL MATCH (c)-[:HAS_DESIGNATION]->(d:Designation)
+        WITH c, all_skills, matched_skills, d.name as current_designation
+        
+        // Collect suitable roles
+        OPTIONAL MATCH (c)-[:SUITABLE_FOR]->(r:Role)
+        WITH c, all_skills, matched_skills, current_designation, 
+             collect(DISTINCT r.roleName) as suitable_roles
+        
+        // Combine current designation and suitable roles
+        WITH c, all_skills, matched_skills, current_designation, suitable_roles,
+             CASE 
+                WHEN current_designation IS NOT NULL 
+                THEN [current_designation] + suitable_roles 
+                ELSE suitable_roles 
+             END as all_roles
+        """
+    )
+
+    # Match roles if searching by roles
+    if has("role"):
+        query_parts.append(
+            """
+            WITH c, all_skills, matched_skills, current_designation, all_roles,
+                 [role in $roles_lower WHERE 
+                  ANY(candidate_role in all_roles WHERE 
+                      toLower(candidate_role) CONTAINS role OR 
+                      role CONTAINS toLower(candidate_role)
+                  )
+                 ] as matched_roles
+            """
+        )
+    else:
+        query_parts.append(
+            "WITH c, all_skills, matched_skills, current_designation, all_roles, [] as matched_roles"
+        )
+
+    # Collect locations
+    query_parts.append(
+        """
+        // Collect locations
+        OPTIONAL MATCH (c)-[:LOCATED_IN]->(l:Location)
+        WITH c, all_skills, matched_skills, current_designation, all_roles, matched_roles,
+             collect(DISTINCT {
+                 name: l.name, 
+                 city: l.city, 
+                 state: l.state,
+                 country: l.country,
+                 type: CASE 
+                     WHEN EXISTS((c)-[:LOCATED_IN {locationType: 'current'}]->(l)) 
+                     THEN 'current' 
+                     ELSE 'preferred' 
+                 END
+             }) as locations
+        """
+    )
+
+    # Collect education
+    query_parts.append(
+        """
+        // Collect education
+        OPTIONAL MATCH (c)-[:STUDIED_AT]->(e:Education)
+        WITH c, all_skills, matched_skills, current_designation, all_roles, matched_roles, locations,
+             collect(DISTINCT {
+                 institution: e.institutionName,
+                 degree: e.degree,
+                 grades: e.grades
+             }) as education
+        """
+    )
+
+    # Collect companies
+    query_parts.append(
+        """
+        // Collect companies
+        OPTIONAL MATCH (c)-[:WORKED_AT|WORKING_WORKED_AT]->(comp:Company)
+        WITH c, all_skills, matched_skills, current_designation, all_roles, matched_roles, 
+             locations, education,
+             collect(DISTINCT comp.companyName) as companies
+        """
+    )
+
+    # Apply location and/or education filters if specified
+    location_filter = """
+            ANY(loc IN locations WHERE 
+                ANY(search_loc IN $locations_lower WHERE 
+                    toLower(loc.name) CONTAINS search_loc OR
+                    toLower(loc.city) CONTAINS search_loc OR
+                    toLower(loc.state) CONTAINS search_loc OR
+                    toLower(loc.country) CONTAINS search_loc
+                )
+            )
+            """
+    education_filter = """
+            ANY(edu IN education WHERE 
+                ANY(search_edu IN $education_lower WHERE 
+                    toLower(edu.institution) CONTAINS search_edu OR
+                    toLower(edu.degree) CONTAINS search_edu
+                )
+            )
+            """
+    # Every candidate property is coalesced so NOT ANY(...) never sees a null
+    role_term = """ANY(r IN all_roles WHERE
+                    toLower(r) CONTAINS term OR term CONTAINS toLower(r))"""
+    location_term = """ANY(loc IN locations WHERE
+                    toLower(coalesce(loc.name, '')) CONTAINS term OR
+                    toLower(coalesce(loc.city, '')) CONTAINS term OR
+                    toLower(coalesce(loc.state, '')) CONTAINS term OR
+                    toLower(coalesce(loc.country, '')) CONTAINS term)"""
+    education_term = """ANY(edu IN education WHERE
+                    toLower(coalesce(edu.institution, '')) CONTAINS term OR
+                    toLower(coalesce(edu.degree, '')) CONTAINS term)"""
+    constraints_filter = f"""
+            ALL(term IN $required_skills WHERE ANY(s IN all_skills WHERE toLower(s) = term))
+            AND NONE(term IN $excluded_skills WHERE ANY(s IN all_skills WHERE toLower(s) = term))
+            AND ALL(term IN $required_roles WHERE {role_term})
+            AND NONE(term IN $excluded_roles WHERE {role_term})
+            AND ALL(term IN $required_locations WHERE {location_term})
+            AND NONE(term IN $excluded_locations WHERE {location_term})
+            AND ALL(term IN $required_education WHERE {education_term})
+            AND NONE(term IN $excluded_education WHERE {education_term})
+            """
+    filters = []
+    if has("location"):
+        filters.append(location_filter)
+    if has("education"):
+        filters.append(education_filter)
+    if has("constraints"):
+        filters.append(constraints_filter)
+    if filters:
+        query_parts.append("WHERE" + "AND".join(filters))
+
+    # Return results
+    query_parts.append(
+        """
+        RETURN c as candidate, 
+               all_skills as total_skills,
+               matched_skills,
+               current_designation,
+               matched_roles,
+               all_roles,
+               locations,
+               education,
+               companies
+        """
+    )
+
+    return "\n".join(query_parts)
+
+
+# Search Query Templates
+# Built once at import: one parameterized query per filter-presence bitmask.
+SEARCH_QUERY_TEMPLATES = tuple(
+    _render_search_query(mask) for mask in range(1 << len(SEARCH_FILTER_FLAGS))
+)
+
+
+# Prepare Query Parameters
+def prepare_query_params(search_params: Dict[str, Any]) -> Dict[str, Any]:
+    """Prepare query parameters with lowercase versions for case-insensitive search"""
+    params = {}
+
+    if "email" in search_params and search_params["email"]:
+        # Handle both string and list for email
+        if isinstance(search_params["email"], list):
+            params["email"] = (
+                search_params["email"][0] if search_params["email"] else None
+            )
+        else:
+            params["email"] = search_params["email"]
+
+    if "phone" in search_params and search_params["phone"]:
+        # Handle both string and list for phone
+        if isinstance(search_params["phone"], list):
+            
+            params["phone"] = " ".join(search_params["phone"]).strip()
+        else:
+            params["phone"] = search_params["phone"].strip()
+            
+        print(params["phone"])
+
+    if "name" in search_params and search_params["name"]:
+        # Handle both string and list for name
+        if isinstance(search_params["name"], list):
+            
+            params["name"] = " ".join(search_params["name"]).strip()
+        else:
+            
+            params["name"] = search_params["name"].strip()
+        
+
+    if "skills" in search_params and search_params["skills"]:
+        # Ensure skills is a list
+        if isinstance(search_params["skills"], str):
+            params["skills_lower"] = [search_params["skills"].lower()]
+        else:
+            params["skills_lower"] = [
+                skill.lower() for skill in search_params["skills"]
+            ]
+
+    if "role" in search_params and search_params["role"]:
+        # Ensure role is a list
+        if isinstance(search_params["role"], str):
+            params["roles_lower"] = [search_params["role"].lower()]
+        else:
+            params["roles_lower"] = [role.lower() for role in search_params["role"]]
+
+    if "location" in search_params and search_params["location"]:
+        # Ensure location is a list
+        if isinstance(search_params["location"], str):
+            params["locations_lower"] = [search_params["location"].lower()]
+        else:
+            params["locations_lower"] = [
+                loc.lower() for loc in search_params["location"]
+            ]
+
+    if "education" in search_params and search_params["education"]:
+        # Ensure education is a list
+        if isinstance(search_params["education"], str):
+            params["education_lower"] = [search_params["education"].lower()]
+        else:
+            params["education_lower"] = [
+                edu.lower() for edu in search_params["education"]
+            ]
+
+    if has_constraints(search_params):
+        # The constraints template references every list, so absent ones are sent empty
+        for kind in ("required", "excluded"):
+            terms = search_params.get(kind, {})
+            for field, stem in CONSTRAINT_FIELDS.items():
+                params[f"{kind}_{stem}"] = [term.lower() for term in terms.get(field, [])]
+
+    return params
+
+
+# Compiled Search Class
+@dataclass(frozen=True)
+class CompiledSearch:
+    """
+    A search reduced to what the engine sends to Neo4j: the parsed parameters,
+    the Cypher parameters derived from them and the template's filter bitmask.
+    Instances are shared by the query compiler's cache, so treat them as read-only.
+    """
+
+    search_params: Dict[str, Any]
+    parameters: Dict[str, Any]
+    mask: int
+
+    # Template
+    def template(self, to_experience: Optional[float] = None) -> str:
+        """The precompiled Cypher template, adding the upper experience bound if set"""
+        if to_experience is not None and to_experience > 0:
+            return SEARCH_QUERY_TEMPLATES[self.mask | SEARCH_FILTER_FLAGS["to_exp"]]
+        return SEARCH_QUERY_TEMPLATES[self.mask]
+
+
+# Compile Search Params
+def compile_search_params(search_params: Dict[str, Any]) -> CompiledSearch:
+    """Derive the Cypher parameters and template mask of parsed search parameters"""
+    return CompiledSearch(
+        search_params=search_params,
+        parameters=prepare_query_params(search_params),
+        mask=search_filter_mask(search_params),
+    )
+
+
+# Timed Stage
+@contextmanager
+def timed_stage(trace: Optional[Dict[str, Any]], stage: str):
+    """Add the wall-clock time of the wrapped block to trace["timings_ms"][stage]"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        if trace is not None:
+            timings = trace.setdefault("timings_ms", {})
+            timings[stage] = timings.get(stage, 0.0) + (time.perf_counter() - start) * 1000
+
+
+# Summarise Profile
+def summarise_profile(profile: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Flatten a Neo4j PROFILE plan into per-operator db hits and rows"""
+    if not profile:
+        return None
+
+    operators = []
+
+    def walk(plan, depth):
+        operators.append(
+            {
+                "operator": plan.get("operatorType"),
+                "depth": depth,
+                "db_hits": plan.get("dbHits", 0),
+                "rows": plan.get("rows", 0),
+                "details": plan.get("args", {}).get("Details"),
+            }
+        )
+        for child in plan.get("children", []):
+            walk(child, depth + 1)
+
+    walk(profile, 0)
+    return {
+        "total_db_hits": sum(op["db_hits"] for op in operators),
+        "operators": operators,
+    }
+
+
+# Candidate Meets Constraints
+def candidate_meets_constraints(row: Dict[str, Any], query_params: Dict[str, Any]) -> bool:
+    """Python mirror of the constraints template's required/excluded term filter"""
+    skills = {skill.lower() for skill in row.get("total_skills", []) if skill}
+    roles = [role.lower() for role in row.get("all_roles", []) if role]
+    locations = [
+        [(loc.get(field) or "").lower() for field in ("name", "city", "state", "country")]
+        for loc in row.get("locations", [])
+    ]
+    education = [
+        [(edu.get(field) or "").lower() for field in ("institution", "degree")]
+        for edu in row.get("education", [])
+    ]
+    matchers = {
+        "skills": lambda term: term in skills,
+        "roles": lambda term: any(term in role or role in term for role in roles),
+        "locations": lambda term: any(term in value for loc in locations for value in loc),
+        "education": lambda term: any(term in value for edu in education for value in edu),
+    }
+    for stem, matches in matchers.items():
+        if not all(matches(term) for term in query_params.get(f"required_{stem}", [])):
+            return False
+        if any(matches(term) for term in query_params.get(f"excluded_{stem}", [])):
+            return False
+    return True
+
+
+# Match Candidate Row
+def match_candidate_row(
+    row: Dict[str, Any],
+    query_params: Dict[str, Any],
+    from_experience: float = 0,
+    to_experience: Optional[float] = None,
+) -> Optional[Dict[str, Any]]:
+    """
+    Apply a search's filters to an unfiltered candidate row in Python.
+
+    Mirrors the WHERE clauses and matched_skills/matched_roles of the Cypher
+    templates, so one Candidate scan can be scored against many searches.
+
+    Args:
+        row: Row of the unfiltered template (candidate, total_skills, all_roles, ...)
+        query_params: Output of CandidateSearchEngine._prepare_query_params
+        from_experience: Minimum years of experience
+        to_experience: Maximum years of experience (0/None for no upper limit)
+
+    Returns:
+        The row extended with matched_skills and matched_roles, or None if filtered out
+    """
+    candidate = row["candidate"]
+    years = candidate.get("yearsOfExperience")
+    if years is None or years < from_experience:
+        return None
+    if to_experience and years > to_experience:
+        return None
+
+    email = query_params.get("email")
+    if email and email.lower() not in (candidate.get("email") or "").lower():
+        return None
+    phone = query_params.get("phone")
+    if phone and phone not in (candidate.get("phoneNumber") or ""):
+        return None
+    name = query_params.get("name")
+    if name and name.lower() not in (candidate.get("name") or "").lower():
+        return None
+
+    locations_lower = query_params.get("locations_lower")
+    if locations_lower and not any(
+        search_loc in (loc.get(field) or "").lower()
+        for loc in row.get("locations", [])
+        for search_loc in locations_lower
+        for field in ("name", "city", "state", "country")
+    ):
+        return None
+
+    education_lower = query_params.get("education_lower")
+    if education_lower and not any(
+        search_edu in (edu.get(field) or "").lower()
+        for edu in row.get("education", [])
+        for search_edu in education_lower
+        for field in ("institution", "degree")
+    ):
+        return None
+
+    if "required_skills" in query_params and not candidate_meets_constraints(row, query_params):
+        return None
+
+    skills_lower = query_params.get("skills_lower") or []
+    matched_skills = [
+        skill for skill in row.get("total_skills", []) if skill.lower() in skills_lower
+    ]
+    all_roles = [role.lower() for role in row.get("all_roles", []) if role]
+    matched_roles = [
+        role
+        for role in query_params.get("roles_lower") or []
+        if any(role in candidate_role or candidate_role in role for candidate_role in all_roles)
+    ]
+
+    return {**row, "matched_skills": matched_skills, "matched_roles": matched_roles}
+
+
+# Collapse Near Duplicates
+def collapse_near_duplicates(candidates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Keep the best-scoring candidate of each near-duplicate group (same canonical id).
+    The kept result lists the candidate ids it stands for in near_duplicate_ids.
+    """
+    kept = {}
+    for candidate in candidates:
+        key = candidate.get("canonical_id") or candidate["candidate_id"]
+        if key in kept:
+            kept[key]["near_duplicate_ids"].append(candidate["candidate_id"])
+        else:
+            kept[key] = {**candidate, "near_duplicate_ids": []}
+    return list(kept.values())
+
+
 # Candidate Search Engine Class
 class CandidateSearchEngine:
-    def __init__(self, uri=NEO4jURI, user=NEO4jUSER, password=NEO4jPASSWORD):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
-        self.model = SentenceTransformer("all-MiniLM-L6-v2")
+    def __init__(self, uri=NEO4jURI, user=NEO4jUSER, password=NEO4jPASSWORD, driver=None):
+        # An existing driver can be shared (e.g. by the ingest path); it is then not closed here
+        self._owns_driver = driver is None
+        self.driver = driver or GraphDatabase.driver(uri, auth=(user, password))
+        # Queries are embedded with the active model and compared with its property
+        self.embedding_model = get_active_embedding_model(self.driver)
+        self.embedding_property = embedding_property(self.embedding_model)
+        self.model = get_sentence_model(self.embedding_model)
 
     def close(self):
-        self.driver.close()
+        if self._owns_driver:
+            self.driver.close()
 
     # Get Embedding (Async)
     async def get_embedding(self, text):
@@ -56,13 +607,17 @@ class CandidateSearchEngine:
         from_experience: float = 0,
         to_experience: Optional[float] = None,
         top_k: int = 20,
-        similarity_threshold = 0.4
+        similarity_threshold = 0.4,
+        explain: bool = False,
+        trace: Optional[Dict[str, Any]] = None,
+        collapse_duplicates: bool = False,
     ) -> List[Dict[str, Any]]:
         """
         Search candidates based on multiple criteria including similarity search
 
         Args:
-            search_params: Dictionary containing search criteria
+            search_params: Dictionary containing search criteria, or the CompiledSearch
+                the query compiler produced for it
                 - skills: List of skills to search
                 - role: List of roles to search (current and suitable)
                 - location: List of locations to search
@@ -70,14 +625,53 @@ class CandidateSearchEngine:
                 - phone: Phone number to search
                 - education: List of education criteria
                 - name: Name to search
+                - required/excluded: Field to terms every match must/must not have
+                - weights: Field to multiplier of that field's score weight
             from_experience: Minimum years of experience
             to_experience: Maximum years of experience (None for no upper limit)
             top_k: Number of top candidates to return
+            explain: Run the query under PROFILE and record the Cypher and plan in trace
+            trace: Optional dict that receives per-stage timings and row counts
+            collapse_duplicates: Return one result per group of near-duplicate resumes
 
         Returns:
             List of candidates with match scores
         """
 
+        if isinstance(search_params, CompiledSearch):
+            compiled = search_params
+        else:
+            compiled = compile_search_params(search_params)
+        search_text = self._build_search_text(compiled.search_params)
+
+        with timed_stage(trace, "embedding"):
+            search_embedding = (
+                await self.get_embedding(search_text) if search_text else None
+            )
+
+        # Build and execute the search query
+        candidates = await self._execute_search_query(
+            compiled,
+            from_experience,
+            to_experience,
+            search_embedding,
+            similarity_threshold,
+            explain=explain,
+            trace=trace,
+        )
+
+        # Sort candidates by total score and return top_k
+        with timed_stage(trace, "sorting"):
+            sorted_candidates = sorted(
+                candidates, key=lambda x: x["total_score"], reverse=True
+            )
+            if collapse_duplicates:
+                sorted_candidates = collapse_near_duplicates(sorted_candidates)
+        return sorted_candidates[:top_k]
+    
+    # Build Search Text
+    def _build_search_text(self, search_params: Dict[str, Any]) -> str:
+        """Build the free text that is embedded for similarity search"""
         search_text_parts = []
 
         if "skills" in search_params and search_params["skills"]:
@@ -97,412 +691,258 @@ class CandidateSearchEngine:
         if "email" in search_params and search_params["email"]:
             search_text_parts.append(f"Email: {', '.join(search_params['email'])}")
 
-        search_text = " ".join(search_text_parts)
-
-        search_embedding = (
-            await self.get_embedding(search_text) if search_text else None
-        )
-
-        # Build and execute the search query
-        candidates = await self._execute_search_query(
-            search_params, from_experience, to_experience, search_embedding,similarity_threshold
-        )
+        return " ".join(search_text_parts)
 
-        # Sort candidates by total score and return top_k
-        sorted_candidates = sorted(
-            candidates, key=lambda x: x["total_score"], reverse=True
-        )
-        return sorted_candidates[:top_k]
-    
     # Execute Search Query (Async)
     async def _execute_search_query(
         self,
-        search_params: Dict[str, Any],
+        compiled: CompiledSearch,
         from_experience: float,
         to_experience: Optional[float],
         search_embedding: Optional[List[float]],
-        similarity_threshold=0.4
+        similarity_threshold=0.4,
+        explain: bool = False,
+        trace: Optional[Dict[str, Any]] = None,
     ) -> List[Dict[str, Any]]:
         """Execute the search query and calculate scores"""
 
-        # with self.driver.session() as session:
-        #     results = session.run(
-        #         """
-        #             MATCH (c:Candidate)
-        #             WHERE c.yearsOfExperience >= 0
-        #             AND c.yearsOfExperience <= 999
-        #             AND toLower(c.email) CONTAINS toLower('@gmail.com')
-        #             AND c.phoneNumber CONTAINS '+9185'
-        #             AND toLower(c.name) CONTAINS toLower('Aagam Sheth')
-        #             RETURN c.name
-        #         """
-        #     )
-        #     for record in results:
-        #         print(record)
+        search_params = compiled.search_params
         with self.driver.session() as session:
-            # Build the main query
-            query = self._build_search_query(
-                search_params, from_experience, to_experience
-            )
-            # print(
-            #     "Query parameters:",
-            #     {
-            #         "from_exp": from_experience,
-            #         "to_exp": to_experience if to_experience else 999,
-            #         **self._prepare_query_params(search_params),
-            #     },
-            # )
-
-            # Execute query
-            results = session.run(
-                query,
-                {
-                    "from_exp": from_experience,
-                    "to_exp": to_experience if to_experience else 999,
-                    **self._prepare_query_params(search_params),
-                },
-            )
+            # Select the main query
+            query = compiled.template(to_experience)
+            params = {
+                "from_exp": from_experience,
+                "to_exp": to_experience if to_experience else 999,
+                **compiled.parameters,
+            }
+
+            # Execute query and fetch all rows
+            with timed_stage(trace, "cypher_execution"):
+                results = session.run("PROFILE " + query if explain else query, params)
+                records = list(results)
+                summary = results.consume()
+
+            # Decode candidate nodes
+            with timed_stage(trace, "record_decoding"):
+                decoded = [(dict(record["candidate"]), record) for record in records]
 
             candidates = []
-            for record in results:
-                candidate_data = dict(record["candidate"])
+            with timed_stage(trace, "scoring"):
+                for candidate_data, record in decoded:
+                    # Calculate match scores
+                    scores = self._calculate_match_scores(
+                        record,
+                        search_params,
+                        search_embedding,
+                        candidate_data.get(self.embedding_property),
+                    )
 
-                # Calculate match scores
-                scores = self._calculate_match_scores(
-                    record,
-                    search_params,
-                    search_embedding,
-                    candidate_data.get("embedding"),
-                )
-                
-                # Prepare candidate result
-                
-                if scores["total_score"] >= similarity_threshold:
-                    # if True:
-                    candidate_result = {
-                        "candidate_id": candidate_data.get("candidateId"),
-                        "name": candidate_data.get("name"),
-                        "email": candidate_data.get("email"),
-                        "phone": candidate_data.get("phoneNumber"),
-                        "years_experience": candidate_data.get("yearsOfExperience"),
-                        "resume_path": candidate_data.get("resumePath"),
-                        "json_path": candidate_data.get("jsonPath"),
-                        "matched_skills": record.get("matched_skills", []),
-                        "total_skills": record.get("total_skills", []),
-                        "matched_roles": record.get("matched_roles", []),
-                        "current_designation": record.get("current_designation"),
-                        "locations": record.get("locations", []),
-                        "education": record.get("education", []),
-                        "companies": record.get("companies", []),
-                        # "current_company": record.get("companies", [None,'Fresher'])[0],
-                        **scores,
-                    }
-
-                    candidates.append(candidate_result)
+                    # Prepare candidate result
+                    if scores["total_score"] >= similarity_threshold:
+                        candidate_result = self._format_candidate_result(
+                            candidate_data, record, scores
+                        )
+
+                        candidates.append(candidate_result)
+
+            if trace is not None:
+                trace["rows_scanned"] = len(records)
+                trace["rows_matched"] = len(candidates)
+                trace["threshold_rejections"] = len(records) - len(candidates)
+                trace["server_timings_ms"] = {
+                    "result_available_after": summary.result_available_after,
+                    "result_consumed_after": summary.result_consumed_after,
+                }
+                if explain:
+                    trace["cypher"] = query
+                    trace["parameters"] = params
+                    trace["profile"] = summarise_profile(summary.profile)
 
             return candidates
-    # Build Search Query
-    def _build_search_query(
-        self,
-        search_params: Dict[str, Any],
-        from_experience: float,
-        to_experience: Optional[float],
-    ) -> str:
-        """Build the Cypher query for searching candidates"""
 
-        query_parts = []
+    # Format Candidate Result
+    def _format_candidate_result(
+        self, candidate_data: Dict[str, Any], record: Any, scores: Dict[str, float]
+    ) -> Dict[str, Any]:
+        """Shape a scored candidate row into the search API's result format"""
+        return {
+            "candidate_id": candidate_data.get("candidateId"),
+            "canonical_id": candidate_data.get("canonicalId") or candidate_data.get("candidateId"),
+            "name": candidate_data.get("name"),
+            "email": candidate_data.get("email"),
+            "phone": candidate_data.get("phoneNumber"),
+            "years_experience": candidate_data.get("yearsOfExperience"),
+            "resume_path": candidate_data.get("resumePath"),
+            "json_path": candidate_data.get("jsonPath"),
+            "matched_skills": record.get("matched_skills", []),
+            "total_skills": record.get("total_skills", []),
+            "matched_roles": record.get("matched_roles", []),
+            "current_designation": record.get("current_designation"),
+            "locations": record.get("locations", []),
+            "education": record.get("education", []),
+            "companies": record.get("companies", []),
+            # "current_company": record.get("companies", [None,'Fresher'])[0],
+            **scores,
+        }
 
-        # Base query
-        query_parts.append(
-            """
-        MATCH (c:Candidate)
-        WHERE c.yearsOfExperience >= $from_exp
+    # Find Candidates Missing Fields
+    def find_candidates_missing(
+        self, fields: List[str], match_all: bool = True, limit: int = 100
+    ) -> List[Dict[str, Any]]:
         """
-        )
+        Return candidates whose resume did not provide the given fields.
 
-        if to_experience is not None and to_experience > 0:
-            query_parts.append("AND c.yearsOfExperience <= $to_exp")
-
-        if "email" in search_params and search_params["email"]:
-            query_parts.append("AND toLower(c.email) CONTAINS toLower($email)")
-
-        if "phone" in search_params and search_params["phone"]:
-
-            query_parts.append("AND c.phoneNumber CONTAINS ($phone)")
-
-        if "name" in search_params and search_params["name"]:
-            query_parts.append("AND toLower(c.name) CONTAINS toLower($name)")
-
-        # Collect additional data
-        query_parts.append(
-            """
-        // Collect skills
-        OPTIONAL MATCH (c)-[:HAS_SKILL]->(s:Skill)
-        WITH c, collect(DISTINCT s.skillName) as all_skills
-        
-        // Collect matched skills if searching by skills
+        Args:
+            fields: Field names as recorded in Candidate.missingFields (e.g. 'age', 'projects')
+            match_all: Require every field to be missing instead of any of them
+            limit: Maximum number of candidates to return
         """
-        )
-
-        if "skills" in search_params and search_params["skills"]:
-            query_parts.append(
-                """
-            OPTIONAL MATCH (c)-[:HAS_SKILL]->(ms:Skill)
-            WHERE toLower(ms.skillName) IN $skills_lower
-            WITH c, all_skills, collect(DISTINCT ms.skillName) as matched_skills
-            """
+        predicate = "all" if match_all else "any"
+        with self.driver.session() as session:
+            results = session.run(
+                f"""
+                MATCH (c:Candidate)
+                WHERE {predicate}(field IN $fields WHERE field IN c.missingFields)
+                RETURN c, c.missingFields as missing_fields
+                ORDER BY c.createdDate DESC
+                LIMIT $limit
+                """,
+                {"fields": fields, "limit": limit},
             )
-        else:
-            query_parts.append("WITH c, all_skills, [] as matched_skills")
+            return [
+                {
+                    "candidate_id": record["c"].get("candidateId"),
+                    "name": record["c"].get("name"),
+                    "email": record["c"].get("email"),
+                    "years_experience": record["c"].get("yearsOfExperience"),
+                    "resume_path": record["c"].get("resumePath"),
+                    "missing_fields": record["missing_fields"],
+                }
+                for record in results
+            ]
+
+    # Get Embeddings in one batch (Async)
+    async def get_embeddings(self, texts: List[str]) -> np.ndarray:
+        """Generate normalized embeddings for many texts in a single encode call"""
+        try:
+            return self.model.encode(texts, normalize_embeddings=True)
+        except Exception as e:
+            print(f"[ERROR] Batch embedding generation failed: {e}")
+            raise e
 
-        # Collect roles (current designation and suitable roles)
-        query_parts.append(
-            """
-        // Collect current designation
-        OPTIONAL MATCH (c)-[:HAS_DESIGNATION]->(d:Designation)
-        WITH c, all_skills, matched_skills, d.name as current_designation
-        
-        // Collect suitable roles
-        OPTIONAL MATCH (c)-[:SUITABLE_FOR]->(r:Role)
-        WITH c, all_skills, matched_skills, current_designation, 
-             collect(DISTINCT r.roleName) as suitable_roles
-        
-        // Combine current designation and suitable roles
-        WITH c, all_skills, matched_skills, current_designation, suitable_roles,
-             CASE 
-                WHEN current_designation IS NOT NULL 
-                THEN [current_designation] + suitable_roles 
-                ELSE suitable_roles 
-             END as all_roles
+    # Search Candidates for many queries at once (Async)
+    async def search_candidates_batch(
+        self, queries: List[Dict[str, Any]], top_k: int = 20
+    ) -> List[List[Dict[str, Any]]]:
         """
-        )
+        Search the candidate pool against many queries with a single Candidate scan
 
-        # Match roles if searching by roles
-        if "role" in search_params and search_params["role"]:
-            query_parts.append(
-                """
-            WITH c, all_skills, matched_skills, current_designation, all_roles,
-                 [role in $roles_lower WHERE 
-                  ANY(candidate_role in all_roles WHERE 
-                      toLower(candidate_role) CONTAINS role OR 
-                      role CONTAINS toLower(candidate_role)
-                  )
-                 ] as matched_roles
-            """
-            )
-        else:
-            query_parts.append(
-                "WITH c, all_skills, matched_skills, current_designation, all_roles, [] as matched_roles"
-            )
-
-        # Collect locations
-        query_parts.append(
-            """
-        // Collect locations
-        OPTIONAL MATCH (c)-[:LOCATED_IN]->(l:Location)
-        WITH c, all_skills, matched_skills, current_designation, all_roles, matched_roles,
-             collect(DISTINCT {
-                 name: l.name, 
-                 city: l.city, 
-                 state: l.state,
-                 country: l.country,
-                 type: CASE 
-                     WHEN EXISTS((c)-[:LOCATED_IN {locationType: 'current'}]->(l)) 
-                     THEN 'current' 
-                     ELSE 'preferred' 
-                 END
-             }) as locations
-        """
-        )
+        Args:
+            queries: List of dictionaries, each containing
+                - search_params: Parsed search criteria (same as search_candidates)
+                - from_experience: Minimum years of experience
+                - to_experience: Maximum years of experience (0/None for no upper limit)
+                - similarity_threshold: Minimum total score to keep a candidate
+                - collapse_duplicates: Return one result per group of near-duplicate resumes
+            top_k: Number of top candidates to return per query
 
-        # Collect education
-        query_parts.append(
-            """
-        // Collect education
-        OPTIONAL MATCH (c)-[:STUDIED_AT]->(e:Education)
-        WITH c, all_skills, matched_skills, current_designation, all_roles, matched_roles, locations,
-             collect(DISTINCT {
-                 institution: e.institutionName,
-                 degree: e.degree,
-                 grades: e.grades
-             }) as education
+        Returns:
+            One ranked list of candidates per query, in the order of the queries
         """
+        if not queries:
+            return []
+
+        # Encode every query's search text in one batch
+        search_texts = [self._build_search_text(q["search_params"]) for q in queries]
+        to_encode = [text for text in search_texts if text]
+        encoded = await self.get_embeddings(to_encode) if to_encode else None
+        query_matrix = np.zeros(
+            (len(queries), encoded.shape[1] if encoded is not None else 0)
         )
+        has_embedding = np.array([bool(text) for text in search_texts])
+        if encoded is not None:
+            query_matrix[has_embedding] = encoded
 
-        # Collect companies
-        query_parts.append(
-            """
-        // Collect companies
-        OPTIONAL MATCH (c)-[:WORKED_AT|WORKING_WORKED_AT]->(comp:Company)
-        WITH c, all_skills, matched_skills, current_designation, all_roles, matched_roles, 
-             locations, education,
-             collect(DISTINCT comp.companyName) as companies
-        """
-        )
-        if "location" in search_params and search_params["location"] or "education" in search_params and search_params["education"]:
-            if "education" in search_params and search_params["education"] and "location" in search_params and search_params["location"]:
-                query_parts.append(
-                """
-                WHERE ANY(loc IN locations WHERE 
-                    ANY(search_loc IN $locations_lower WHERE 
-                        toLower(loc.name) CONTAINS search_loc OR
-                        toLower(loc.city) CONTAINS search_loc OR
-                        toLower(loc.state) CONTAINS search_loc OR
-                        toLower(loc.country) CONTAINS search_loc
-                    )
-                )
-                AND
-                ANY(edu IN education WHERE 
-                    ANY(search_edu IN $education_lower WHERE 
-                        toLower(edu.institution) CONTAINS search_edu OR
-                        toLower(edu.degree) CONTAINS search_edu
-                    )
-                )
-                """
-                )
-            if "location" in search_params and search_params["location"] and "education" not in search_params:
-                query_parts.append(
-                    """
-                WHERE ANY(loc IN locations WHERE 
-                    ANY(search_loc IN $locations_lower WHERE 
-                        toLower(loc.name) CONTAINS search_loc OR
-                        toLower(loc.city) CONTAINS search_loc OR
-                        toLower(loc.state) CONTAINS search_loc OR
-                        toLower(loc.country) CONTAINS search_loc
-                    )
+        # Scan candidates once with the unfiltered template
+        from_exp = min(q.get("from_experience") or 0 for q in queries)
+        with self.driver.session() as session:
+            results = session.run(
+                SEARCH_QUERY_TEMPLATES[0], {"from_exp": from_exp, "to_exp": 999}
+            )
+            rows = [
+                {
+                    "candidate": dict(record["candidate"]),
+                    "total_skills": record["total_skills"],
+                    "current_designation": record["current_designation"],
+                    "all_roles": record["all_roles"],
+                    "locations": record["locations"],
+                    "education": record["education"],
+                    "companies": record["companies"],
+                }
+                for record in results
+            ]
+
+        ranked = [[] for _ in queries]
+        if not rows:
+            return ranked
+
+        # Query-by-candidate cosine similarity matrix
+        similarity = np.zeros((len(queries), len(rows)))
+        if encoded is not None:
+            candidate_matrix = np.zeros((len(rows), query_matrix.shape[1]))
+            for j, row in enumerate(rows):
+                embedding = row["candidate"].get(self.embedding_property)
+                if embedding and len(embedding) == query_matrix.shape[1]:
+                    candidate_matrix[j] = embedding
+            norms = np.linalg.norm(candidate_matrix, axis=1)
+            norms[norms == 0] = 1.0
+            similarity = query_matrix @ (candidate_matrix / norms[:, None]).T
+
+        query_params = [self._prepare_query_params(q["search_params"]) for q in queries]
+        for j, row in enumerate(rows):
+            for i, q in enumerate(queries):
+                record = match_candidate_row(
+                    row,
+                    query_params[i],
+                    q.get("from_experience") or 0,
+                    q.get("to_experience"),
                 )
-                """
+                if record is None:
+                    continue
+                scores = self._calculate_match_scores(
+                    record,
+                    q["search_params"],
+                    None,
+                    None,
+                    similarity_score=float(similarity[i, j]) if has_embedding[i] else None,
                 )
-
-            # Apply education filter if specified
-            if "education" in search_params and search_params["education"] and "location" not in search_params:
-                query_parts.append(
-                    """
-                WHERE ANY(edu IN education WHERE 
-                    ANY(search_edu IN $education_lower WHERE 
-                        toLower(edu.institution) CONTAINS search_edu OR
-                        toLower(edu.degree) CONTAINS search_edu
+                if scores["total_score"] >= q.get("similarity_threshold", 0.4):
+                    ranked[i].append(
+                        self._format_candidate_result(row["candidate"], record, scores)
                     )
-                )
-                """
-                )
-
-
-        # Apply location filter if specified
-        # if "location" in search_params and search_params["location"]:
-        #     query_parts.append(
-        #         """
-        #     WHERE ANY(loc IN locations WHERE 
-        #         ANY(search_loc IN $locations_lower WHERE 
-        #             toLower(loc.name) CONTAINS search_loc OR
-        #             toLower(loc.city) CONTAINS search_loc OR
-        #             toLower(loc.state) CONTAINS search_loc OR
-        #             toLower(loc.country) CONTAINS search_loc
-        #         )
-        #     )
-        #     """
-        #     )
-
-        # # Apply education filter if specified
-        # if "education" in search_params and search_params["education"]:
-        #     query_parts.append(
-        #         """
-        #     WHERE ANY(edu IN education WHERE 
-        #         ANY(search_edu IN $education_lower WHERE 
-        #             toLower(edu.institution) CONTAINS search_edu OR
-        #             toLower(edu.degree) CONTAINS search_edu
-        #         )
-        #     )
-        #     """
-        #     )
-
-        # Return results
-        query_parts.append(
-            """
-        RETURN c as candidate, 
-               all_skills as total_skills,
-               matched_skills,
-               current_designation,
-               matched_roles,
-               locations,
-               education,
-               companies
-        """
-        )
-        
 
-        return "\n".join(query_parts)
+        results = []
+        for q, candidates in zip(queries, ranked):
+            candidates = sorted(candidates, key=lambda x: x["total_score"], reverse=True)
+            if q.get("collapse_duplicates"):
+                candidates = collapse_near_duplicates(candidates)
+            results.append(candidates[:top_k])
+        return results
+    # Build Search Query
+    def _build_search_query(
+        self,
+        search_params: Dict[str, Any],
+        from_experience: float,
+        to_experience: Optional[float],
+    ) -> str:
+        """Select the precompiled Cypher template matching the search's filter shape"""
+        return SEARCH_QUERY_TEMPLATES[search_filter_mask(search_params, to_experience)]
     
     # Prepare Query Parameters
     def _prepare_query_params(self, search_params: Dict[str, Any]) -> Dict[str, Any]:
         """Prepare query parameters with lowercase versions for case-insensitive search"""
-        params = {}
-
-        if "email" in search_params and search_params["email"]:
-            # Handle both string and list for email
-            if isinstance(search_params["email"], list):
-                params["email"] = (
-                    search_params["email"][0] if search_params["email"] else None
-                )
-            else:
-                params["email"] = search_params["email"]
-
-        if "phone" in search_params and search_params["phone"]:
-            # Handle both string and list for phone
-            if isinstance(search_params["phone"], list):
-                
-                params["phone"] = " ".join(search_params["phone"]).strip()
-            else:
-                params["phone"] = search_params["phone"].strip()
-                
-            print(params["phone"])
-
-        if "name" in search_params and search_params["name"]:
-            # Handle both string and list for name
-            if isinstance(search_params["name"], list):
-                
-                params["name"] = " ".join(search_params["name"]).strip()
-            else:
-                
-                params["name"] = search_params["name"].strip()
-            
-
-        if "skills" in search_params and search_params["skills"]:
-            # Ensure skills is a list
-            if isinstance(search_params["skills"], str):
-                params["skills_lower"] = [search_params["skills"].lower()]
-            else:
-                params["skills_lower"] = [
-                    skill.lower() for skill in search_params["skills"]
-                ]
-
-        if "role" in search_params and search_params["role"]:
-            # Ensure role is a list
-            if isinstance(search_params["role"], str):
-                params["roles_lower"] = [search_params["role"].lower()]
-            else:
-                params["roles_lower"] = [role.lower() for role in search_params["role"]]
-
-        if "location" in search_params and search_params["location"]:
-            # Ensure location is a list
-            if isinstance(search_params["location"], str):
-                params["locations_lower"] = [search_params["location"].lower()]
-            else:
-                params["locations_lower"] = [
-                    loc.lower() for loc in search_params["location"]
-                ]
+        return prepare_query_params(search_params)
 
-        if "education" in search_params and search_params["education"]:
-            # Ensure education is a list
-            if isinstance(search_params["education"], str):
-                params["education_lower"] = [search_params["education"].lower()]
-            else:
-                params["education_lower"] = [
-                    edu.lower() for edu in search_params["education"]
-                ]
-
-        return params
-    
     # Calculate Match Scores 
     def _calculate_match_scores(
         self,
@@ -510,8 +950,13 @@ class CandidateSearchEngine:
         search_params: Dict[str, Any],
         search_embedding: Optional[List[float]],
         candidate_embedding: Optional[List[float]],
+        similarity_score: Optional[float] = None,
     ) -> Dict[str, float]:
-        """Calculate various match scores for a candidate"""
+        """Calculate various match scores for a candidate
+
+        A precomputed similarity_score (e.g. from the batch similarity matrix)
+        takes precedence over comparing the two embeddings.
+        """
         scores = {
             "skill_score": 0.0,
             "role_score": 0.0,
@@ -583,7 +1028,9 @@ class CandidateSearchEngine:
                 )
 
         # Calculate embedding similarity score
-        if search_embedding and candidate_embedding:
+        if similarity_score is not None:
+            scores["similarity_score"] = similarity_score
+        elif search_embedding and candidate_embedding:
             scores["similarity_score"] = self.calculate_similarity(
                 search_embedding, candidate_embedding
             )
@@ -597,6 +1044,12 @@ class CandidateSearchEngine:
             "similarity_score": 0.2,
         }
 
+        # Per-field weights from the query (e.g. skills^2) scale the defaults
+        for field, weight in search_params.get("weights", {}).items():
+            key = FIELD_SCORES.get(field)
+            if key:
+                weights[key] *= weight
+
         # Adjust weights based on what's being searched
         active_criteria = sum(1 for k in weights.keys() if scores[k] > 0)
         if active_criteria > 0:
@@ -615,7 +1068,7 @@ class CandidateSearchEngine:
         return scores
 
 # Search Resume (Async)
-async def search_resume(search_query,from_experience,to_experience,similarity_threshold):
+async def search_resume(search_query,from_experience,to_experience,similarity_threshold,explain=False,trace=None,collapse_duplicates=False):
     # Initialize search engine
     search_engine = CandidateSearchEngine(
         uri=NEO4jURI, user=NEO4jUSER, password=NEO4jPASSWORD
@@ -632,6 +1085,9 @@ async def search_resume(search_query,from_experience,to_experience,similarity_th
             to_experience=to_experience,
             top_k=20,
             similarity_threshold=similarity_threshold,
+            explain=explain,
+            trace=trace,
+            collapse_duplicates=collapse_duplicates,
         )
         # print(results)
         # print(f"Found {len(results)} matching candidates:\n")
@@ -656,3 +1112,40 @@ async def search_resume(search_query,from_experience,to_experience,similarity_th
         search_engine.close()
 
 
+# Search Resume Batch (Async)
+async def search_resume_batch(queries, top_k=20):
+    """
+    Search the candidate pool against many search queries at once.
+
+    Parameters:
+    queries (list): Dicts with search_params, from_experience, to_experience and similarity_threshold
+    top_k (int): Number of candidates to return per query
+    Returns:
+    list: One ranked candidate list per query
+    """
+    search_engine = CandidateSearchEngine(
+        uri=NEO4jURI, user=NEO4jUSER, password=NEO4jPASSWORD
+    )
+
+    try:
+        print(f"Batch searching candidates for {len(queries)} queries:")
+        return await search_engine.search_candidates_batch(queries, top_k=top_k)
+
+    except Exception as e:
+        # Raised to the view, which returns the error message
+        print(f"Error during batch search: {e}")
+        raise e
+
+    finally:
+        search_engine.close()
+
+
+# Find Candidates Missing Fields
+def find_candidates_missing(fields, match_all=True, limit=100):
+    search_engine = CandidateSearchEngine(
+        uri=NEO4jURI, user=NEO4jUSER, password=NEO4jPASSWORD
+    )
+    try:
+        return search_engine.find_candidates_missing(fields, match_all=match_all, limit=limit)
+    finally:
+        search_engine.close()
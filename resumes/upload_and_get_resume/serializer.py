@@ -1,6 +1,10 @@
+import copy
 from rest_framework import serializers
-from typing import Dict, List
-import re
+from typing import Any, Dict
+from upload_and_get_resume.processes.search_query import (
+    QuerySyntaxError,
+    compile_search_query,
+)
 
 
 # Search Serializer Class
@@ -26,6 +30,18 @@ class SearchSerializer(serializers.Serializer):
         help_text="Similarity threshold for matching (between 0.0 and 1.0)",
     )
 
+    explain = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="Return the generated Cypher, its PROFILE summary and per-stage timings",
+    )
+
+    collapse_duplicates = serializers.BooleanField(
+        required=False,
+        default=False,
+        help_text="Return one result per group of near-duplicate resumes",
+    )
+
     # Validate
     def validate(self, data):
         """
@@ -44,94 +60,53 @@ class SearchSerializer(serializers.Serializer):
         """
         if not value.strip():
             raise serializers.ValidationError("Search query cannot be empty")
+        try:
+            compile_search_query(value.strip())
+        except QuerySyntaxError as e:
+            raise serializers.ValidationError(str(e))
         return value.strip()
 
     # Parsed Search Query Improved
-    def parse_search_query_improved(self, search_query: str) -> Dict[str, List[str]]:
+    def parse_search_query_improved(self, search_query: str) -> Dict[str, Any]:
         """
-        Improved version of search query parser with better tag detection.
+        Parse a search query with the query compiler.
 
         Args:
             search_query (str): Input string like "skills python, C, C++, role software developer, location India"
 
         Returns:
-            Dict[str, List[str]]: Parsed data like {"skills": ["python", "c", "c++"], "role": ["software developer"]}
+            Dict[str, Any]: Parsed data like {"skills": ["python", "c", "c++"], "role": ["software developer"]},
+            plus "required", "excluded" and "weights" when the query uses AND, NOT or ^weights
         """
-        # Define all possible tags
-        valid_tags = [
-            "name",
-            "email",
-            "phone number",
-            "skills",
-            "location",
-            "education",
-            "role",
-        ]
-
-        # Initialize result dictionary
-        parsed_data = {}
-
-        # Clean the input string
-        search_query = search_query.strip()
-
-        if not search_query:
-            return parsed_data
-
-        # Find all tag positions in the string
-        tag_positions = []
-        search_lower = search_query.lower()
-
-        for tag in valid_tags:
-            tag_lower = tag.lower()
-            start = 0
-            while True:
-                pos = search_lower.find(tag_lower, start)
-                if pos == -1:
-                    break
-
-                # Check if it's a whole word (not part of another word)
-                if (pos == 0 or not search_lower[pos - 1].isalnum()) and (
-                    pos + len(tag_lower) == len(search_lower)
-                    or not search_lower[pos + len(tag_lower)].isalnum()
-                ):
-                    tag_positions.append((pos, tag_lower, len(tag_lower)))
-
-                start = pos + 1
-
-        # Sort by position
-        tag_positions.sort()
-
-        # Extract content for each tag
-        for i, (pos, tag, tag_len) in enumerate(tag_positions):
-            start_content = pos + tag_len
-
-            # Find end of content (start of next tag or end of string)
-            if i + 1 < len(tag_positions):
-                end_content = tag_positions[i + 1][0]
-            else:
-                end_content = len(search_query)
-
-            # Extract content
-            content = search_query[start_content:end_content].strip()
-
-            # Remove leading non-alphanumeric characters (like colons, commas)
-            content = re.sub(r"^[^\w]+", "", content).strip()
-
-            if content:
-                # Split by commas and clean each value
-                values = []
-                for val in content.split(","):
-                    val = val.strip()
-                    if val:
-                        # Remove any trailing punctuation
-                        val = re.sub(r"[^\w\s]+$", "", val).strip()
-                        if val:
-                            values.append(val.lower())
-
-                if values:
-                    parsed_data[tag] = values
-        # print(f"Parsed Search Query: {parsed_data}")
-        return parsed_data
+        # The compiled result is cached and shared; callers get their own copy
+        return copy.deepcopy(compile_search_query(search_query).search_params)
+
+
+# Batch Search Serializer Class
+class BatchSearchSerializer(serializers.Serializer):
+    queries = SearchSerializer(
+        many=True,
+        min_length=1,
+        max_length=100,
+        help_text="Search queries (one per requisition) to run against the candidate pool",
+    )
+
+    top_k = serializers.IntegerField(
+        required=False,
+        default=20,
+        min_value=1,
+        max_value=100,
+        help_text="Number of candidates to return per query",
+    )
+
+
+# Saved Search Serializer Class
+class SavedSearchSerializer(SearchSerializer):
+    name = serializers.CharField(
+        max_length=200,
+        required=True,
+        help_text="A label for the standing search, e.g. the requisition title",
+    )
 
 
 # Analyse Serializer Class
@@ -1,3 +1,1308 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import os
+import tempfile
+import types
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
 
-# Create your tests here.
+import fitz
+import numpy as np
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from neo4j.exceptions import TransientError
+
+from upload_and_get_resume.processes.search_resume import (
+    SEARCH_FILTER_FLAGS,
+    SEARCH_QUERY_TEMPLATES,
+    CandidateSearchEngine,
+    collapse_near_duplicates,
+    compile_search_params,
+    match_candidate_row,
+    prepare_query_params,
+    search_filter_mask,
+    search_resume_batch,
+    summarise_profile,
+    timed_stage,
+)
+from upload_and_get_resume.processes import extract_keys
+from upload_and_get_resume.processes.saved_search import SavedSearchEngine
+from upload_and_get_resume.processes.search_query import (
+    QuerySyntaxError,
+    compile_search_query,
+    parse_search_query,
+)
+from upload_and_get_resume.management.commands.bench_pdf_links import (
+    scan_page_links,
+    synthetic_resume,
+)
+from upload_and_get_resume.management.commands.bench_docx import python_docx_extract, synthetic_docx
+from upload_and_get_resume.management.commands.import_resumes import (
+    Command as ImportResumesCommand,
+    StageStats,
+    claimed_hashes,
+    register_stored,
+)
+from upload_and_get_resume.utils.bulk_import_csv import GraphCsvWriter
+from upload_and_get_resume.utils.docx_stream import extract_docx
+from upload_and_get_resume.utils import extract_text_link
+from upload_and_get_resume.utils.extract_text_link import (
+    ResumeSource,
+    extract_page_range,
+    extract_pages_parallel,
+    extract_text_and_links,
+)
+from upload_and_get_resume.utils.embeddings import EMBEDDING_MODEL, embedding_property
+from upload_and_get_resume.utils.extraction_cache import ExtractionCache, source_key
+from upload_and_get_resume.utils.import_ledger import ImportLedger
+from upload_and_get_resume.utils.link_index import WordGrid, extract_page_links
+from upload_and_get_resume.utils.metrics import MetricsRegistry
+from upload_and_get_resume.utils.near_duplicate import LshIndex, minhash_signature
+from upload_and_get_resume.utils.prevalidation import PrevalidationReport, prevalidate_resume
+from upload_and_get_resume.utils.resume_registry import normalized_text_hash
+from upload_and_get_resume.utils.resume_parser import parse_resume_response, render_resume_text
+from upload_and_get_resume.utils.text_compactor import (
+    TRUNCATION_MARKER,
+    compact_text,
+    count_tokens,
+    join_broken_lines,
+)
+from upload_and_get_resume.utils import vectorise_v1
+from upload_and_get_resume.utils.vectorise_v1 import (
+    INGEST_WRITE_RETRIES,
+    RELATIONSHIP_SPECS,
+    Neo4jResumeProcessor,
+    normalize_email,
+    normalize_phone,
+)
+
+
+# Search Query Template Tests
+class SearchQueryTemplateTests(SimpleTestCase):
+    def setUp(self):
+        # The templates do not need a driver or model, so skip __init__
+        self.engine = CandidateSearchEngine.__new__(CandidateSearchEngine)
+
+    def test_catalogue_has_one_template_per_mask(self):
+        self.assertEqual(len(SEARCH_QUERY_TEMPLATES), 1 << len(SEARCH_FILTER_FLAGS))
+
+    def test_same_shape_yields_byte_identical_cypher(self):
+        first = self.engine._build_search_query(
+            {"skills": ["python"], "location": ["pune"]}, 0, 5
+        )
+        second = self.engine._build_search_query(
+            {"skills": ["java", "go", "rust"], "location": ["bangalore", "india"]}, 3, 12
+        )
+        self.assertEqual(first.encode("utf-8"), second.encode("utf-8"))
+        self.assertIs(first, second)
+
+    def test_different_shapes_yield_different_cypher(self):
+        skills_only = self.engine._build_search_query({"skills": ["python"]}, 0, 5)
+        with_role = self.engine._build_search_query(
+            {"skills": ["python"], "role": ["developer"]}, 0, 5
+        )
+        self.assertNotEqual(skills_only, with_role)
+
+    def test_empty_values_do_not_change_shape(self):
+        self.assertEqual(
+            search_filter_mask({"skills": ["python"], "education": []}, 0),
+            search_filter_mask({"skills": ["python"]}, None),
+        )
+
+    def test_templates_only_reference_parameters_for_present_filters(self):
+        query = self.engine._build_search_query({"name": ["aagam"]}, 0, 0)
+        self.assertIn("$name", query)
+        self.assertNotIn("$to_exp", query)
+        self.assertNotIn("$skills_lower", query)
+
+    def test_location_and_education_filters_combine(self):
+        query = self.engine._build_search_query(
+            {"location": ["pune"], "education": ["iit"]}, 0, 0
+        )
+        self.assertIn("$locations_lower", query)
+        self.assertIn("$education_lower", query)
+        post_collect = query.split("as companies", 1)[1]
+        self.assertEqual(post_collect.count("\nWHERE"), 1)
+        self.assertIn("AND", post_collect)
+
+
+# Fake Neo4j Record/Session/Driver for search tests
+class _FakeSession:
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+        self.params = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, params=None):
+        self.queries.append(query)
+        self.params.append(params)
+        return iter(self.rows)
+
+
+class _FakeDriver:
+    def __init__(self, rows):
+        self.session_obj = _FakeSession(rows)
+
+    def session(self):
+        return self.session_obj
+
+
+class _FakeModel:
+    def encode(self, texts, normalize_embeddings=True):
+        return np.array([[1.0, 0.0] for _ in texts])
+
+
+# Batch Search Tests
+class BatchSearchTests(SimpleTestCase):
+    def setUp(self):
+        rows = [
+            {
+                "candidate": {"candidateId": "a", "name": "Asha", "yearsOfExperience": 4.0,
+                              "embedding": [1.0, 0.0]},
+                "total_skills": ["Python", "Django"],
+                "current_designation": "Backend Developer",
+                "all_roles": ["Backend Developer"],
+                "locations": [{"name": "Pune", "city": "Pune", "state": None, "country": None}],
+                "education": [],
+                "companies": [],
+            },
+            {
+                "candidate": {"candidateId": "b", "name": "Ravi", "yearsOfExperience": 1.0,
+                              "embedding": [0.0, 1.0]},
+                "total_skills": ["Java"],
+                "current_designation": None,
+                "all_roles": ["Android Developer"],
+                "locations": [{"name": "Delhi", "city": "Delhi", "state": None, "country": None}],
+                "education": [],
+                "companies": [],
+            },
+        ]
+        self.engine = CandidateSearchEngine.__new__(CandidateSearchEngine)
+        self.engine.driver = _FakeDriver(rows)
+        self.engine.model = _FakeModel()
+        self.engine.embedding_property = "embedding"
+
+    def test_single_scan_returns_ranked_list_per_query(self):
+        queries = [
+            {"search_params": {"skills": ["python"]}, "from_experience": 0,
+             "to_experience": 10, "similarity_threshold": 0.1},
+            {"search_params": {"skills": ["java"], "location": ["delhi"]},
+             "from_experience": 0, "to_experience": 0, "similarity_threshold": 0.1},
+            {"search_params": {"skills": ["python"]}, "from_experience": 5,
+             "to_experience": 10, "similarity_threshold": 0.1},
+        ]
+        results = asyncio.run(self.engine.search_candidates_batch(queries))
+
+        self.assertEqual(len(self.engine.driver.session_obj.queries), 1)
+        self.assertEqual([c["candidate_id"] for c in results[0]][0], "a")
+        self.assertEqual([c["candidate_id"] for c in results[1]], ["b"])
+        self.assertEqual(results[1][0]["matched_skills"], ["Java"])
+        self.assertEqual(results[2], [])
+
+    def test_near_duplicates_are_collapsed_per_query(self):
+        self.engine.driver.session_obj.rows[1]["candidate"]["canonicalId"] = "a"
+        query = {"search_params": {"skills": ["python", "java"]}, "from_experience": 0,
+                 "to_experience": 10, "similarity_threshold": 0.0}
+
+        collapsed, full = asyncio.run(self.engine.search_candidates_batch([
+            {**query, "collapse_duplicates": True}, query,
+        ]))
+
+        self.assertEqual([c["candidate_id"] for c in collapsed], ["a"])
+        self.assertEqual(collapsed[0]["near_duplicate_ids"], ["b"])
+        self.assertEqual([c["candidate_id"] for c in full], ["a", "b"])
+
+    def test_batch_search_errors_reach_the_caller(self):
+        engine = mock.MagicMock()
+        engine.search_candidates_batch = mock.AsyncMock(side_effect=RuntimeError("Neo4j unavailable"))
+        with mock.patch(
+            "upload_and_get_resume.processes.search_resume.CandidateSearchEngine", return_value=engine
+        ):
+            with self.assertRaisesMessage(RuntimeError, "Neo4j unavailable"):
+                asyncio.run(search_resume_batch([{"search_params": {"skills": ["python"]}}]))
+        engine.close.assert_called_once()
+
+        with mock.patch(
+            "upload_and_get_resume.views.search_resume_batch", side_effect=RuntimeError("Neo4j unavailable")
+        ):
+            response = self.client.post("/search/batch/", {"queries": [{
+                "search_query": "skills python", "from_experience": 0, "to_experience": 5,
+                "similarity_threshold": 0.4,
+            }]}, content_type="application/json")
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.json(), {"error": "Neo4j unavailable"})
+
+
+# Saved Search Percolation Tests
+class SavedSearchPercolationTests(SimpleTestCase):
+    def setUp(self):
+        def saved(search_id, search_params, embedding, threshold=0.4):
+            return {
+                "search_id": search_id, "search_params": json.dumps(search_params),
+                "from_exp": 0, "to_exp": None, "threshold": threshold, "embedding": embedding,
+            }
+
+        self.saved = [
+            saved("same-direction", {"skills": ["python"]}, [1.0, 0.0]),
+            saved("orthogonal", {"skills": ["python"]}, [0.0, 1.0], threshold=0.8),
+            saved("filtered-out", {"skills": ["python"], "location": ["delhi"]}, [1.0, 0.0]),
+            saved("no-embedding", {"skills": ["python", "django"]}, None),
+        ]
+        self.row = {
+            "candidate": {"candidateId": "a", "name": "Asha", "yearsOfExperience": 4.0},
+            "total_skills": ["Python", "Django"],
+            "all_roles": ["Backend Developer"],
+            "locations": [{"name": "Pune", "city": "Pune", "state": None, "country": None}],
+            "education": [],
+        }
+
+    def engine(self):
+        engine = SavedSearchEngine.__new__(SavedSearchEngine)
+        engine.driver = _FakeDriver(self.saved)
+        engine.embedding_property = "embedding"
+        return engine
+
+    def test_matches_above_threshold_are_written_with_their_score(self):
+        engine = self.engine()
+
+        matches = engine.percolate_candidate("a", self.row, [2.0, 0.0])
+
+        # Similarity 1.0 lifts the first search over the threshold the orthogonal one misses
+        self.assertEqual([match["search_id"] for match in matches], ["same-direction", "no-embedding"])
+        self.assertAlmostEqual(matches[0]["score"], 1.0)
+        self.assertAlmostEqual(matches[1]["score"], 0.6)
+        session = engine.driver.session_obj
+        self.assertEqual(len(session.queries), 2)
+        self.assertIn("MERGE (s)-[m:MATCHED]->(c)", session.queries[1])
+        self.assertEqual(session.params[1]["candidate_id"], "a")
+        self.assertEqual(session.params[1]["matches"], matches)
+
+    def test_no_match_writes_nothing(self):
+        engine = self.engine()
+        self.row["total_skills"] = ["Cobol"]
+
+        self.assertEqual(engine.percolate_candidate("a", self.row, [0.0, 0.0]), [])
+        self.assertEqual(len(engine.driver.session_obj.queries), 1)
+
+    def test_ingest_percolates_the_stored_candidate(self):
+        processor = Neo4jResumeProcessor.__new__(Neo4jResumeProcessor)
+        processor.driver = _FakeDriver(self.saved)
+        personal_info = {"name": "Asha", "location": "Pune", "current_designation": "Backend Developer"}
+        data = {
+            "skills": [{"name": "Python"}, {"name": "Django"}],
+            "suitable_roles": [],
+            "education": [],
+        }
+        with mock.patch(
+            "upload_and_get_resume.processes.search_resume.get_active_embedding_model",
+            return_value=EMBEDDING_MODEL,
+        ), mock.patch(
+            "upload_and_get_resume.processes.search_resume.get_sentence_model",
+            return_value=_FakeModel(),
+        ):
+            processor._percolate_saved_searches("a", personal_info, data, 4, [1.0, 0.0])
+
+        session = processor.driver.session_obj
+        self.assertIn("MATCHED", session.queries[-1])
+        self.assertEqual(
+            [match["search_id"] for match in session.params[-1]["matches"]],
+            ["same-direction", "no-embedding"],
+        )
+
+
+
+# Search Profile Tests
+class SearchProfileTests(SimpleTestCase):
+    PLAN = {
+        "operatorType": "ProduceResults", "dbHits": 0, "rows": 1,
+        "children": [{
+            "operatorType": "Filter", "dbHits": 40, "rows": 1,
+            "args": {"Details": "c.yearsOfExperience >= $from_exp"},
+            "children": [{"operatorType": "NodeByLabelScan", "dbHits": 11, "rows": 10, "children": []}],
+        }],
+    }
+
+    def test_nested_plan_is_flattened_with_total_db_hits(self):
+        profile = summarise_profile(self.PLAN)
+
+        self.assertEqual(profile["total_db_hits"], 51)
+        self.assertEqual(
+            [(op["operator"], op["depth"], op["db_hits"]) for op in profile["operators"]],
+            [("ProduceResults", 0, 0), ("Filter", 1, 40), ("NodeByLabelScan", 2, 11)],
+        )
+        self.assertEqual(profile["operators"][1]["details"], "c.yearsOfExperience >= $from_exp")
+        self.assertIsNone(summarise_profile(None))
+
+    def test_timed_stage_accumulates_and_tolerates_no_trace(self):
+        trace = {}
+        clock = [1.0, 1.5, 2.0, 2.25]
+        with mock.patch("upload_and_get_resume.processes.search_resume.time.perf_counter", side_effect=clock):
+            with timed_stage(trace, "scoring"):
+                pass
+            with timed_stage(trace, "scoring"):
+                pass
+        self.assertEqual(trace, {"timings_ms": {"scoring": 750.0}})
+        with timed_stage(None, "scoring"):
+            pass
+
+    def test_explain_profiles_the_query_and_traces_it(self):
+        row = {
+            "candidate": {"candidateId": "a", "name": "Asha", "yearsOfExperience": 4.0},
+            "matched_skills": ["Python"], "total_skills": ["Python"], "matched_roles": [],
+            "locations": [], "education": [], "companies": [],
+        }
+        result = mock.MagicMock()
+        result.__iter__.return_value = iter([row])
+        result.consume.return_value = types.SimpleNamespace(
+            profile=self.PLAN, result_available_after=3, result_consumed_after=5
+        )
+        engine = CandidateSearchEngine.__new__(CandidateSearchEngine)
+        engine.driver = mock.MagicMock()
+        engine.embedding_property = "embedding"
+        session = engine.driver.session.return_value.__enter__.return_value
+        session.run.return_value = result
+        compiled = compile_search_params({"skills": ["python"]})
+        trace = {}
+
+        candidates = asyncio.run(engine._execute_search_query(
+            compiled, 0, None, None, similarity_threshold=0.1, explain=True, trace=trace
+        ))
+
+        query, params = session.run.call_args[0]
+        self.assertTrue(query.startswith("PROFILE "))
+        self.assertEqual(trace["cypher"], query[len("PROFILE "):])
+        self.assertEqual(trace["parameters"], params)
+        self.assertEqual(params["to_exp"], 999)
+        self.assertEqual(trace["profile"]["total_db_hits"], 51)
+        self.assertEqual(trace["server_timings_ms"], {"result_available_after": 3, "result_consumed_after": 5})
+        self.assertEqual((trace["rows_scanned"], trace["rows_matched"]), (1, 1))
+        self.assertEqual([c["candidate_id"] for c in candidates], ["a"])
+        self.assertEqual(
+            set(trace["timings_ms"]), {"cypher_execution", "record_decoding", "scoring"}
+        )
+
+    def test_without_explain_the_query_is_not_profiled(self):
+        engine = CandidateSearchEngine.__new__(CandidateSearchEngine)
+        engine.driver = mock.MagicMock()
+        engine.embedding_property = "embedding"
+        session = engine.driver.session.return_value.__enter__.return_value
+        trace = {}
+
+        asyncio.run(engine._execute_search_query(
+            compile_search_params({"skills": ["python"]}), 0, None, None, trace=trace
+        ))
+
+        self.assertFalse(session.run.call_args[0][0].startswith("PROFILE"))
+        self.assertNotIn("profile", trace)
+
+
+# Metrics Exposition Tests
+class MetricsExpositionTests(SimpleTestCase):
+    def test_histogram_buckets_are_cumulative_and_inclusive(self):
+        registry = MetricsRegistry()
+        histogram = registry.histogram(
+            "stage_seconds", "Stage time.", label_names=("stage",), buckets=(0.1, 1.0)
+        )
+        for value in (0.1, 0.5, 5.0):
+            histogram.observe(value, stage="scoring")
+
+        lines = registry.render().splitlines()
+
+        self.assertEqual(lines[:2], ["# HELP stage_seconds Stage time.", "# TYPE stage_seconds histogram"])
+        # A value equal to a bound falls in that bucket (le is "less than or equal")
+        self.assertEqual(lines[2:], [
+            'stage_seconds_bucket{stage="scoring",le="0.1"} 1',
+            'stage_seconds_bucket{stage="scoring",le="1.0"} 2',
+            'stage_seconds_bucket{stage="scoring",le="+Inf"} 3',
+            'stage_seconds_sum{stage="scoring"} 5.6',
+            'stage_seconds_count{stage="scoring"} 3',
+        ])
+
+    def test_counters_escape_label_values(self):
+        registry = MetricsRegistry()
+        unlabelled = registry.counter("searches_total", "Searches.")
+        counter = registry.counter("errors_total", "Errors.", label_names=("code",))
+        counter.inc(code='say "hi"\\\n')
+        counter.inc(2, code="plain")
+
+        lines = registry.render().splitlines()
+
+        self.assertIn("searches_total 0", lines)
+        self.assertIn('errors_total{code="say \\"hi\\"\\\\\\n"} 1', lines)
+        self.assertIn('errors_total{code="plain"} 2', lines)
+        self.assertIs(registry.counter("searches_total", "Searches."), unlabelled)
+
+    @override_settings(METRICS_ALLOWED_IPS=["10.0.0.5"])
+    def test_only_allowed_addresses_can_scrape(self):
+        self.assertEqual(reverse("metrics"), "/metrics/")
+        self.assertEqual(self.client.get("/metrics/", REMOTE_ADDR="10.0.0.9").status_code, 403)
+
+        response = self.client.get("/metrics/", REMOTE_ADDR="10.0.0.5")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        self.assertIn(b"# TYPE resume_ingest_write_retries_total counter", response.content)
+
+# Missing Fields Tests
+class MissingFieldsTests(SimpleTestCase):
+    def test_absent_and_na_fields_are_recorded(self):
+        processor = Neo4jResumeProcessor.__new__(Neo4jResumeProcessor)
+        personal_info = {"name": "Asha", "age": "27", "gender": "N/A", "current_ctc": "12 LPA"}
+        data = {"languages": ["English"], "projects": ["N/A"], "achievements": []}
+
+        missing = processor._missing_fields(personal_info, data)
+
+        self.assertEqual(
+            missing,
+            ["gender", "preferred_location", "expected_ctc", "interests_hobbies",
+             "current_notice_period", "projects", "achievements"],
+        )
+
+
+# Import Ledger Tests
+class ImportLedgerTests(SimpleTestCase):
+    def test_rerun_resumes_after_last_completed_stage(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "ledger.jsonl")
+            ledger = ImportLedger(path)
+            ledger.record("/a.pdf", "analysed", response="=== CANDIDATE PROFILE ===")
+            ledger.record("/a.pdf", "uploaded", resume_link="r", json_link="j", version=0)
+            ledger.record("/b.pdf", "analysed", response="=== CANDIDATE PROFILE ===")
+            ledger.record("/b.pdf", "failed", stage="upload", error="conflict")
+            ledger.record("/c.pdf", "failed", stage="extract", error="no text extracted")
+
+            reloaded = ImportLedger(path)
+
+            self.assertEqual(reloaded.status("/a.pdf"), "uploaded")
+            self.assertEqual(reloaded.entries["/a.pdf"]["response"], "=== CANDIDATE PROFILE ===")
+            self.assertEqual(reloaded.status("/b.pdf"), "analysed")
+            self.assertEqual(reloaded.status("/c.pdf"), None)
+            self.assertEqual(reloaded.status("/d.pdf"), None)
+
+
+# Bulk Import CSV Tests
+class GraphCsvWriterTests(SimpleTestCase):
+    def _data(self, name, skills):
+        return {
+            "personal_info": {"name": name, "location": "Pune, Maharashtra", "current_employer": "Acme"},
+            "education": [],
+            "skills": [{"name": skill, "category": "Programming"} for skill in skills],
+            "languages": ["English"],
+            "achievements": [],
+            "projects": ["Search engine"],
+            "suitable_roles": [],
+            "links": [],
+        }
+
+    def test_shared_nodes_are_deduplicated(self):
+        processor = Neo4jResumeProcessor.__new__(Neo4jResumeProcessor)
+        processor.embedding_property = "embedding_e5_small"
+        with tempfile.TemporaryDirectory() as directory:
+            writer = GraphCsvWriter(directory, processor)
+            writer.add_candidate(self._data("Asha", ["Python", "Django"]), [0.5, 0.25], None, None, 4)
+            writer.add_candidate(self._data("Ravi", ["Python"]), [0.1, 0.2], None, None, 1)
+            writer.close()
+
+            def rows(name):
+                with open(os.path.join(directory, name), newline="", encoding="utf-8") as f:
+                    return list(csv.reader(f))
+
+            self.assertEqual(len(rows("nodes_Candidate.csv")), 3)
+            self.assertEqual(rows("nodes_Candidate.csv")[0][9], "embedding_e5_small:float[]")
+            self.assertEqual(rows("nodes_Candidate.csv")[1][9], "0.5;0.25")
+            self.assertEqual(sorted(r[1] for r in rows("nodes_Skill.csv")[1:]), ["Django", "Python"])
+            self.assertEqual(len(rows("nodes_Company.csv")), 2)
+            self.assertEqual(len(rows("nodes_Project.csv")), 3)
+            has_skill = rows("rels_HAS_SKILL.csv")
+            self.assertEqual(has_skill[0][:2], [":START_ID(Candidate)", ":END_ID(Skill)"])
+            self.assertEqual(len(has_skill), 4)
+            self.assertIn("--nodes=", writer.import_command())
+
+    def test_import_command_accepts_multiline_resume_text(self):
+        processor = Neo4jResumeProcessor.__new__(Neo4jResumeProcessor)
+        processor.embedding_property = "embedding"
+        data = self._data("Asha", ["Python"])
+        data["source_text"] = "Asha Rao\nBackend Developer\nPune"
+        with tempfile.TemporaryDirectory() as directory:
+            writer = GraphCsvWriter(directory, processor)
+            writer.add_candidate(data, [0.5], None, None, 4)
+            writer.close()
+            with open(os.path.join(directory, "nodes_Candidate.csv"), newline="", encoding="utf-8") as f:
+                row = next(csv.DictReader(f))
+            command = writer.import_command()
+
+        self.assertEqual(row["resumeText"], "Asha Rao\nBackend Developer\nPune")
+        self.assertIn("--multiline-fields=true", command)
+        self.assertTrue(command.endswith(" neo4j"))
+
+    def test_candidates_carry_the_bolt_writer_keys(self):
+        processor = Neo4jResumeProcessor.__new__(Neo4jResumeProcessor)
+        processor.embedding_property = "embedding"
+        data = self._data("Asha", ["Python"])
+        data["personal_info"].update(email=" Asha.Rao@Example.COM ", phone="+91 98765-43210")
+        with tempfile.TemporaryDirectory() as directory:
+            writer = GraphCsvWriter(directory, processor)
+            writer.add_candidate(data, [0.5], None, None, 4, text_hash="h-asha")
+            writer.close()
+            with open(os.path.join(directory, "nodes_Candidate.csv"), newline="", encoding="utf-8") as f:
+                row = next(csv.DictReader(f))
+
+        self.assertEqual(row["normalizedEmail"], normalize_email(data["personal_info"]["email"]))
+        self.assertEqual(row["normalizedPhone"], "9876543210")
+        self.assertEqual(row["textHash"], "h-asha")
+        self.assertEqual(
+            row["missingFields:string[]"].split(";"), processor._missing_fields(data["personal_info"], data)
+        )
+
+
+# Resume Registry Tests
+class NormalizedTextHashTests(SimpleTestCase):
+    def test_whitespace_and_case_do_not_change_hash(self):
+        self.assertEqual(
+            normalized_text_hash("Asha Rao\n\nPython  Developer "),
+            normalized_text_hash("asha rao python developer"),
+        )
+        self.assertNotEqual(
+            normalized_text_hash("Asha Rao Python Developer"),
+            normalized_text_hash("Asha Rao Java Developer"),
+        )
+
+
+
+class ResumeRegistryShortCircuitTests(SimpleTestCase):
+    KNOWN = {"candidate_id": "a", "resume_link": "r", "json_link": "j", "result": {"candidate_profile": {}}}
+
+    def ingest(self, registry, extracted=("Asha Rao Backend Developer", [])):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "resume.pdf")
+            with open(path, "wb") as f:
+                f.write(b"%PDF-1.4 resume")
+            with mock.patch.object(extract_keys, "ResumeRegistry", return_value=registry), \
+                    mock.patch.object(extract_keys, "extract_text_and_links", return_value=extracted) as extract, \
+                    mock.patch.object(extract_keys, "prevalidate_resume", return_value=PrevalidationReport()), \
+                    mock.patch.object(extract_keys, "get_extraction_cache"), \
+                    mock.patch.object(extract_keys, "connect_to_server") as connect, \
+                    mock.patch.object(extract_keys, "cleanup", new=mock.AsyncMock()):
+                result = asyncio.run(extract_keys.extract_keys(path))
+        return result, extract, connect
+
+    def test_known_file_returns_the_stored_analysis_before_extraction(self):
+        registry = mock.MagicMock()
+        registry.lookup.return_value = self.KNOWN
+
+        result, extract, connect = self.ingest(registry)
+
+        self.assertEqual(result, self.KNOWN["result"])
+        extract.assert_not_called()
+        connect.assert_not_called()
+        registry.close.assert_called_once()
+
+    def test_known_text_in_a_new_file_is_aliased_without_analysis(self):
+        registry = mock.MagicMock()
+        registry.lookup.side_effect = lambda file_hash=None, text_hash=None: self.KNOWN if text_hash else None
+
+        result, extract, connect = self.ingest(registry)
+
+        self.assertEqual(result, self.KNOWN["result"])
+        extract.assert_called_once()
+        connect.assert_not_called()
+        file_hash, text_hash, known = registry.register_alias.call_args[0]
+        self.assertEqual(text_hash, normalized_text_hash("Asha Rao Backend Developer"))
+        self.assertEqual(known, self.KNOWN)
+
+    def test_deleting_a_candidate_removes_its_fingerprints(self):
+        processor = Neo4jResumeProcessor.__new__(Neo4jResumeProcessor)
+        processor.driver = mock.MagicMock()
+        session = processor.driver.session.return_value.__enter__.return_value
+
+        processor.delete_candidate("a")
+
+        self.assertIn("ResumeFingerprint {candidateId: $candidate_id}", session.run.call_args[0][0])
+
+    def test_upsert_drops_fingerprints_of_the_previous_resume(self):
+        processor = Neo4jResumeProcessor.__new__(Neo4jResumeProcessor)
+        processor.embedding_property = "embedding"
+        data = {
+            "personal_info": {"name": "Asha", "email": "asha@example.com"},
+            "skills": [], "education": [], "languages": [], "suitable_roles": [], "links": [],
+            "achievements": [], "projects": [],
+        }
+        tx = _FakeTx([])
+
+        processor._update_candidate_tx(tx, "a", data, None, None, None, 4, "new-hash")
+
+        query, params = next(write for write in tx.writes if "ResumeFingerprint" in write[0])
+        self.assertIn("f.textHash <> $text_hash", query)
+        self.assertEqual(params, {"candidate_id": "a", "text_hash": "new-hash"})
+
+# Near Duplicate Tests
+class NearDuplicateTests(SimpleTestCase):
+    RESUME = (
+        "Asha Rao Backend Developer Pune. Five years building Django and PostgreSQL services "
+        "for payments, led a team of four engineers, migrated monoliths to Kubernetes, "
+        "designed event pipelines with Kafka and wrote the onboarding guide for new hires. "
+        "Projects: fraud scoring service, ledger reconciliation, internal search over invoices."
+    )
+
+    def test_lightly_edited_resume_links_to_canonical(self):
+        index = LshIndex()
+        index.add("original", minhash_signature(self.RESUME))
+        edited = self.RESUME + " Phone 9876543210."
+        unrelated = "Ravi Kumar Android Developer Delhi. Kotlin, Jetpack Compose and Firebase apps."
+
+        self.assertEqual(index.find_canonical(minhash_signature(edited))[0], "original")
+        self.assertIsNone(index.find_canonical(minhash_signature(unrelated)))
+
+    def test_persisted_index_is_reloaded(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "index.jsonl")
+            LshIndex(path).add("original", minhash_signature(self.RESUME))
+            self.assertEqual(
+                LshIndex(path).find_canonical(minhash_signature(self.RESUME)), ("original", 1.0)
+            )
+
+    def test_re_added_candidate_replaces_its_bucket_entries(self):
+        unrelated = (
+            "Ravi Kumar Android Developer Delhi. Kotlin, Jetpack Compose and Firebase apps for "
+            "retail chains, offline sync, crash analytics and a design system used by six teams."
+        )
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "index.jsonl")
+            index = LshIndex(path)
+            index.add("a", minhash_signature(self.RESUME))
+            index.add("a", minhash_signature(unrelated))
+
+            for reloaded in (index, LshIndex(path)):
+                self.assertIsNone(reloaded.find_canonical(minhash_signature(self.RESUME)))
+                self.assertEqual(reloaded.find_canonical(minhash_signature(unrelated)), ("a", 1.0))
+                self.assertEqual(sum(len(bucket) for bucket in reloaded.buckets.values()), 32)
+
+    def test_collapse_keeps_best_result_per_canonical(self):
+        results = collapse_near_duplicates([
+            {"candidate_id": "b", "canonical_id": "a", "total_score": 0.9},
+            {"candidate_id": "a", "canonical_id": "a", "total_score": 0.8},
+            {"candidate_id": "c", "canonical_id": "c", "total_score": 0.7},
+        ])
+        self.assertEqual([r["candidate_id"] for r in results], ["b", "c"])
+        self.assertEqual(results[0]["near_duplicate_ids"], ["a"])
+
+
+# Candidate Upsert Tests
+class _FakeTx:
+    def __init__(self, current):
+        self.current = current
+        self.writes = []
+
+    def run(self, query, params=None):
+        if "RETURN" in query:
+            return iter(self.current)
+        self.writes.append((query, params))
+        return iter([])
+
+
+class CandidateUpsertTests(SimpleTestCase):
+    def test_contact_keys_are_normalized(self):
+        self.assertEqual(normalize_email("  Asha.Rao@Example.COM "), "asha.rao@example.com")
+        self.assertEqual(normalize_phone("+91 98765-43210"), normalize_phone("9876543210"))
+        self.assertIsNone(normalize_phone("N/A"))
+
+    def test_phone_is_only_matched_without_an_email(self):
+        processor = Neo4jResumeProcessor.__new__(Neo4jResumeProcessor)
+        processor.embedding_property = "embedding"
+        processor.driver = mock.MagicMock()
+        session = processor.driver.session.return_value.__enter__.return_value
+        session.run.return_value.single.return_value = None
+
+        processor.find_existing_candidate("asha@example.com", "9876543210")
+        self.assertIn("c.normalizedEmail = $email", session.run.call_args[0][0])
+        self.assertNotIn("normalizedPhone", session.run.call_args[0][0])
+        processor.find_existing_candidate(None, "9876543210")
+        self.assertIn("c.normalizedPhone = $phone", session.run.call_args[0][0])
+        self.assertIsNone(processor.find_existing_candidate(None, None))
+        self.assertEqual(session.run.call_count, 2)
+
+    def test_only_changed_skill_edges_are_written(self):
+        processor = Neo4jResumeProcessor.__new__(Neo4jResumeProcessor)
+        data = {
+            "education": [], "languages": [], "suitable_roles": [], "links": [],
+            "skills": [{"name": "Python", "category": "Programming"},
+                       {"name": "Go", "category": "Programming"}],
+        }
+        desired = processor._desired_relationships({}, data)
+        tx = _FakeTx([
+            {"key": ["Python", "HAS_SKILL"], "props": {"category": "Programming"}, "rel_id": "r1"},
+            {"key": ["Java", "HAS_SKILL"], "props": {"category": "Programming"}, "rel_id": "r2"},
+        ])
+        spec = next(spec for spec in RELATIONSHIP_SPECS if spec[1] == "Skill")
+
+        changes = processor._diff_relationships(tx, "a", spec, desired["Skill"])
+
+        self.assertEqual(changes, {"added": 1, "removed": 1, "updated": 0})
+        # Applied in key order, Go before Java, whatever the change
+        added, removed = tx.writes
+        self.assertEqual(added[1]["key"], ["Go"])
+        self.assertEqual(removed[1]["rel_id"], "r2")
+
+    def test_current_and_previous_employers_change_in_one_sorted_pass(self):
+        processor = Neo4jResumeProcessor.__new__(Neo4jResumeProcessor)
+        data = {"education": [], "languages": [], "suitable_roles": [], "links": [], "skills": []}
+        personal_info = {"current_employer": "Zeta", "previous_employers": ["Acme", "Globex"]}
+        desired = processor._desired_relationships(personal_info, data)
+        tx = _FakeTx([
+            {"key": ["Beta", "WORKING_WORKED_AT"], "props": {"isCurrent": True}, "rel_id": "r1"},
+            {"key": ["Globex", "WORKED_AT"], "props": {"isCurrent": False, "order": 1}, "rel_id": "r2"},
+        ])
+        spec = next(spec for spec in RELATIONSHIP_SPECS if spec[1] == "Company")
+
+        processor._diff_relationships(tx, "a", spec, desired["Company"])
+
+        touched = [params.get("key", [params.get("rel_id")])[0] for _, params in tx.writes]
+        self.assertEqual(touched, ["Acme", "r1", "Zeta"])
+        self.assertIn("WORKING_WORKED_AT", tx.writes[2][0])
+
+
+
+class BatchUpsertTests(SimpleTestCase):
+    def setUp(self):
+        self.processor = Neo4jResumeProcessor.__new__(Neo4jResumeProcessor)
+        self.processor.model = mock.MagicMock(wraps=_FakeModel())
+        self.processor.parse_resume_data = lambda response: {
+            "personal_info": {"name": response, "email": f"{response.lower()}@example.com"}
+        }
+        self.processor.find_existing_candidate = lambda email, phone: (
+            {"candidateId": "stored-asha", "textHash": "h-asha", "embedding": [0.6, 0.8]}
+            if email == "asha@example.com" else None
+        )
+        self.processor._percolate_saved_searches = mock.MagicMock()
+        self.processor._execute_write_with_retry = mock.MagicMock()
+
+    def items(self, *names):
+        return [
+            {"response": name, "resume_link": None, "json_link": None, "years_of_experience": 2,
+             "text_hash": f"h-{name.lower()}"}
+            for name in names
+        ]
+
+    def test_reimported_resumes_update_their_candidates(self):
+        stored = self.processor.store_resumes_batch(self.items("Asha", "Ravi", "Ravi"), upsert=True)
+
+        self.assertEqual(stored[0], ("stored-asha", False))
+        self.assertTrue(stored[1][1])
+        # The second Ravi of the batch updates the candidate the first one creates
+        self.assertEqual(stored[2], (stored[1][0], False))
+        # Asha's text is unchanged: her stored embedding is kept, not recomputed
+        self.assertEqual(self.processor.model.encode.call_args[0][0], ["Ravi", "Ravi"])
+        batch = self.processor._execute_write_with_retry.call_args[0][2]
+        self.assertEqual([entry[6] for entry in batch], ["h-asha", "h-ravi", "h-ravi"])
+        self.assertEqual([entry[7] for entry in batch], [False, True, False])
+        self.assertIsNone(batch[0][2])
+
+    def test_without_upsert_every_resume_is_created(self):
+        stored = self.processor.store_resumes_batch(self.items("Asha", "Asha"))
+
+        self.assertEqual([created for _, created in stored], [True, True])
+        self.assertNotEqual(stored[0][0], stored[1][0])
+
+    def test_stored_candidates_are_fingerprinted_and_indexed(self):
+        registry = mock.MagicMock()
+        index = LshIndex()
+        index.add("original", minhash_signature(NearDuplicateTests.RESUME))
+        entry = {
+            "response": "", "resume_link": "r", "json_link": "j", "file_hash": "f", "text_hash": "t",
+            "signature": minhash_signature(NearDuplicateTests.RESUME).tolist(),
+        }
+        with mock.patch(
+            "upload_and_get_resume.management.commands.import_resumes.get_near_duplicate_index",
+            return_value=index,
+        ), mock.patch(
+            "upload_and_get_resume.management.commands.import_resumes.parse_response_to_json",
+            return_value=({"candidate_profile": {}}, 2),
+        ), mock.patch(
+            "upload_and_get_resume.management.commands.import_resumes.link_near_duplicate"
+        ) as link:
+            register_stored(registry, entry, "copy", created=True)
+
+        link.assert_called_once_with(registry.driver, "copy", "original", 1.0)
+        self.assertEqual(index.canonical["copy"], "original")
+        registry.register.assert_called_once_with("f", "t", "copy", "r", "j", {"candidate_profile": {}})
+
+
+class ImportRunDuplicateTests(SimpleTestCase):
+    TEXT = "Asha Rao Backend Developer Python Django Neo4j " * 10
+
+    def extract(self, files, claimed=None):
+        registry = mock.MagicMock()
+        registry.lookup.return_value = None
+        report = PrevalidationReport()
+        with tempfile.TemporaryDirectory() as directory:
+            paths = []
+            for name, data in files:
+                paths.append(os.path.join(directory, name))
+                with open(paths[-1], "wb") as f:
+                    f.write(data)
+            ledger = ImportLedger(os.path.join(directory, "ledger.jsonl"))
+
+            async def run():
+                inbox, outbox = asyncio.Queue(), asyncio.Queue()
+                for path in paths:
+                    inbox.put_nowait(path)
+                inbox.put_nowait(None)
+                stats = StageStats()
+                with ThreadPoolExecutor(max_workers=2) as pool:
+                    await ImportResumesCommand().extract_stage(
+                        pool, registry, claimed or {}, inbox, outbox, ledger, stats, {"extract_workers": 1}
+                    )
+                items = []
+                while (item := outbox.get_nowait()) is not None:
+                    items.append(item)
+                return items, stats
+
+            with mock.patch(
+                "upload_and_get_resume.management.commands.import_resumes.extract_text_and_links",
+                return_value=(self.TEXT, []),
+            ) as extract, mock.patch(
+                "upload_and_get_resume.management.commands.import_resumes.prevalidate_resume",
+                return_value=report,
+            ):
+                items, stats = asyncio.run(run())
+            return paths, items, stats, ledger.entries, extract
+
+    def test_copies_of_a_file_or_its_text_are_analysed_once(self):
+        paths, items, stats, entries, extract = self.extract(
+            [("a.pdf", b"resume"), ("b.pdf", b"resume"), ("c.docx", b"other bytes, same text")]
+        )
+
+        self.assertEqual([item["path"] for item in items], [paths[0]])
+        self.assertEqual(stats.duplicates, 2)
+        # The exact copy is not even extracted
+        self.assertEqual(extract.call_count, 2)
+        self.assertEqual([entries[path]["status"] for path in paths[1:]], ["skipped", "skipped"])
+        self.assertEqual([entries[path]["duplicate_of"] for path in paths[1:]], [paths[0], paths[0]])
+        self.assertNotIn(paths[0], entries)
+
+    def test_a_rerun_claims_the_hashes_of_resumed_files(self):
+        with tempfile.TemporaryDirectory() as directory:
+            ledger = ImportLedger(os.path.join(directory, "ledger.jsonl"))
+            ledger.record("/r/a.pdf", "analysed", response="r", file_hash="f1", text_hash="t1")
+            ledger.record("/r/b.pdf", "stored", candidate_id="b", file_hash="f2", text_hash="t2")
+            claimed = claimed_hashes(ledger)
+        self.assertEqual(claimed, {("file", "f1"): "/r/a.pdf", ("text", "t1"): "/r/a.pdf"})
+
+        claimed[("text", normalized_text_hash(self.TEXT))] = "/r/a.pdf"
+        _, items, stats, entries, _ = self.extract([("c.docx", b"same text")], claimed)
+        self.assertEqual(items, [])
+        self.assertEqual([entry["duplicate_of"] for entry in entries.values()], ["/r/a.pdf"])
+
+
+# Write Retry Tests
+class WriteRetryTests(SimpleTestCase):
+    def setUp(self):
+        self.processor = Neo4jResumeProcessor.__new__(Neo4jResumeProcessor)
+        self.processor.driver = mock.MagicMock()
+        self.session = self.processor.driver.session.return_value.__enter__.return_value
+        self.retries_before = INGEST_WRITE_RETRIES.total()
+
+    def test_transient_errors_are_retried_until_the_write_succeeds(self):
+        self.session.execute_write.side_effect = [
+            TransientError("deadlock"), TransientError("deadlock"), "a",
+        ]
+        with mock.patch.object(vectorise_v1.time, "sleep") as sleep:
+            result = self.processor._execute_write_with_retry("candidate a", mock.sentinel.tx_function, 1)
+
+        self.assertEqual(result, "a")
+        self.assertEqual(self.session.execute_write.call_count, 3)
+        self.session.execute_write.assert_called_with(mock.sentinel.tx_function, 1)
+        self.assertEqual(sleep.call_count, 2)
+        self.assertEqual(INGEST_WRITE_RETRIES.total() - self.retries_before, 2)
+
+    def test_error_is_raised_after_the_last_retry(self):
+        self.session.execute_write.side_effect = TransientError("deadlock")
+        with mock.patch.object(vectorise_v1, "INGEST_MAX_RETRIES", 2), \
+                mock.patch.object(vectorise_v1.time, "sleep"):
+            with self.assertRaises(TransientError):
+                self.processor._execute_write_with_retry("candidate a", mock.sentinel.tx_function)
+
+        self.assertEqual(self.session.execute_write.call_count, 3)
+        self.assertEqual(INGEST_WRITE_RETRIES.total() - self.retries_before, 2)
+
+    def test_other_errors_are_not_retried(self):
+        self.session.execute_write.side_effect = ValueError("bad data")
+        with self.assertRaises(ValueError):
+            self.processor._execute_write_with_retry("candidate a", mock.sentinel.tx_function)
+        self.assertEqual(self.session.execute_write.call_count, 1)
+
+# Embedding Version Tests
+class EmbeddingPropertyTests(SimpleTestCase):
+    def test_each_model_has_its_own_property(self):
+        self.assertEqual(embedding_property(EMBEDDING_MODEL), "embedding")
+        self.assertEqual(
+            embedding_property("intfloat/e5-small-v2"), "embedding_intfloat_e5_small_v2"
+        )
+
+
+# Resume Parser Tests
+class ResumeParserTests(SimpleTestCase):
+    RESPONSE = "\n".join([
+        "=== CANDIDATE PROFILE ===",
+        "Name: Asha Rao",
+        "E-mail: N/A",
+        "Years of Experience: 3.5",
+        "Previous Employer:",
+        "- Acme Corp",
+        "- Globex",
+        "Current Notice Period: 30 days",
+        "",
+        "=== EDUCATION ===",
+        "Institution: Pune University",
+        "- Degree/Program: B.Tech",
+        "- Year of Passing: 2019",
+        "",
+        "=== SKILLS ===",
+        "Languages:",
+        "  Python, Go",
+        "",
+        "=== LINKS ===",
+        "[GitHub]: https://github.com/asha",
+    ])
+
+    def test_json_and_graph_views_come_from_one_parse(self):
+        parsed = parse_resume_response(self.RESPONSE)
+
+        json_data = parsed.to_json()
+        self.assertEqual(json_data["candidate_profile"]["e-mail"], "N/A")
+        self.assertEqual(json_data["skills"], ["Languages:", "Python", "Go"])
+        self.assertEqual(json_data["links"], [{"title": "[GitHub]", "url": "https://github.com/asha"}])
+        self.assertEqual(parsed.years_of_experience, 3.5)
+
+        data = parsed.to_graph_data()
+        self.assertNotIn("email", data["personal_info"])
+        self.assertEqual(data["personal_info"]["previous_employers"], ["Acme Corp", "Globex"])
+        self.assertEqual(data["personal_info"]["current_notice_period"], "30 days")
+        self.assertEqual(
+            data["education"], [{"institution": "Pune University", "degree": "B.Tech", "year": "2019"}]
+        )
+        self.assertEqual(data["skills"][0]["category"], "Languages")
+        self.assertEqual(data["links"][0]["type"], "GitHub")
+
+    def test_structured_output_renders_to_the_same_model(self):
+        text = render_resume_text({
+            "profile": {"name": "Asha Rao", "email": None, "years_experience": 3.5,
+                        "previous_employers": ["Acme Corp", "Globex"]},
+            "education": [{"institution": "Pune University", "degree": "B.Tech", "grades": None, "year": "2019"}],
+            "skills": [{"category": "Languages", "names": ["Python", "Go"]}],
+            "links": [{"type": "GitHub", "url": "https://github.com/asha"}],
+            "projects": ["Resume search,\nwith Neo4j"],
+        })
+
+        data = parse_resume_response(text).to_graph_data()
+        self.assertEqual(
+            data["education"], [{"institution": "Pune University", "degree": "B.Tech", "year": "2019"}]
+        )
+        self.assertEqual([skill["name"] for skill in data["skills"]], ["Python", "Go"])
+        self.assertEqual((data["links"][0]["type"], data["links"][0]["url"]), ("GitHub", "https://github.com/asha"))
+        self.assertEqual(data["personal_info"]["previous_employers"], ["Acme Corp", "Globex"])
+        self.assertEqual(data["projects"], ["Resume search, with Neo4j"])
+        self.assertNotIn("email", data["personal_info"])
+
+
+# Search Query Compiler Tests
+class SearchQueryCompilerTests(SimpleTestCase):
+    ROW = {
+        "candidate": {"candidateId": "a", "yearsOfExperience": 4.0},
+        "total_skills": ["Python", "Django", "PHP"],
+        "all_roles": ["Backend Developer"],
+        "locations": [{"name": "Pune", "city": "Pune", "state": None, "country": "India"}],
+        "education": [],
+    }
+
+    def test_plain_queries_keep_the_flat_format(self):
+        self.assertEqual(
+            parse_search_query(
+                "skills python, C, C++, role software developer, Location: India."
+            ).to_search_params(),
+            {"skills": ["python", "c", "c++"], "role": ["software developer"], "location": ["india"]},
+        )
+
+    def test_operators_phrases_and_weights(self):
+        params = parse_search_query(
+            'skills^2 python AND django, NOT php role "data engineer, role" location pune'
+        ).to_search_params()
+        self.assertEqual(params["skills"], ["python", "django"])
+        self.assertEqual(params["role"], ["data engineer, role"])
+        self.assertEqual(params["required"], {"skills": ["python", "django"]})
+        self.assertEqual(params["excluded"], {"skills": ["php"]})
+        self.assertEqual(params["weights"], {"skills": 2.0})
+
+    def test_invalid_queries_are_rejected(self):
+        for query in ('skills python NOT', 'name asha AND ravi', 'email^2 a@b.com', 'skills "go'):
+            with self.assertRaises(QuerySyntaxError):
+                parse_search_query(query)
+
+    def test_exclusion_only_queries_are_rejected(self):
+        for query in ("skills NOT php", "skills NOT php role NOT intern"):
+            with self.assertRaises(QuerySyntaxError):
+                parse_search_query(query)
+        # Another field still gives the matches a score
+        self.assertEqual(
+            parse_search_query("location pune skills NOT php").to_search_params(),
+            {"location": ["pune"], "excluded": {"skills": ["php"]}},
+        )
+
+    def test_compile_is_memoized_and_selects_the_constraints_template(self):
+        compiled = compile_search_query("skills python AND django")
+        self.assertIs(compiled, compile_search_query("skills python AND django"))
+        self.assertTrue(compiled.mask & SEARCH_FILTER_FLAGS["constraints"])
+        self.assertIn("$excluded_roles", compiled.template(5))
+        self.assertEqual(compiled.parameters["excluded_roles"], [])
+        self.assertNotIn("$required_skills", compile_search_query("skills python").template())
+
+    def test_batch_matcher_applies_required_and_excluded_terms(self):
+        def matches(query):
+            params = prepare_query_params(compile_search_query(query).search_params)
+            return match_candidate_row(self.ROW, params) is not None
+
+        self.assertTrue(matches("skills python AND django location india"))
+        self.assertFalse(matches("skills python AND java"))
+        self.assertFalse(matches("skills python, NOT php"))
+        self.assertFalse(matches("role developer location NOT pune"))
+
+
+# PDF Link Index Tests
+class LinkIndexTests(SimpleTestCase):
+    def test_grid_matches_the_full_scan(self):
+        doc = fitz.open(stream=synthetic_resume(pages=2, links_per_page=15), filetype="pdf")
+        try:
+            for page in doc:
+                self.assertEqual(extract_page_links(page), scan_page_links(page))
+        finally:
+            doc.close()
+
+    def test_words_on_cell_boundaries_and_touching_edges(self):
+        words = [(0, 0, 24, 10, "edge"), (24, 0, 30, 10, "touching"), (100, 100, 150, 110, "far")]
+        grid = WordGrid(words)
+        self.assertEqual(grid.words_in((10, 2, 24, 8)), ["edge"])
+        self.assertEqual(grid.words_in((20, 2, 26, 8)), ["edge", "touching"])
+        self.assertEqual(grid.words_in((5, 5, 5, 9)), [])
+
+
+# Page-Parallel Extraction Tests
+class PageParallelExtractionTests(SimpleTestCase):
+    def test_page_ranges_are_reassembled_in_order(self):
+        data = synthetic_resume(pages=5, links_per_page=3)
+        # A thread pool exercises the range split without spawning processes
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            pages = extract_pages_parallel(data, 5, pool=pool, workers=3)
+        self.assertEqual(pages, extract_page_range(data, 0, 5))
+        self.assertEqual(len(pages), 5)
+
+
+# In-Memory Upload Tests
+class ResumeSourceTests(SimpleTestCase):
+    def test_buffer_and_path_extract_the_same(self):
+        data = synthetic_resume(pages=2, links_per_page=2)
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as f:
+            f.write(data)
+        try:
+            from_path = extract_text_and_links(f.name)
+        finally:
+            os.remove(f.name)
+        # Named .docx, but the magic bytes say PDF
+        upload = ResumeSource.from_upload(SimpleUploadedFile("resume.docx", data))
+        self.assertIsNone(upload.path)
+        self.assertEqual(upload.extension, ".pdf")
+        self.assertEqual(extract_text_and_links(upload), from_path)
+        self.assertEqual(extract_text_and_links(memoryview(data)), from_path)
+
+    def test_large_uploads_spill_to_disk(self):
+        data = synthetic_resume(pages=1, links_per_page=0)
+        with mock.patch.object(extract_text_link, "UPLOAD_SPILL_BYTES", len(data) - 1):
+            resume = ResumeSource.from_upload(SimpleUploadedFile("resume.pdf", data))
+        self.assertIsNone(resume.data)
+        self.assertEqual(resume.read(), data)
+        resume.close()
+        self.assertFalse(os.path.exists(resume.path))
+
+
+# Extraction Cache Tests
+class ExtractionCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "cache.sqlite3")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_least_recently_used_entries_are_evicted_and_the_rest_persist(self):
+        cache = ExtractionCache(self.path, max_bytes=25)
+        cache.put("a", "x" * 8, "[]")
+        cache.put("b", "y" * 8, "[]")
+        self.assertEqual(cache.get("a"), ("x" * 8, "[]"))
+        cache.put("c", "z" * 8, "[]")
+        cache.close()
+
+        reopened = ExtractionCache(self.path, max_bytes=25)
+        self.assertIsNone(reopened.get("b"))
+        self.assertEqual(reopened.get("a"), ("x" * 8, "[]"))
+        self.assertEqual(reopened.get("c"), ("z" * 8, "[]"))
+        reopened.close()
+
+    def test_known_revision_skips_the_download(self):
+        cache = ExtractionCache(self.path)
+        data = synthetic_resume(pages=1, links_per_page=1)
+        url = "https://www.dropbox.com/s/abc/resume.pdf?dl=1"
+        with mock.patch.object(extract_text_link, "get_extraction_cache", return_value=cache), \
+                mock.patch.object(extract_text_link, "download_dropbox_file", return_value=data) as download:
+            first = extract_text_link.extract_text_and_links_from_dropbox(url, revision="r1")
+            second = extract_text_link.extract_text_and_links_from_dropbox(
+                url.replace("?dl=1", "?dl=0"), revision="r1"
+            )
+            extract_text_link.extract_text_and_links_from_dropbox(url, revision="r2")
+        self.assertEqual(first, second)
+        # r1 twice with one download; r2 is downloaded but answered by content hash
+        self.assertEqual(download.call_count, 2)
+        self.assertEqual(source_key(url, "r1"), "https://www.dropbox.com/s/abc/resume.pdf@r1")
+        cache.close()
+
+
+# Text Compactor Tests
+class TextCompactorTests(SimpleTestCase):
+    PAGES = [
+        "Jane Doe - Resume\nSenior Engineer at Acme,   building data\npipelines and   services.\n\n\n"
+        "Developed a distrib-\nuted cache.\nconfidential\nPage 1 of 2\n",
+        "Jane Doe - Resume\n• Python, Neo4j\n• Django\nconfidential\nPage 2 of 2\n",
+    ]
+
+    def test_repeated_headers_footers_are_kept_once_and_broken_lines_joined(self):
+        compacted = compact_text("\f".join(self.PAGES), budget=0)
+        self.assertEqual(
+            compacted.text,
+            "Jane Doe - Resume\nSenior Engineer at Acme, building data pipelines and services.\n\n"
+            "Developed a distributed cache.\nconfidential\n\n• Python, Neo4j\n• Django",
+        )
+        self.assertEqual(compacted.repeated_lines_removed, 4)
+        self.assertGreater(compacted.tokens_saved, 0)
+        self.assertFalse(compacted.truncated)
+
+    def test_contact_details_in_a_running_header_survive(self):
+        page = "John Doe\njohn@x.com | +91 9876543210\nSenior Engineer at Acme\nBuilt data pipelines\n"
+        compacted = compact_text(f"{page}\f{page}", budget=0)
+        self.assertEqual(compacted.text.count("John Doe"), 1)
+        self.assertEqual(compacted.text.count("john@x.com | +91 9876543210"), 2)
+
+    def test_labels_lists_and_contact_lines_are_not_joined(self):
+        lines = ["Skills: Python, Django", "react, node.js", "Email", "john@x.com", "Portfolio", "github.com/john"]
+        self.assertEqual(join_broken_lines(lines), lines)
+
+    def test_wrapped_prose_is_joined_unless_it_holds_contact_details(self):
+        self.assertEqual(
+            join_broken_lines(["Built the ingestion service for resumes,", "search and ranking in Neo4j"]),
+            ["Built the ingestion service for resumes, search and ranking in Neo4j"],
+        )
+        self.assertEqual(
+            join_broken_lines(["Designed a scheduling service, see https://", "example.com/scheduler"]),
+            ["Designed a scheduling service, see https://", "example.com/scheduler"],
+        )
+        lines = ["Contact me at john@x.com for references", "and code samples"]
+        self.assertEqual(join_broken_lines(lines), lines)
+        lines = ["Reach me on +91 98765 43210 during office", "hours"]
+        self.assertEqual(join_broken_lines(lines), lines)
+
+    def test_single_page_keeps_its_lines(self):
+        compacted = compact_text(self.PAGES[1], budget=0)
+        self.assertIn("Jane Doe - Resume", compacted.text)
+        self.assertNotIn("Page 2", compacted.text)
+
+    def test_budget_cuts_whole_lines_from_the_end(self):
+        text = "\n".join(f"Project {i}: built service number {i}." for i in range(200))
+        compacted = compact_text(text, budget=100)
+        self.assertTrue(compacted.truncated)
+        self.assertLessEqual(compacted.tokens_after, 100)
+        lines = compacted.text.split("\n")
+        self.assertEqual(lines[0], "Project 0: built service number 0.")
+        self.assertEqual(lines[-1], TRUNCATION_MARKER)
+        self.assertEqual(count_tokens(compacted.text), compacted.tokens_after)
+
+
+# Streaming DOCX Tests
+class DocxStreamTests(SimpleTestCase):
+    def test_tables_and_link_anchor_text(self):
+        data = synthetic_docx(sections=2)
+        result = extract_docx(data)
+        legacy = python_docx_extract(data)
+        lines = result["text"].split("\n")
+        # Every body paragraph python-docx reads, plus one line per table row
+        self.assertEqual(
+            [line for line in lines if " | " not in line],
+            [line.strip() for line in legacy["text"].split("\n")],
+        )
+        self.assertEqual(sum(" | " in line for line in lines), 8)
+        self.assertEqual(result["hyperlinks"][0], ("project 0.0", "https://example.com/0/0"))
+        self.assertEqual(
+            sorted(url for _, url in result["hyperlinks"]), sorted(url for _, url in legacy["hyperlinks"])
+        )
+
+    def test_field_links_and_text_box_fallbacks(self):
+        w = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+        mc = 'xmlns:mc="http://schemas.openxmlformats.org/markup-compatibility/2006"'
+        document = (
+            f'<w:document {w} {mc}><w:body>'
+            '<w:p><w:r><w:t xml:space="preserve">Profile: </w:t></w:r>'
+            '<w:r><w:fldChar w:fldCharType="begin"/></w:r>'
+            '<w:r><w:instrText> HYPERLINK "https://github.com/jane" </w:instrText></w:r>'
+            '<w:r><w:fldChar w:fldCharType="separate"/></w:r>'
+            '<w:r><w:t>github.com/jane</w:t></w:r>'
+            '<w:r><w:fldChar w:fldCharType="end"/></w:r></w:p>'
+            '<w:p><w:r><mc:AlternateContent><mc:Choice><w:txbxContent>'
+            '<w:p><w:r><w:t>Skills</w:t></w:r></w:p>'
+            '</w:txbxContent></mc:Choice><mc:Fallback><w:txbxContent>'
+            '<w:p><w:r><w:t>Skills</w:t></w:r></w:p>'
+            '</w:txbxContent></mc:Fallback></mc:AlternateContent></w:r></w:p>'
+            '</w:body></w:document>'
+        )
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as archive:
+            archive.writestr("word/document.xml", document)
+        result = extract_docx(buffer.getvalue())
+        self.assertEqual(result["text"], "Profile: github.com/jane\nSkills\n")
+        self.assertEqual(result["hyperlinks"], [("github.com/jane", "https://github.com/jane")])
+
+
+# Pre-validation Tests
+class PrevalidationTests(SimpleTestCase):
+    RESUME = (
+        "Jane Doe\nSoftware Engineer\nExperience: Backend Developer at Acme, 2019 - Present. "
+        "Built REST APIs in Python and Django, and data pipelines on Neo4j.\n"
+    ) * 4
+
+    def test_resume_passes_and_likeness_decides_flag_or_reject(self):
+        self.assertEqual(prevalidate_resume(self.RESUME, likeness=lambda text: 0.6).verdict, "pass")
+        self.assertEqual(prevalidate_resume(self.RESUME, likeness=lambda text: 0.3).verdict, "flag")
+        report = prevalidate_resume(self.RESUME, likeness=lambda text: 0.05)
+        self.assertTrue(report.rejected)
+        self.assertEqual(report.stats["resume_likeness"], 0.05)
+
+    def test_scanned_pdf_is_rejected_without_embedding(self):
+        doc = fitz.open()
+        for _ in range(2):
+            page = doc.new_page()
+            page.insert_image(fitz.Rect(0, 0, 400, 600), pixmap=fitz.Pixmap(fitz.csRGB, fitz.IRect(0, 0, 8, 8), 0))
+        data = doc.tobytes()
+        likeness = mock.Mock(return_value=0.9)
+        report = prevalidate_resume("\f", pdf_source=data, likeness=likeness)
+        self.assertTrue(report.rejected)
+        self.assertEqual(report.stats["image_only_ratio"], 1.0)
+        likeness.assert_not_called()
+
+    def test_unreadable_text_layer_and_script(self):
+        self.assertTrue(prevalidate_resume("□□ 12 %% " * 100, likeness=None).rejected)
+        report = prevalidate_resume("अनुभव " * 100, likeness=None)
+        self.assertEqual(report.verdict, "flag")
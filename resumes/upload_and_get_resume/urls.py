@@ -1,8 +1,12 @@
 from django.urls import path
-from .views import UploadPDFView , SearchResumeView , AnalyseResumeView
+from .views import UploadPDFView , SearchResumeView , BatchSearchResumeView , SavedSearchView , SavedSearchMatchesView , AnalyseResumeView , MetricsView
 
 urlpatterns = [
     path('upload/', UploadPDFView.as_view(), name='upload-pdf'),
     path('search/', SearchResumeView.as_view(), name='search-resume'),
+    path('search/batch/', BatchSearchResumeView.as_view(), name='batch-search-resume'),
+    path('saved-searches/', SavedSearchView.as_view(), name='saved-searches'),
+    path('saved-searches/<str:search_id>/matches/', SavedSearchMatchesView.as_view(), name='saved-search-matches'),
     path('analyse/', AnalyseResumeView.as_view(), name='analyse-resume'),
+    path('metrics/', MetricsView.as_view(), name='metrics'),
 ]
\ No newline at end of file
@@ -0,0 +1,232 @@
+import csv
+import os
+import uuid
+from datetime import datetime
+
+from upload_and_get_resume.utils.vectorise_v1 import normalize_email, normalize_phone
+
+# neo4j-admin array delimiter; values containing it are written as a single element
+ARRAY_DELIMITER = ";"
+
+# Node files: label -> header. The first column is the node id within the label's id space.
+NODE_HEADERS = {
+    "Candidate": [
+        "candidateId:ID(Candidate)", "name", "email", "phoneNumber", "normalizedEmail", "normalizedPhone",
+        "yearsOfExperience:float", "resumePath", "jsonPath", "embedding:float[]", "textHash",
+        "missingFields:string[]", "createdDate", "resumeText",
+    ],
+    "Location": ["locationId:ID(Location)", "name", "city", "state", "country"],
+    "Company": ["companyId:ID(Company)", "companyName"],
+    "Designation": ["designationId:ID(Designation)", "name"],
+    "Education": ["educationId:ID(Education)", "institutionName", "degree", "grades"],
+    "Skill": ["skillId:ID(Skill)", "skillName", "category", "createdDate"],
+    "Language": ["languageId:ID(Language)", "languageName"],
+    "Achievement": ["achievementId:ID(Achievement)", "title", "description"],
+    "Project": ["projectId:ID(Project)", "projectName", "description"],
+    "Role": ["roleId:ID(Role)", "roleName"],
+    "Link": ["linkId:ID(Link)", "url", "linkType", "platform", "createdDate"],
+}
+
+# Relationship files: type -> (end label, property header)
+RELATIONSHIP_HEADERS = {
+    "LOCATED_IN": ("Location", ["locationType"]),
+    "WORKING_WORKED_AT": ("Company", ["isCurrent:boolean", "designation"]),
+    "WORKED_AT": ("Company", ["isCurrent:boolean", "order:int"]),
+    "HAS_DESIGNATION": ("Designation", ["isCurrent:boolean", "company"]),
+    "STUDIED_AT": ("Education", ["graduationYear", "grades"]),
+    "HAS_SKILL": ("Skill", ["category", "acquiredDate"]),
+    "SPEAKS": ("Language", []),
+    "ACHIEVED": ("Achievement", []),
+    "WORKED_ON": ("Project", []),
+    "SUITABLE_FOR": ("Role", []),
+    "HAS_LINK": ("Link", ["linkType", "addedDate"]),
+}
+
+
+# Format Array
+def _format_array(values):
+    return ARRAY_DELIMITER.join(str(value).replace(ARRAY_DELIMITER, ",") for value in values)
+
+
+# Truncate Title
+def _title(text):
+    return text[:100] + "..." if len(text) > 100 else text
+
+
+# Graph CSV Writer Class
+class GraphCsvWriter:
+    """
+    Writes parsed resumes as node and relationship CSV files for
+    `neo4j-admin database import full`, mirroring the graph that
+    Neo4jResumeProcessor writes over Bolt.
+
+    Candidates, achievements, projects and relationships are streamed to disk.
+    Shared nodes (skills, companies, locations, roles, ...) are deduplicated in
+    memory by the same key the Bolt writer MERGEs on and written on close().
+    """
+
+    SHARED_LABELS = ("Location", "Company", "Designation", "Education", "Skill", "Language", "Role", "Link")
+
+    def __init__(self, output_dir, processor):
+        self.output_dir = output_dir
+        # Only the parsing helpers of the processor are used; nothing is sent to Neo4j
+        self.processor = processor
+        os.makedirs(output_dir, exist_ok=True)
+        self._files = []
+        self._writers = {}
+        # The embedding column is named after the active model's property
+        candidate_header = [
+            f"{processor.embedding_property}:float[]" if column == "embedding:float[]" else column
+            for column in NODE_HEADERS["Candidate"]
+        ]
+        self._writers["Candidate"] = self._open("nodes_Candidate.csv", candidate_header + [":LABEL"])
+        for label in ("Achievement", "Project"):
+            self._writers[label] = self._open(f"nodes_{label}.csv", NODE_HEADERS[label] + [":LABEL"])
+        for rel_type, (end_label, properties) in RELATIONSHIP_HEADERS.items():
+            self._writers[rel_type] = self._open(
+                f"rels_{rel_type}.csv",
+                [":START_ID(Candidate)", f":END_ID({end_label})"] + properties + [":TYPE"],
+            )
+        # label -> merge key -> row (first column is the node id)
+        self.shared = {label: {} for label in self.SHARED_LABELS}
+        self.candidate_count = 0
+
+    def _open(self, name, header):
+        f = open(os.path.join(self.output_dir, name), "w", newline="", encoding="utf-8")
+        self._files.append(f)
+        writer = csv.writer(f)
+        writer.writerow(header)
+        return writer
+
+    # Shared Node
+    def _shared(self, label, key, *properties):
+        """Return the id of a shared node, creating it on first sight like MERGE ... ON CREATE"""
+        nodes = self.shared[label]
+        if key not in nodes:
+            nodes[key] = [str(uuid.uuid4()), *properties]
+        return nodes[key][0]
+
+    def _relate(self, rel_type, candidate_id, end_id, *properties):
+        self._writers[rel_type].writerow([candidate_id, end_id, *properties, rel_type])
+
+    # Add Candidate
+    def add_candidate(self, data, embedding, resume_file_path, json_file_path, years_of_experience,
+                      text_hash=None):
+        """
+        Add one parsed resume (output of parse_resume_data) and return its candidate id.
+        text_hash identifies the resume content, as the Bolt writer's textHash does.
+        """
+        now = datetime.now().isoformat()
+        candidate_id = str(uuid.uuid4())
+        personal_info = data["personal_info"]
+        self._writers["Candidate"].writerow([
+            candidate_id,
+            personal_info.get("name", "Unknown"),
+            personal_info.get("email"),
+            personal_info.get("phone"),
+            normalize_email(personal_info.get("email")),
+            normalize_phone(personal_info.get("phone")),
+            float(years_of_experience or 0),
+            resume_file_path,
+            json_file_path,
+            _format_array(embedding),
+            text_hash,
+            _format_array(self.processor._missing_fields(personal_info, data)),
+            now,
+            data.get("source_text"),
+            "Candidate",
+        ])
+
+        for location_type, key in (("current", "location"), ("preferred", "preferred_location")):
+            location_str = personal_info.get(key)
+            if location_str:
+                location_id = self._shared(
+                    "Location", location_str, location_str, *self.processor._split_location(location_str)
+                )
+                self._relate("LOCATED_IN", candidate_id, location_id, location_type)
+
+        current_employer = personal_info.get("current_employer")
+        if current_employer:
+            company_id = self._shared("Company", current_employer, current_employer)
+            self._relate(
+                "WORKING_WORKED_AT", candidate_id, company_id, "true", personal_info.get("current_designation")
+            )
+        for order, employer in enumerate(personal_info.get("previous_employers", [])):
+            if employer and employer != "N/A":
+                company_id = self._shared("Company", employer, employer)
+                self._relate("WORKED_AT", candidate_id, company_id, "false", order)
+
+        designation = personal_info.get("current_designation")
+        if designation:
+            designation_id = self._shared("Designation", designation, designation)
+            self._relate("HAS_DESIGNATION", candidate_id, designation_id, "true", current_employer)
+
+        for edu in data["education"]:
+            if not edu.get("institution"):
+                continue
+            degree = edu.get("degree", "Unknown")
+            education_id = self._shared(
+                "Education", (edu["institution"], degree), edu["institution"], degree, edu.get("grades")
+            )
+            self._relate("STUDIED_AT", candidate_id, education_id, edu.get("year"), edu.get("grades"))
+
+        for skill in data["skills"]:
+            if not skill or not skill.get("name"):
+                continue
+            category = skill.get("category", "General")
+            skill_id = self._shared("Skill", skill["name"], skill["name"], category, now)
+            self._relate("HAS_SKILL", candidate_id, skill_id, category, now)
+
+        for language in data["languages"]:
+            if language and language != "N/A":
+                language_id = self._shared("Language", language, language)
+                self._relate("SPEAKS", candidate_id, language_id)
+
+        for label, rel_type, items in (
+            ("Achievement", "ACHIEVED", data["achievements"]),
+            ("Project", "WORKED_ON", data["projects"]),
+        ):
+            for item in items:
+                if item and item != "N/A":
+                    node_id = str(uuid.uuid4())
+                    self._writers[label].writerow([node_id, _title(item), item, label])
+                    self._relate(rel_type, candidate_id, node_id)
+
+        for role in data["suitable_roles"]:
+            if role and role != "N/A":
+                role_id = self._shared("Role", role, role)
+                self._relate("SUITABLE_FOR", candidate_id, role_id)
+
+        for link in data["links"]:
+            if not link or not link.get("url"):
+                continue
+            link_type = link.get("type", "Other")
+            link_id = self._shared("Link", link["url"], link["url"], link_type, link_type, now)
+            self._relate("HAS_LINK", candidate_id, link_id, link_type, now)
+
+        self.candidate_count += 1
+        return candidate_id
+
+    # Close
+    def close(self):
+        """Write the deduplicated shared nodes and close every file"""
+        for label, nodes in self.shared.items():
+            writer = self._open(f"nodes_{label}.csv", NODE_HEADERS[label] + [":LABEL"])
+            for row in nodes.values():
+                writer.writerow([*row, label])
+        for f in self._files:
+            f.close()
+
+    # Import Command
+    def import_command(self, database="neo4j"):
+        """
+        The neo4j-admin invocation that loads the written files.
+        resumeText and description values span several lines, so multi-line fields are enabled.
+        """
+        names = sorted(os.listdir(self.output_dir))
+        nodes = [f"--nodes={os.path.join(self.output_dir, n)}" for n in names if n.startswith("nodes_")]
+        rels = [f"--relationships={os.path.join(self.output_dir, n)}" for n in names if n.startswith("rels_")]
+        return " ".join(
+            ["neo4j-admin database import full", *nodes, *rels,
+             f"--array-delimiter='{ARRAY_DELIMITER}'", "--multiline-fields=true", database]
+        )
@@ -0,0 +1,203 @@
+import io
+import posixpath
+import re
+import zipfile
+
+from lxml import etree
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+R_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+MC_NS = "http://schemas.openxmlformats.org/markup-compatibility/2006"
+PACKAGE_RELS_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+HYPERLINK_RELTYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink"
+OFFICE_DOCUMENT_RELTYPE = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+DEFAULT_DOCUMENT_PART = "word/document.xml"
+
+# Separator of table cells on one line; each table row becomes one line
+CELL_SEPARATOR = " | "
+
+# HYPERLINK "url" field codes; \l "bookmark" links inside the document are skipped
+FIELD_URL_PATTERN = re.compile(r'^\s*HYPERLINK\s+"([^"]+)"')
+
+
+def _w(tag):
+    return f"{{{W_NS}}}{tag}"
+
+
+P, T, TAB, BR, CR = _w("p"), _w("t"), _w("tab"), _w("br"), _w("cr")
+NO_BREAK_HYPHEN = _w("noBreakHyphen")
+TBL, TR, TC, HYPERLINK, BODY = _w("tbl"), _w("tr"), _w("tc"), _w("hyperlink"), _w("body")
+FLD_SIMPLE, FLD_CHAR, INSTR_TEXT = _w("fldSimple"), _w("fldChar"), _w("instrText")
+FALLBACK = f"{{{MC_NS}}}Fallback"
+RELATIONSHIP = f"{{{PACKAGE_RELS_NS}}}Relationship"
+R_ID, W_INSTR, W_FLD_CHAR_TYPE = f"{{{R_NS}}}id", _w("instr"), _w("fldCharType")
+INLINE_TEXT = {TAB: "\t", BR: "\n", CR: "\n", NO_BREAK_HYPHEN: "-"}
+# The only elements iterparse reports; run properties and the like never reach Python
+STREAM_TAGS = (
+    P, T, TBL, TR, TC, HYPERLINK, FLD_SIMPLE, FLD_CHAR, INSTR_TEXT, FALLBACK, *INLINE_TEXT,
+)
+
+
+# Read Relationships
+def read_relationships(archive, part):
+    """Id -> (type, target) of a part's relationships, from its _rels/<part>.rels"""
+    folder, name = posixpath.split(part)
+    rels_path = posixpath.join(folder, "_rels", f"{name}.rels")
+    try:
+        data = archive.read(rels_path)
+    except KeyError:
+        return {}
+    root = etree.fromstring(data, parser=etree.XMLParser(resolve_entities=False))
+    return {
+        rel.get("Id"): (rel.get("Type"), rel.get("Target"))
+        for rel in root.iter(RELATIONSHIP)
+    }
+
+
+# Main Document Part
+def main_document_part(archive):
+    """The body part named by the package relationships, usually word/document.xml"""
+    for rel_type, target in read_relationships(archive, "").values():
+        if rel_type == OFFICE_DOCUMENT_RELTYPE:
+            return target.lstrip("/")
+    return DEFAULT_DOCUMENT_PART
+
+
+# Docx Text Stream Class
+class DocxTextStream:
+    """
+    Event handler for one pass of iterparse over a document part. Paragraphs become
+    lines, each table row one line of its cells, and hyperlinks, by relationship id
+    or HYPERLINK field, are returned with the text they cover.
+    """
+
+    def __init__(self, hyperlinks):
+        # Relationship id -> URL of the part's external hyperlinks
+        self.hyperlinks = hyperlinks
+        self.lines = []
+        self.links = []
+        # Lines of the innermost open table cell, or of the body
+        self.containers = [self.lines]
+        self.rows = []
+        # Text pieces of the open paragraphs; text boxes nest paragraphs in runs
+        self.paragraphs = []
+        # Open links: (URL or None, paragraph pieces, index the link text starts at)
+        self.open_links = []
+        # Open complex fields: {"instr": [...], "link": open link or None}
+        self.fields = []
+        self.skip = 0
+
+    def start(self, elem):
+        tag = elem.tag
+        if tag == FALLBACK:
+            # Legacy copy of the alternate content (text boxes) already read
+            self.skip += 1
+        elif self.skip:
+            return
+        elif tag == P:
+            self.paragraphs.append([])
+        elif tag == TR:
+            self.rows.append([])
+        elif tag == TC:
+            self.containers.append([])
+        elif tag == HYPERLINK:
+            self.open_link(self.hyperlinks.get(elem.get(R_ID)))
+        elif tag == FLD_SIMPLE:
+            match = FIELD_URL_PATTERN.match(elem.get(W_INSTR) or "")
+            self.open_link(match.group(1) if match else None)
+        elif tag == FLD_CHAR:
+            self.field_char(elem.get(W_FLD_CHAR_TYPE))
+
+    def end(self, elem):
+        tag = elem.tag
+        if tag == FALLBACK:
+            self.skip -= 1
+            return
+        if self.skip:
+            return
+        if tag == T:
+            if self.paragraphs and elem.text:
+                self.paragraphs[-1].append(elem.text)
+        elif tag in INLINE_TEXT:
+            if self.paragraphs:
+                self.paragraphs[-1].append(INLINE_TEXT[tag])
+        elif tag == INSTR_TEXT:
+            if self.fields and elem.text:
+                self.fields[-1]["instr"].append(elem.text)
+        elif tag == P:
+            self.containers[-1].append("".join(self.paragraphs.pop()).strip())
+        elif tag == TC:
+            cell = " ".join(line for line in self.containers.pop() if line)
+            if self.rows:
+                self.rows[-1].append(cell)
+        elif tag == TR:
+            row = CELL_SEPARATOR.join(cell for cell in self.rows.pop() if cell)
+            self.containers[-1].append(row)
+        elif tag in (HYPERLINK, FLD_SIMPLE):
+            self.close_link()
+
+    def open_link(self, url):
+        pieces = self.paragraphs[-1] if self.paragraphs else []
+        link = (url, pieces, len(pieces))
+        self.open_links.append(link)
+        return link
+
+    def close_link(self, link=None):
+        if link is None:
+            if not self.open_links:
+                return
+            link = self.open_links.pop()
+        else:
+            self.open_links = [open_link for open_link in self.open_links if open_link is not link]
+        url, pieces, start = link
+        if url:
+            text = " ".join("".join(pieces[start:]).split())
+            self.links.append((text or url, url))
+
+    def field_char(self, kind):
+        """Complex fields: begin, instruction text, separate, displayed text, end"""
+        if kind == "begin":
+            self.fields.append({"instr": [], "link": None})
+        elif kind == "separate" and self.fields:
+            match = FIELD_URL_PATTERN.match("".join(self.fields[-1]["instr"]))
+            if match:
+                self.fields[-1]["link"] = self.open_link(match.group(1))
+        elif kind == "end" and self.fields:
+            field = self.fields.pop()
+            if field["link"] is not None:
+                self.close_link(field["link"])
+
+
+# Extract DOCX
+def extract_docx(source):
+    """
+    Extracts text and (anchor text, url) links from a DOCX file path or bytes by
+    streaming word/document.xml through lxml's iterparse, without building a
+    document object model. Body elements are freed as soon as they are read.
+    """
+    if not isinstance(source, str):
+        source = io.BytesIO(source)
+    with zipfile.ZipFile(source) as archive:
+        part = main_document_part(archive)
+        hyperlinks = {
+            rel_id: target
+            for rel_id, (rel_type, target) in read_relationships(archive, part).items()
+            if rel_type == HYPERLINK_RELTYPE
+        }
+        stream = DocxTextStream(hyperlinks)
+        with archive.open(part) as xml:
+            for event, elem in etree.iterparse(
+                xml, events=("start", "end"), tag=STREAM_TAGS, resolve_entities=False, no_network=True
+            ):
+                if event == "start":
+                    stream.start(elem)
+                    continue
+                stream.end(elem)
+                parent = elem.getparent()
+                if parent is not None and parent.tag == BODY:
+                    # Paragraphs and tables of the body are fully handled once closed
+                    elem.clear()
+                    while elem.getprevious() is not None:
+                        del parent[0]
+
+    return {"text": "\n".join(stream.lines), "hyperlinks": stream.links}
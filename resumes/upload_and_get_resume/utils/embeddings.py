@@ -0,0 +1,74 @@
+import re
+import threading
+import time
+from functools import lru_cache
+from sentence_transformers import SentenceTransformer
+
+EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+# Seconds a process keeps the active model before re-reading it from the graph
+EMBEDDING_CONFIG_TTL = 30
+
+_active_model = {"name": None, "expires": 0.0}
+_active_model_lock = threading.Lock()
+
+
+# Get Sentence Model
+@lru_cache(maxsize=None)
+def get_sentence_model(model_name=EMBEDDING_MODEL):
+    """
+    Load a SentenceTransformer once per process and share it between the
+    search engine, the graph writer and saved-search percolation.
+    """
+    return SentenceTransformer(model_name)
+
+
+# Embedding Property
+def embedding_property(model_name):
+    """
+    Node property holding the embedding of the given model. The original model
+    keeps the plain `embedding` property so existing graphs stay valid.
+    """
+    if model_name == EMBEDDING_MODEL:
+        return "embedding"
+    return "embedding_" + re.sub(r"[^0-9a-zA-Z]+", "_", model_name).strip("_").lower()
+
+
+# Get Active Embedding Model
+def get_active_embedding_model(driver):
+    """
+    Model whose embeddings search and ingest use, from the EmbeddingConfig node.
+    Cached for EMBEDDING_CONFIG_TTL seconds, so a swap reaches every process
+    without a restart.
+    """
+    with _active_model_lock:
+        if _active_model["name"] and time.monotonic() < _active_model["expires"]:
+            return _active_model["name"]
+    try:
+        with driver.session() as session:
+            record = session.run(
+                "MATCH (e:EmbeddingConfig {name: 'embeddings'}) RETURN e.activeModel as model"
+            ).single()
+        model_name = (record and record["model"]) or EMBEDDING_MODEL
+    except Exception as e:
+        print(f"[WARNING] Could not read the active embedding model, using {EMBEDDING_MODEL}: {e}")
+        return EMBEDDING_MODEL
+    with _active_model_lock:
+        _active_model.update(name=model_name, expires=time.monotonic() + EMBEDDING_CONFIG_TTL)
+    return model_name
+
+
+# Set Active Embedding Model
+def set_active_embedding_model(driver, model_name):
+    """Switch search and ingest to another model's embeddings"""
+    with driver.session() as session:
+        session.run(
+            """
+            MERGE (e:EmbeddingConfig {name: 'embeddings'})
+            SET e.previousModel = e.activeModel,
+                e.activeModel = $model,
+                e.activatedDate = toString(datetime())
+            """,
+            {"model": model_name},
+        )
+    with _active_model_lock:
+        _active_model.update(name=model_name, expires=time.monotonic() + EMBEDDING_CONFIG_TTL)
@@ -1,73 +1,217 @@
 import os
-import fitz  
+import fitz
 import json
-from docx import Document
+import hashlib
+import tempfile
+import multiprocessing
+import requests
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import urlparse
+from upload_and_get_resume.utils.extraction_cache import get_extraction_cache, source_key
+from upload_and_get_resume.utils.docx_stream import extract_docx
+from upload_and_get_resume.utils.link_index import extract_page_links
+from upload_and_get_resume.utils.text_compactor import PAGE_BREAK
 
-# Extract from PDF
-def extract_from_pdf(file_path):
+# Documents with at least this many pages are split across the page pool
+PARALLEL_PAGE_THRESHOLD = int(os.environ.get("PARALLEL_PAGE_THRESHOLD", 24))
+# Worker processes of the page pool; fewer than 2 disables page-parallel extraction
+PAGE_WORKERS = int(os.environ.get("PAGE_WORKERS", os.cpu_count() or 1))
+# Uploads above this size are spilled to a temporary file instead of held in memory
+UPLOAD_SPILL_BYTES = int(os.environ.get("UPLOAD_SPILL_BYTES", 10 * 1024 * 1024))
+
+_page_pool = None
+
+
+# Resume Source Class
+class ResumeSource:
     """
-    Extracts Text and links from the resume provided if in PDF format
+    One resume file for extraction, hashing and storage: the bytes in memory, or a
+    file on disk (an existing path, Django's own temporary upload file, or a spill
+    file for uploads above UPLOAD_SPILL_BYTES). Every consumer reads the same buffer.
     """
-    doc = fitz.open(file_path)
-    full_text = []
-    links = []
 
-    for page in doc:
-        text = page.get_text()
-        full_text.append(text)
+    def __init__(self, name, data=None, path=None, owns_path=False):
+        self.name = name
+        self.data = data
+        self.path = path
+        self._owns_path = owns_path
 
-        link_info = page.get_links()
-        words = page.get_text("words")
-        for link in link_info:
-            if "uri" in link:
-                rect = link["from"]
-                linked_words = [
-                    word[4] for word in words if fitz.Rect(word[:4]).intersects(rect)
-                ]
-                link_text = " ".join(linked_words).strip()
-                if link_text:
-                    links.append((link_text, link["uri"]))
+    @classmethod
+    def from_path(cls, path):
+        return cls(os.path.basename(path), path=path)
 
-    return {"text": "\n".join(full_text), "hyperlinks": links}
+    @classmethod
+    def from_upload(cls, uploaded_file):
+        """Wrap a Django UploadedFile without writing it to disk unless it is large"""
+        if hasattr(uploaded_file, "temporary_file_path"):
+            # Django already streamed this upload to disk
+            return cls(uploaded_file.name, path=uploaded_file.temporary_file_path())
+        if uploaded_file.size <= UPLOAD_SPILL_BYTES:
+            return cls(uploaded_file.name, data=uploaded_file.read())
+        suffix = os.path.splitext(uploaded_file.name)[1]
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as spill:
+            for chunk in uploaded_file.chunks():
+                spill.write(chunk)
+        return cls(uploaded_file.name, path=spill.name, owns_path=True)
 
-# Extract from Docx
-def extract_from_docx(file_path):
+    # Extension
+    @property
+    def extension(self):
+        """File type from the content's magic bytes, falling back to the file name"""
+        head = self.read(4)
+        if head == b"%PDF":
+            return ".pdf"
+        if head == b"PK\x03\x04":
+            return ".docx"
+        return os.path.splitext(self.name)[1].lower()
+
+    def read(self, size=-1):
+        if self.data is not None:
+            return self.data if size < 0 else self.data[:size]
+        with open(self.path, "rb") as f:
+            return f.read(size)
+
+    # SHA-256
+    def sha256(self):
+        if self.data is not None:
+            return hashlib.sha256(self.data).hexdigest()
+        # Imported here: the registry pulls in the Neo4j processor
+        from upload_and_get_resume.utils.resume_registry import file_sha256
+
+        return file_sha256(self.path)
+
+    # Open Source
+    def open_source(self):
+        """What the PDF and DOCX extractors open: the path on disk, else the bytes"""
+        return self.path if self.data is None else self.data
+
+    def close(self):
+        if self._owns_path and self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+# Open PDF
+def open_pdf(source):
+    """Open a PDF from a file path or a bytes-like buffer"""
+    if isinstance(source, str):
+        return fitz.open(source)
+    return fitz.open(stream=source, filetype="pdf")
+
+
+# Extract Page Range
+def extract_page_range(source, start, stop):
     """
-    Extracts Text and links from the resume provided if in docx format
+    Extracts the text and (anchor text, uri) links of pages [start, stop) of a PDF,
+    given as a file path or bytes. Runs in the page pool's worker processes.
     """
-    doc = Document(file_path)
-    text_parts = []
-    links = []
+    doc = open_pdf(source)
+    try:
+        return [(doc[i].get_text(), extract_page_links(doc[i])) for i in range(start, stop)]
+    finally:
+        doc.close()
 
-    for para in doc.paragraphs:
-        text_parts.append(para.text)
 
-    rels = doc.part.rels
-    for rel in rels:
+# Get Page Pool
+def get_page_pool():
+    """Process pool shared by page-parallel extractions, started on first use"""
+    global _page_pool
+    if _page_pool is None:
+        # Spawned workers do not inherit the driver and MCP connection threads
+        _page_pool = ProcessPoolExecutor(
+            max_workers=PAGE_WORKERS, mp_context=multiprocessing.get_context("spawn")
+        )
+    return _page_pool
+
+
+# Extract Pages in Parallel
+def extract_pages_parallel(source, page_count, pool=None, workers=None):
+    """Split the pages into one contiguous range per worker and reassemble them in order"""
+    pool = pool or get_page_pool()
+    if isinstance(source, memoryview):
+        # Buffers are pickled to the workers; a memoryview cannot be
+        source = bytes(source)
+    workers = min(workers or PAGE_WORKERS, page_count)
+    step = -(-page_count // workers)
+    futures = [
+        pool.submit(extract_page_range, source, start, min(start + step, page_count))
+        for start in range(0, page_count, step)
+    ]
+    return [page for future in futures for page in future.result()]
+
+
+# Extract PDF Pages
+def extract_pdf_pages(source, parallel_threshold=None):
+    """
+    Returns (text, links) per page of a PDF path or bytes. Documents at or above the
+    page threshold go to the page pool, except inside a worker process (such as the
+    import_resumes extract pool), where the pages are extracted sequentially.
+    """
+    threshold = PARALLEL_PAGE_THRESHOLD if parallel_threshold is None else parallel_threshold
+    doc = open_pdf(source)
+    try:
+        page_count = doc.page_count
         if (
-            rels[rel].reltype
-            == "http://schemas.openxmlformats.org/officeDocument/2006/relationships/hyperlink"
+            page_count < threshold
+            or PAGE_WORKERS < 2
+            or multiprocessing.parent_process() is not None
         ):
-            link_url = rels[rel].target_ref
+            return [(page.get_text(), extract_page_links(page)) for page in doc]
+    finally:
+        doc.close()
+
+    try:
+        return extract_pages_parallel(source, page_count)
+    except BrokenProcessPool as e:
+        global _page_pool
+        _page_pool = None
+        print(f"[WARN] Page pool failed, extracting sequentially: {e}")
+        return extract_page_range(source, 0, page_count)
+
+
+# Extract from PDF
+def extract_from_pdf(source):
+    """
+    Extracts Text and links from the resume provided if in PDF format, given as a
+    file path or bytes
+    """
+    full_text = []
+    links = []
 
-            links.append(("Linked text (not reliably extracted)", link_url))
+    for text, page_links in extract_pdf_pages(source):
+        full_text.append(text)
+        links.extend(page_links)
 
-    return {"text": "\n".join(text_parts), "hyperlinks": links}
+    # Page breaks let the compactor find running headers and footers
+    return {"text": PAGE_BREAK.join(full_text), "hyperlinks": links}
+
+# Extract from Docx
+def extract_from_docx(source):
+    """
+    Extracts Text and links from the resume provided if in docx format, given as a
+    file path or bytes: paragraphs, table rows and hyperlinks with their anchor text
+    """
+    return extract_docx(source)
 
 # Extract Text and links
-def extract_text_and_links(file_path):
+def extract_text_and_links(source):
     """
-    Extract Text and Links from the resume provided 
+    Extract Text and Links from the resume provided: a file path, a bytes-like
+    buffer or a ResumeSource. Returns (text, links json) or {"error": ...}
     """
-    if not os.path.exists(file_path):
-        return {"error": "File does not exist."}
+    if isinstance(source, str):
+        if not os.path.exists(source):
+            return {"error": "File does not exist."}
+        source = ResumeSource.from_path(source)
+    elif not isinstance(source, ResumeSource):
+        source = ResumeSource("resume", data=source)
 
-    ext = os.path.splitext(file_path)[1].lower()
+    ext = source.extension
 
     if ext == ".pdf":
-        result =  extract_from_pdf(file_path)
+        result = extract_from_pdf(source.open_source())
     elif ext == ".docx":
-        result = extract_from_docx(file_path)
+        result = extract_from_docx(source.open_source())
     else:
         return {"error": f"Unsupported file type: {ext}"}
     resume_text = result.get("text", "No text found")
@@ -82,5 +226,49 @@ def extract_text_and_links(file_path):
     return resume_text,links_json
 
 
+# Download dropBox File
+def download_dropbox_file(url):
+    """
+    Convert a Dropbox shared link to a direct download link and return content
+    """
+    if not url.startswith("https://www.dropbox.com"):
+        raise ValueError("Only Dropbox shared links are supported.")
+
+    dl_url = url.replace("?dl=0", "?dl=1").replace("?rlkey=", "?raw=1&rlkey=")
+    response = requests.get(dl_url)
+    if response.status_code != 200:
+        raise Exception(f"Failed to download file from Dropbox: {response.status_code}")
+    return response.content
+
+
+# Extract Text and links from Dropbox
+def extract_text_and_links_from_dropbox(url, revision=None):
+    """
+    Extracts all the texts and Links present in the resume present in the dropbox.
+
+    Results are cached by file content, and by link and revision when the revision
+    is given, in which case a cached resume is not even downloaded.
+    """
+    try:
+        cache = get_extraction_cache()
+        key = source_key(url, revision) if revision else None
+        cached = cache.get_by_source(key) if key else None
+        if cached:
+            return cached
+
+        file_bytes = download_dropbox_file(url)
+        content_hash = hashlib.sha256(file_bytes).hexdigest()
+        cached = cache.get(content_hash, key=key)
+        if cached:
+            return cached
 
+        # The shared link's path (without query string) names the file
+        result = extract_text_and_links(
+            ResumeSource(os.path.basename(urlparse(url).path), data=file_bytes)
+        )
+        if not isinstance(result, dict):
+            cache.put(content_hash, *result, key=key)
+        return result
 
+    except Exception as e:
+        return {"error": str(e)}
@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import parse_qsl, urlencode, urlparse
+
+from upload_and_get_resume.utils.metrics import (
+    TEXT_CACHE_EVICTIONS,
+    TEXT_CACHE_REQUESTS,
+)
+
+EXTRACTION_CACHE_PATH = os.environ.get(
+    "EXTRACTION_CACHE_PATH", os.path.join("media", "extraction_cache.sqlite3")
+)
+# Bound on the stored text and links; least recently used entries are evicted beyond it
+EXTRACTION_CACHE_MAX_BYTES = int(os.environ.get("EXTRACTION_CACHE_MAX_BYTES", 256 * 1024 * 1024))
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+# Source Key
+def source_key(url, revision):
+    """Cache key of one revision of a shared file; the dl/raw switches do not change the file"""
+    parsed = urlparse(url)
+    query = [(k, v) for k, v in parse_qsl(parsed.query) if k not in ("dl", "raw")]
+    return f"{parsed._replace(query=urlencode(query)).geturl()}@{revision}"
+
+
+# Extraction Cache Class
+class ExtractionCache:
+    """
+    Size-bounded LRU cache of extracted resume text and links in SQLite, so it
+    survives restarts and is shared by every worker process.
+
+    Entries are keyed by the SHA-256 of the file content. A second table maps a
+    shared link's revision to its content hash, so a known revision is answered
+    without downloading the file at all.
+    """
+
+    def __init__(self, path, max_bytes=EXTRACTION_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS entries (
+                content_hash TEXT PRIMARY KEY,
+                text TEXT NOT NULL,
+                links TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_access REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS entries_last_access ON entries(last_access);
+            CREATE TABLE IF NOT EXISTS sources (
+                source_key TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL
+            );
+            """
+        )
+
+    def _touch(self, column, key):
+        """Return (text, links) of the entry matching column = key and mark it used"""
+        if column == "source_key":
+            query = (
+                "SELECT e.content_hash, e.text, e.links FROM sources s "
+                "JOIN entries e ON e.content_hash = s.content_hash WHERE s.source_key = ?"
+            )
+        else:
+            query = "SELECT content_hash, text, links FROM entries WHERE content_hash = ?"
+        with self._lock:
+            row = self._db.execute(query, (key,)).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE entries SET last_access = ? WHERE content_hash = ?", (time.time(), row[0])
+            )
+        return row[1], row[2]
+
+    # Get By Source
+    def get_by_source(self, key):
+        """Cached (text, links) for a shared link revision, without a download"""
+        result = self._touch("source_key", key)
+        if result is not None:
+            TEXT_CACHE_REQUESTS.inc(result="source_hit")
+        return result
+
+    # Get
+    def get(self, content_hash, key=None):
+        """Cached (text, links) for file content; remembers key as another name for it"""
+        result = self._touch("content_hash", content_hash)
+        TEXT_CACHE_REQUESTS.inc(result="content_hit" if result is not None else "miss")
+        if result is not None and key:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sources (source_key, content_hash) VALUES (?, ?)",
+                    (key, content_hash),
+                )
+        return result
+
+    # Put
+    def put(self, content_hash, text, links, key=None):
+        size = len(text.encode("utf-8")) + len(links.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO entries (content_hash, text, links, size, last_access) "
+                    "VALUES (?, ?, ?, ?, ?)",
+                    (content_hash, text, links, size, time.time()),
+                )
+                if key:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO sources (source_key, content_hash) VALUES (?, ?)",
+                        (key, content_hash),
+                    )
+                evicted = self._evict()
+                self._db.execute("COMMIT")
+            except Exception:
+                self._db.execute("ROLLBACK")
+                raise
+        if evicted:
+            TEXT_CACHE_EVICTIONS.inc(evicted)
+
+    def _evict(self):
+        """Drop least recently used entries until the cache fits max_bytes"""
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        evicted = 0
+        if total <= self.max_bytes:
+            return evicted
+        for content_hash, size in self._db.execute(
+            "SELECT content_hash, size FROM entries ORDER BY last_access"
+        ).fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM entries WHERE content_hash = ?", (content_hash,))
+            self._db.execute("DELETE FROM sources WHERE content_hash = ?", (content_hash,))
+            total -= size
+            evicted += 1
+        return evicted
+
+    def close(self):
+        self._db.close()
+
+
+# Get Extraction Cache
+def get_extraction_cache():
+    """Process-wide extraction cache backed by EXTRACTION_CACHE_PATH"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExtractionCache(EXTRACTION_CACHE_PATH)
+        return _cache
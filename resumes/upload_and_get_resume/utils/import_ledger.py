@@ -0,0 +1,63 @@
+import json
+import os
+import threading
+from datetime import datetime
+
+# Stages a file passes through during a bulk import, in order
+LEDGER_STAGES = ("analysed", "uploaded", "stored")
+
+
+# Import Ledger Class
+class ImportLedger:
+    """
+    Append-only JSONL progress ledger of a bulk import. Every completed stage of a
+    file appends one line with that stage's output, so an interrupted import can
+    resume each file from its last completed stage instead of starting over.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self.entries = self.load(path)
+
+    # Load Ledger
+    @staticmethod
+    def load(path):
+        """Fold the ledger lines into the latest state per file path"""
+        entries = {}
+        if not os.path.exists(path):
+            return entries
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by a crash is simply redone
+                    continue
+                entries.setdefault(record["path"], {}).update(record)
+        return entries
+
+    # Record Stage
+    def record(self, path, status, **fields):
+        """Append one stage result for a file and flush it to disk"""
+        record = {"path": path, "status": status, "at": datetime.now().isoformat(), **fields}
+        with self._lock:
+            self.entries.setdefault(path, {}).update(record)
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+                f.flush()
+
+    # Get Status
+    def status(self, path):
+        """
+        Return the last completed stage of a file, or None if it has not started.
+        A failed file keeps the outputs of its earlier stages, so it resumes after them.
+        """
+        entry = self.entries.get(path, {})
+        for stage, output in zip(reversed(LEDGER_STAGES), ("candidate_id", "resume_link", "response")):
+            if entry.get(output):
+                return stage
+        return None
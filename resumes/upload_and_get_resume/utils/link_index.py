@@ -0,0 +1,68 @@
+from collections import defaultdict
+
+# Side of a grid cell in PDF points; about two lines of body text
+GRID_CELL_SIZE = 24.0
+
+
+# Word Grid Class
+class WordGrid:
+    """
+    Buckets a page's word boxes (page.get_text("words") tuples) into a uniform grid,
+    so a link rectangle is only tested against the words in the cells it covers
+    instead of every word on the page.
+    """
+
+    def __init__(self, words, cell_size=GRID_CELL_SIZE):
+        self.words = words
+        self.cell_size = cell_size
+        self.cells = defaultdict(list)
+        for index, word in enumerate(words):
+            x0, y0, x1, y1 = word[:4]
+            if x0 >= x1 or y0 >= y1:
+                # Empty boxes never intersect anything
+                continue
+            for cell in self._cells(x0, y0, x1, y1):
+                self.cells[cell].append(index)
+
+    def _cells(self, x0, y0, x1, y1):
+        size = self.cell_size
+        for row in range(int(y0 // size), int(y1 // size) + 1):
+            for column in range(int(x0 // size), int(x1 // size) + 1):
+                yield row, column
+
+    # Words In
+    def words_in(self, rect):
+        """Text of the words whose boxes overlap rect, in reading order"""
+        x0, y0, x1, y1 = rect
+        if x0 >= x1 or y0 >= y1:
+            return []
+        candidates = set()
+        for cell in self._cells(x0, y0, x1, y1):
+            candidates.update(self.cells.get(cell, ()))
+        matched = []
+        for index in sorted(candidates):
+            wx0, wy0, wx1, wy1 = self.words[index][:4]
+            # Same test as fitz.Rect.intersects: a non-empty overlap
+            if wx0 < x1 and x0 < wx1 and wy0 < y1 and y0 < wy1:
+                matched.append(self.words[index][4])
+        return matched
+
+
+# Extract Page Links
+def extract_page_links(page):
+    """
+    Return (anchor text, uri) for every URI link on a PyMuPDF page. Word boxes are
+    only extracted and indexed when the page has URI links.
+    """
+    uri_links = [link for link in page.get_links() if "uri" in link]
+    if not uri_links:
+        return []
+
+    grid = WordGrid(page.get_text("words"))
+    links = []
+    for link in uri_links:
+        rect = link["from"]
+        link_text = " ".join(grid.words_in((rect.x0, rect.y0, rect.x1, rect.y1))).strip()
+        if link_text:
+            links.append((link_text, link["uri"]))
+    return links
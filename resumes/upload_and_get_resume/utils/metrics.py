@@ -0,0 +1,190 @@
+import bisect
+import threading
+
+# Default latency buckets in seconds
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# Format Labels
+def _format_labels(labels):
+    labels = list(labels)
+    if not labels:
+        return ""
+    pairs = []
+    for key, value in labels:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        pairs.append(f'{key}="{value}"')
+    return "{" + ",".join(pairs) + "}"
+
+
+# Counter Class
+class Counter:
+    """Monotonic counter, optionally split by one set of label values"""
+
+    type_name = "counter"
+
+    def __init__(self, name, documentation, label_names=()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        # Unlabelled counters are exported as 0 before the first increment
+        self._values = {} if self.label_names else {(): 0}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def total(self):
+        """Sum over all label values"""
+        with self._lock:
+            return sum(self._values.values())
+
+    def collect(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_format_labels(zip(self.label_names, key))} {value}"
+
+
+# Histogram Class
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus exposition format"""
+
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, "") for name in self.label_names)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # One slot per bucket plus +Inf, then sum
+                series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def collect(self):
+        with self._lock:
+            items = sorted((key, list(series)) for key, series in self._series.items())
+        for key, series in items:
+            labels = list(zip(self.label_names, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket{_format_labels(labels + [('le', le)])} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(labels)} {series[-1]}"
+            yield f"{self.name}_count{_format_labels(labels)} {cumulative}"
+
+
+# Metrics Registry Class
+class MetricsRegistry:
+    """
+    In-process metrics registry. Recording is a dict update under a lock, so it
+    is cheap enough for every request. Each worker process keeps its own values.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name, documentation, label_names=()):
+        return self._register(Counter(name, documentation, label_names))
+
+    def histogram(self, name, documentation, label_names=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, documentation, label_names, buckets))
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format (0.0.4)"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+SEARCH_STAGE_SECONDS = REGISTRY.histogram(
+    "resume_search_stage_duration_seconds",
+    "Wall-clock time spent in each stage of a resume search.",
+    label_names=("stage",),
+)
+SEARCH_REQUESTS = REGISTRY.counter(
+    "resume_search_requests_total",
+    "Resume search requests by response status code.",
+    label_names=("status",),
+)
+SEARCH_ROWS_SCANNED = REGISTRY.counter(
+    "resume_search_rows_scanned_total",
+    "Candidate rows returned by Neo4j to the search scorer.",
+)
+SEARCH_ROWS_RETURNED = REGISTRY.counter(
+    "resume_search_rows_returned_total",
+    "Candidates returned to the client after threshold and top_k.",
+)
+SEARCH_THRESHOLD_REJECTIONS = REGISTRY.counter(
+    "resume_search_threshold_rejections_total",
+    "Candidate rows dropped because their total score was below the similarity threshold.",
+)
+
+EXTRACTION_SECONDS = REGISTRY.histogram(
+    "resume_extraction_llm_duration_seconds",
+    "Wall-clock time of the LLM extraction call, by extraction mode.",
+    label_names=("mode",),
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0),
+)
+EXTRACTION_TOKENS = REGISTRY.counter(
+    "resume_extraction_llm_tokens_total",
+    "Tokens used by the LLM extraction call, by extraction mode and prompt/completion.",
+    label_names=("mode", "kind"),
+)
+LLM_INPUT_TOKENS = REGISTRY.counter(
+    "resume_llm_input_tokens_total",
+    "Resume text tokens before (raw) and after (compacted) compaction for the LLM, "
+    "by stage: ingest (upload analysis) or match (search match analysis).",
+    label_names=("stage", "kind"),
+)
+PREVALIDATION_RESULTS = REGISTRY.counter(
+    "resume_prevalidation_results_total",
+    "Uploads checked before the LLM call, by verdict: pass, flag (analysed) or reject.",
+    label_names=("verdict",),
+)
+
+TEXT_CACHE_REQUESTS = REGISTRY.counter(
+    "resume_text_cache_requests_total",
+    "Extracted-text cache lookups: source_hit (known link revision, no download), "
+    "content_hit (known file content) or miss.",
+    label_names=("result",),
+)
+TEXT_CACHE_EVICTIONS = REGISTRY.counter(
+    "resume_text_cache_evictions_total",
+    "Extracted-text cache entries evicted to stay within the size bound.",
+)
+
+
+# Observe Search Trace
+def observe_search_trace(trace, rows_returned):
+    """Feed one search's stage timings and row counts into the search metrics"""
+    for stage, elapsed_ms in trace.get("timings_ms", {}).items():
+        SEARCH_STAGE_SECONDS.observe(elapsed_ms / 1000, stage=stage)
+    SEARCH_ROWS_SCANNED.inc(trace.get("rows_scanned", 0))
+    SEARCH_THRESHOLD_REJECTIONS.inc(trace.get("threshold_rejections", 0))
+    SEARCH_ROWS_RETURNED.inc(rows_returned)
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import os
+import re
+import threading
+from datetime import datetime
+
+import numpy as np
+from dotenv import load_dotenv
+from neo4j import GraphDatabase
+
+load_dotenv()
+
+# Word shingle length used for the resume text
+SHINGLE_SIZE = int(os.environ.get("NEAR_DUPLICATE_SHINGLE_SIZE", 5))
+# Estimated Jaccard similarity above which two resumes are near-duplicates
+NEAR_DUPLICATE_THRESHOLD = float(os.environ.get("NEAR_DUPLICATE_THRESHOLD", 0.8))
+# Append-only on-disk copy of the LSH index, shared by all worker processes
+NEAR_DUPLICATE_INDEX_PATH = os.environ.get(
+    "NEAR_DUPLICATE_INDEX_PATH", os.path.join("media", "near_duplicate_index.jsonl")
+)
+
+# 32 bands of 4 rows: a pair with Jaccard similarity s shares a band with probability
+# 1 - (1 - s^4)^32, about 1.0 at 0.8, 0.87 at 0.5, 0.23 at 0.3 and 0.05 at 0.2; the
+# candidates found below NEAR_DUPLICATE_THRESHOLD are dropped by the similarity estimate
+LSH_BANDS = 32
+LSH_ROWS = 4
+NUM_PERM = LSH_BANDS * LSH_ROWS
+
+# 32-bit shingle hashes and a prime below 2**32 keep (a * x + b) inside uint64
+_PRIME = np.uint64(4294967291)
+# Fixed seed: signatures must be comparable across processes and restarts
+_rng = np.random.RandomState(1)
+_PERM_A = _rng.randint(1, int(_PRIME), size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.randint(0, int(_PRIME), size=NUM_PERM, dtype=np.uint64)
+
+
+# Shingles
+def shingles(text, size=SHINGLE_SIZE):
+    """Set of word n-grams of the lowercased text"""
+    words = re.findall(r"\w+", (text or "").lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+# MinHash Signature
+def minhash_signature(text):
+    """NUM_PERM-value MinHash signature of the text's shingles"""
+    hashes = np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+            for s in shingles(text)
+        ),
+        dtype=np.uint64,
+    )
+    if hashes.size == 0:
+        return np.full(NUM_PERM, int(_PRIME), dtype=np.uint64)
+    # One row per permutation, one column per shingle
+    permuted = (np.outer(_PERM_A, hashes) + _PERM_B[:, None]) % _PRIME
+    return permuted.min(axis=1)
+
+
+# Estimate Similarity
+def estimate_similarity(signature, other):
+    """Fraction of agreeing MinHash values, an estimate of the Jaccard similarity"""
+    return float(np.mean(signature == other))
+
+
+# LSH Index Class
+class LshIndex:
+    """
+    Banded LSH index over MinHash signatures. Lookups only compare against
+    resumes sharing at least one band, so they stay sub-linear in the pool size.
+    Entries are appended to a JSONL file and other processes pick them up on
+    their next lookup.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.signatures = {}
+        self.canonical = {}
+        self.buckets = {}
+        self._offset = 0
+        self._lock = threading.Lock()
+        self.refresh()
+
+    def _band_keys(self, signature):
+        rows = signature.reshape(LSH_BANDS, LSH_ROWS)
+        return [(band, rows[band].tobytes()) for band in range(LSH_BANDS)]
+
+    def _insert(self, candidate_id, signature, canonical_id):
+        # A re-added candidate (updated with a new resume) replaces its old band entries
+        if candidate_id in self.signatures:
+            for key in self._band_keys(self.signatures[candidate_id]):
+                bucket = self.buckets.get(key)
+                if bucket and candidate_id in bucket:
+                    bucket.remove(candidate_id)
+                    if not bucket:
+                        del self.buckets[key]
+        self.signatures[candidate_id] = signature
+        self.canonical[candidate_id] = canonical_id
+        for key in self._band_keys(signature):
+            self.buckets.setdefault(key, []).append(candidate_id)
+
+    # Refresh
+    def refresh(self):
+        """Load entries appended to the index file since the last read"""
+        if not self.path or not os.path.exists(self.path):
+            return
+        with self._lock, open(self.path, encoding="utf-8") as f:
+            f.seek(self._offset)
+            for line in f:
+                if not line.endswith("\n"):
+                    # Partially written by another process; read it next time
+                    break
+                self._offset += len(line.encode("utf-8"))
+                entry = json.loads(line)
+                # Later lines for a candidate replace the earlier ones
+                self._insert(
+                    entry["candidate_id"],
+                    np.array(entry["signature"], dtype=np.uint64),
+                    entry["canonical_id"],
+                )
+
+    # Add
+    def add(self, candidate_id, signature, canonical_id=None):
+        """Index a stored candidate and persist it, replacing its previous signature"""
+        canonical_id = canonical_id or candidate_id
+        with self._lock:
+            self._insert(candidate_id, signature, canonical_id)
+            if self.path:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                line = json.dumps({
+                    "candidate_id": candidate_id,
+                    "canonical_id": canonical_id,
+                    "signature": signature.tolist(),
+                    "indexed_date": datetime.now().isoformat(),
+                }) + "\n"
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line)
+                self._offset += len(line.encode("utf-8"))
+
+    # Query
+    def query(self, signature, threshold=NEAR_DUPLICATE_THRESHOLD):
+        """Near-duplicates of the signature as (candidate_id, similarity), most similar first"""
+        self.refresh()
+        with self._lock:
+            seen = set()
+            for key in self._band_keys(signature):
+                seen.update(self.buckets.get(key, ()))
+            matches = [
+                (candidate_id, estimate_similarity(signature, self.signatures[candidate_id]))
+                for candidate_id in seen
+            ]
+        matches = [match for match in matches if match[1] >= threshold]
+        return sorted(matches, key=lambda match: match[1], reverse=True)
+
+    # Find Canonical
+    def find_canonical(self, signature, threshold=NEAR_DUPLICATE_THRESHOLD):
+        """Return (canonical_id, similarity) of the closest near-duplicate, or None"""
+        matches = self.query(signature, threshold)
+        if not matches:
+            return None
+        candidate_id, similarity = matches[0]
+        return self.canonical[candidate_id], similarity
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+# Get Near Duplicate Index
+def get_near_duplicate_index():
+    """Process-wide LSH index backed by NEAR_DUPLICATE_INDEX_PATH"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = LshIndex(NEAR_DUPLICATE_INDEX_PATH)
+        return _index
+
+
+# Link Near Duplicate
+def link_near_duplicate(driver, candidate_id, canonical_id, similarity):
+    """Point a stored candidate at the canonical candidate it near-duplicates"""
+    with driver.session() as session:
+        session.run(
+            """
+            MATCH (c:Candidate {candidateId: $candidate_id})
+            MATCH (canonical:Candidate {candidateId: $canonical_id})
+            SET c.canonicalId = $canonical_id
+            MERGE (c)-[d:NEAR_DUPLICATE_OF]->(canonical)
+            SET d.similarity = $similarity
+            """,
+            {"candidate_id": candidate_id, "canonical_id": canonical_id, "similarity": similarity},
+        )
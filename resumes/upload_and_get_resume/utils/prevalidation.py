@@ -0,0 +1,182 @@
+import os
+import re
+import logging
+from dataclasses import dataclass, field
+from functools import lru_cache
+
+import numpy as np
+
+from upload_and_get_resume.utils.embeddings import get_sentence_model
+from upload_and_get_resume.utils.extract_text_link import open_pdf
+from upload_and_get_resume.utils.metrics import PREVALIDATION_RESULTS
+from upload_and_get_resume.utils.text_compactor import PAGE_BREAK
+
+# Fewer non-space characters than this in the whole document: nothing to analyse
+MIN_TEXT_CHARS = int(os.environ.get("PREVALIDATION_MIN_TEXT_CHARS", 300))
+# More non-space characters than this is a book, a thesis or a log, not a resume
+MAX_TEXT_CHARS = int(os.environ.get("PREVALIDATION_MAX_TEXT_CHARS", 60000))
+# Pages with fewer characters than this have no text layer to speak of
+MIN_PAGE_CHARS = int(os.environ.get("PREVALIDATION_MIN_PAGE_CHARS", 50))
+# Share of image-only pages (scans) above which a PDF is rejected; nothing here runs OCR
+MAX_IMAGE_PAGE_RATIO = float(os.environ.get("PREVALIDATION_MAX_IMAGE_PAGE_RATIO", 0.5))
+# Letters among the non-space characters; below it the text layer is garbage (broken font maps)
+MIN_LETTER_RATIO = float(os.environ.get("PREVALIDATION_MIN_LETTER_RATIO", 0.5))
+# Latin-script letters among all letters; the prompts and the parser expect Latin-script resumes
+MIN_LATIN_RATIO = float(os.environ.get("PREVALIDATION_MIN_LATIN_RATIO", 0.6))
+# Cosine similarity to the resume centroid below which a file is rejected, or flagged
+RESUME_LIKENESS_REJECT = float(os.environ.get("RESUME_LIKENESS_REJECT", 0.2))
+RESUME_LIKENESS_FLAG = float(os.environ.get("RESUME_LIKENESS_FLAG", 0.35))
+# Centroid built by the build_resume_centroid command; the prototypes below are used without it
+RESUME_CENTROID_PATH = os.environ.get(
+    "RESUME_CENTROID_PATH", os.path.join("media", "resume_centroid.npy")
+)
+# Leading characters embedded for the likeness score; the model truncates long input anyway
+LIKENESS_SAMPLE_CHARS = 2000
+
+LETTER_PATTERN = re.compile(r"[^\W\d_]")
+LATIN_PATTERN = re.compile(r"[A-Za-zÀ-ɏ]")
+
+RESUME_PROTOTYPES = (
+    "Software Engineer. Experience: Backend Developer at a product company, 2019 - Present. "
+    "Built REST APIs in Python and Django. Education: B.Tech in Computer Science. "
+    "Skills: Python, SQL, Docker, AWS. Email, phone, LinkedIn, GitHub.",
+    "Professional Summary. Results-driven marketing manager with 8 years of experience in "
+    "brand strategy and digital campaigns. Work History. Marketing Manager, 2016 - 2023. "
+    "Education: MBA. Certifications. References available on request.",
+    "Curriculum Vitae. Personal details: name, date of birth, address, contact number. "
+    "Career objective. Academic qualifications: 10th, 12th, B.Com with percentage. "
+    "Work experience: Accountant. Key skills: Tally, GST, MS Excel. Languages known. Declaration.",
+    "Registered Nurse. Clinical experience in intensive care and emergency departments. "
+    "Licenses and certifications: BLS, ACLS. Education: Bachelor of Science in Nursing. "
+    "Employment history, responsibilities and achievements.",
+    "Data Scientist resume. Projects: churn prediction, recommendation engine. Internships. "
+    "Technical skills: machine learning, statistics, pandas, TensorFlow. Publications. "
+    "Education: M.Sc. Statistics. Achievements and awards. Contact information.",
+    "Sales Executive. Exceeded quarterly targets, managed key accounts and client relationships. "
+    "Employment: Area Sales Manager, Sales Executive. Education: Bachelor of Business Administration. "
+    "Skills: negotiation, CRM, communication. Hobbies and interests.",
+)
+
+
+# Resume Rejected Class
+class ResumeRejected(ValueError):
+    """Raised when pre-validation rejects a file before any LLM spend"""
+
+    def __init__(self, report):
+        super().__init__(f"Resume rejected before analysis: {'; '.join(report.reasons)}")
+        self.report = report
+
+
+# Prevalidation Report Class
+@dataclass
+class PrevalidationReport:
+    verdict: str = "pass"
+    reasons: list = field(default_factory=list)
+    stats: dict = field(default_factory=dict)
+
+    @property
+    def rejected(self):
+        return self.verdict == "reject"
+
+    def reject(self, reason):
+        self.verdict = "reject"
+        self.reasons.append(reason)
+
+    def flag(self, reason):
+        if self.verdict == "pass":
+            self.verdict = "flag"
+        self.reasons.append(reason)
+
+
+# PDF Image Pages
+def pdf_image_pages(source):
+    """Whether each page of a PDF (path or bytes) draws at least one image"""
+    doc = open_pdf(source)
+    try:
+        return [bool(page.get_images()) for page in doc]
+    finally:
+        doc.close()
+
+
+# Resume Centroid
+@lru_cache(maxsize=1)
+def resume_centroid():
+    """Unit vector of the resume centroid: the saved corpus centroid, else the prototypes'"""
+    if os.path.exists(RESUME_CENTROID_PATH):
+        centroid = np.load(RESUME_CENTROID_PATH)
+    else:
+        centroid = get_sentence_model().encode(list(RESUME_PROTOTYPES), normalize_embeddings=True).mean(axis=0)
+    return centroid / np.linalg.norm(centroid)
+
+
+# Resume Likeness
+def resume_likeness(text):
+    """Cosine similarity between the start of the text and the resume centroid"""
+    centroid = resume_centroid()
+    vector = get_sentence_model().encode(text[:LIKENESS_SAMPLE_CHARS], normalize_embeddings=True)
+    if vector.shape != centroid.shape:
+        raise ValueError(f"centroid has {centroid.shape[0]} dimensions, the model {vector.shape[0]}")
+    return float(np.dot(vector, centroid))
+
+
+# Prevalidate Resume
+def prevalidate_resume(text, pdf_source=None, likeness=resume_likeness):
+    """
+    Cheap checks of extracted text before any LLM call, MCP connection or upload:
+    length bounds, text per page, share of image-only (scanned) pages, letters and
+    script of the text layer, then the resume-likeness score, which is only computed
+    when the structural checks pass. Returns a PrevalidationReport: pass, flag
+    (analysed, with the reasons logged) or reject.
+    """
+    report = PrevalidationReport()
+    pages = (text or "").split(PAGE_BREAK)
+    page_chars = [len("".join(page.split())) for page in pages]
+    total_chars = sum(page_chars)
+    letters = LETTER_PATTERN.findall(text or "")
+    latin = sum(1 for letter in letters if LATIN_PATTERN.match(letter))
+    report.stats.update(
+        pages=len(pages),
+        chars=total_chars,
+        chars_per_page=round(total_chars / len(pages), 1),
+        letter_ratio=round(len(letters) / total_chars, 3) if total_chars else 0.0,
+        latin_ratio=round(latin / len(letters), 3) if letters else 0.0,
+    )
+
+    if pdf_source is not None:
+        image_pages = pdf_image_pages(pdf_source)
+        image_only = sum(
+            1
+            for chars, has_image in zip(page_chars, image_pages)
+            if has_image and chars < MIN_PAGE_CHARS
+        )
+        report.stats["image_only_ratio"] = round(image_only / len(image_pages), 3) if image_pages else 0.0
+        if report.stats["image_only_ratio"] > MAX_IMAGE_PAGE_RATIO:
+            report.reject(f"{image_only} of {len(image_pages)} pages are scanned images without text")
+
+    if total_chars < MIN_TEXT_CHARS:
+        report.reject(f"only {total_chars} characters of text")
+    elif total_chars > MAX_TEXT_CHARS:
+        report.reject(f"{total_chars} characters of text, more than a resume")
+    elif report.stats["chars_per_page"] < MIN_PAGE_CHARS:
+        report.reject(f"{report.stats['chars_per_page']} characters per page")
+    if total_chars and report.stats["letter_ratio"] < MIN_LETTER_RATIO:
+        report.reject("the text layer is not readable text")
+    elif letters and report.stats["latin_ratio"] < MIN_LATIN_RATIO:
+        report.flag("the text is mostly in a non-Latin script")
+
+    if not report.rejected and likeness is not None:
+        try:
+            score = likeness(text)
+        except Exception as e:
+            # The structural checks still apply without the model
+            print(f"[WARN] Resume-likeness check skipped: {e}")
+            logging.warning(f"Resume-likeness check skipped: {e}")
+        else:
+            report.stats["resume_likeness"] = round(score, 3)
+            if score < RESUME_LIKENESS_REJECT:
+                report.reject(f"resume-likeness {score:.2f} is below {RESUME_LIKENESS_REJECT}")
+            elif score < RESUME_LIKENESS_FLAG:
+                report.flag(f"low resume-likeness {score:.2f}")
+
+    PREVALIDATION_RESULTS.inc(verdict=report.verdict)
+    return report
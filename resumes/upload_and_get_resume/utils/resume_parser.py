@@ -0,0 +1,522 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any, Dict, List
+
+# Precompiled once; parsing runs on every upload and bulk import
+SECTION_HEADER = re.compile(r"^\s*===(.*)===\s*$")
+NA_VALUE = re.compile(r"^n/?a\s*(\([^)]*\))?$")
+YEARS_VALUE = re.compile(r"\d+(\.\d+)?")
+YEARS_PREFIX = re.compile(r"\d+\.?\d*")
+LETTER_START = re.compile(r"[A-Za-z]")
+INSTITUTION = re.compile(r"Institution:\s*(.*?)(?:,|$)")
+LIST_MARKER = re.compile(r"^[\s\-\*\•]+")
+PROJECT_START = re.compile(r"^\d+\.")
+PROJECT_MARKER = re.compile(r"^[\d\.\-\*\s]+")
+BRACKET_LINK = re.compile(r"\[(.*?)\]:\s*(.*?)$")
+BULLET_LINK = re.compile(r"^[\-\*]\s*(.*?):\s*(.*?)$")
+
+# Profile lines in the order the LLM writes them -> personal_info key used by the graph writer
+PROFILE_LABELS = (
+    ("Name", "name"),
+    ("Gender", "gender"),
+    ("Age", "age"),
+    ("E-mail", "email"),
+    ("Phone number", "phone"),
+    ("Location", "location"),
+    ("Preferred Location", "preferred_location"),
+    ("Interests/Hobbies", "interests_hobbies"),
+    ("Years of Experience", "years_experience"),
+    ("Current/Last Designation", "current_designation"),
+    ("Current/Last Employer", "current_employer"),
+    ("Current Notice Period", "current_notice_period"),
+    ("Expected CTC", "expected_ctc"),
+    ("Current CTC", "current_ctc"),
+    ("Previous Employer", "previous_employer"),
+)
+
+
+# Profile Key
+def _profile_key(label):
+    """Key of a profile line in the JSON export"""
+    return label.strip().lower().replace("/", "_").replace(" ", "_")
+
+
+# Profile key as written in the JSON export -> personal_info key
+PROFILE_FIELDS = {_profile_key(label): info_key for label, info_key in PROFILE_LABELS}
+
+ANALYSIS_LABELS = (
+    ("Experience Assessment", "experience_assessment"),
+    ("Skill Evaluation", "skill_evaluation"),
+    ("Strengths", "strengths"),
+    ("Weaknesses/Gaps", "weaknesses_gaps"),
+    ("Red Flags", "red_flags"),
+    ("Market Reality Check", "market_reality_check"),
+)
+
+EDUCATION_FIELDS = (
+    ("Degree/Program:", "degree"),
+    ("Grades/CGPA/Percentage:", "grades"),
+    ("Year of Passing:", "year"),
+)
+
+
+# Clean Text
+def clean_text(text):
+    """Clean text by removing extra whitespace and normalizing"""
+    if not text:
+        return None
+    text = text.strip()
+    lowered = text.lower()
+    # Check for N/A with or without explanation in brackets
+    if NA_VALUE.match(lowered):
+        return "N/A"
+    if lowered in ("null", "none", ""):
+        return None
+    return text
+
+
+# Parsed Resume Class
+@dataclass
+class ParsedResume:
+    """
+    One LLM response, parsed once. The graph writer uses the cleaned fields;
+    the Dropbox JSON export uses `profile` and `as_written`, which keep the
+    entries as the model wrote them.
+    """
+
+    source_text: str = ""
+    personal_info: Dict[str, Any] = field(default_factory=dict)
+    profile: Dict[str, str] = field(default_factory=dict)
+    years_of_experience: Any = ""
+    education: List[Dict[str, str]] = field(default_factory=list)
+    skills: List[Dict[str, Any]] = field(default_factory=list)
+    languages: List[str] = field(default_factory=list)
+    achievements: List[str] = field(default_factory=list)
+    projects: List[str] = field(default_factory=list)
+    suitable_roles: List[str] = field(default_factory=list)
+    links: List[Dict[str, str]] = field(default_factory=list)
+    detailed_analysis: Dict[str, str] = field(default_factory=dict)
+    as_written: Dict[str, list] = field(default_factory=lambda: {
+        "education": [], "skills": [], "languages": [], "projects": [],
+        "achievements": [], "suitable_roles": [], "links": [],
+    })
+
+    # To JSON
+    def to_json(self):
+        """The candidate JSON saved to Dropbox and returned by the upload API"""
+        return {
+            "candidate_profile": dict(self.profile),
+            "education": list(self.as_written["education"]),
+            "skills": list(self.as_written["skills"]),
+            "languages": list(self.as_written["languages"]),
+            "projects": list(self.as_written["projects"]),
+            "achivements": list(self.as_written["achievements"]),
+            "suitable_roles": list(self.as_written["suitable_roles"]),
+            "links": [dict(link) for link in self.as_written["links"]],
+            "detailed_analysis": dict(self.detailed_analysis),
+        }
+
+    # To Graph Data
+    def to_graph_data(self):
+        """The dict Neo4jResumeProcessor writes as nodes and relationships"""
+        return {
+            # Kept on the candidate so it can be re-embedded with another model
+            "source_text": self.source_text,
+            "personal_info": self.personal_info,
+            "education": self.education,
+            "skills": self.skills,
+            "languages": self.languages,
+            "achievements": self.achievements,
+            "projects": self.projects,
+            "suitable_roles": self.suitable_roles,
+            "employers": [],
+            "links": self.links,
+        }
+
+
+# Written Lines
+def _written_lines(lines):
+    """Non-empty lines of a section as written"""
+    text = "\n".join(lines).strip()
+    if not text or text == "N/A":
+        return []
+    return [line.strip() for line in text.split("\n") if line.strip()]
+
+
+# Split Listing
+def _split_listing(lines):
+    """Entries of a list section as written; comma-separated lines give one entry per item"""
+    text = "\n".join(lines).strip()
+    if not text or text == "N/A":
+        return []
+    entries = []
+    for line in text.replace("\\n", "\n").split("\n"):
+        if not line.strip():
+            continue
+        if "," in line and not line.startswith("-"):
+            entries.extend(item.strip() for item in line.split(",") if item.strip())
+        else:
+            entries.append(line.strip())
+    return entries
+
+
+# Simple List
+def _simple_list(lines):
+    """Cleaned, de-duplicated entries of a list section without bullet markers"""
+    items = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        cleaned = clean_text(LIST_MARKER.sub("", line).strip())
+        if cleaned and cleaned != "N/A" and cleaned not in items:
+            items.append(cleaned)
+    return items
+
+
+# Parse Profile
+def _parse_profile(lines, resume):
+    personal_info = resume.personal_info
+    employers = None
+    employers_on_next_line = False
+    for line in lines:
+        if employers is not None:
+            # Previous employers continue on the next line when the field is left empty,
+            # and on any line that does not start a new field
+            if employers_on_next_line and not line.strip():
+                continue
+            if employers_on_next_line or not LETTER_START.match(line):
+                employers_on_next_line = False
+                cleaned = clean_text(line.strip("- ").strip())
+                if cleaned and cleaned != "N/A":
+                    employers.append(cleaned)
+                continue
+            employers = None
+        if ":" not in line:
+            continue
+
+        key, value = line.split(":", 1)
+        key = _profile_key(key)
+        value = value.strip()
+        resume.profile[key] = value
+        if key == "years_of_experience":
+            match = YEARS_VALUE.search(value)
+            resume.years_of_experience = float(match.group()) if match else 0
+
+        info_key = PROFILE_FIELDS.get(key)
+        if info_key is None or info_key in personal_info:
+            continue
+        if info_key == "years_experience":
+            match = YEARS_PREFIX.match(value)
+            if match:
+                personal_info[info_key] = match.group()
+            continue
+        cleaned = clean_text(value)
+        if cleaned and cleaned != "N/A":
+            personal_info[info_key] = cleaned
+        if info_key == "previous_employer":
+            employers = [cleaned] if cleaned and cleaned != "N/A" else []
+            employers_on_next_line = not value
+            personal_info["previous_employers"] = employers
+
+    if not personal_info.get("previous_employers"):
+        personal_info.pop("previous_employers", None)
+
+
+# Parse Education
+def _parse_education(lines, resume):
+    resume.as_written["education"] = _written_lines(lines)
+    entry = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if not line.startswith("-") and ":" in line:
+            if entry:
+                resume.education.append(entry)
+            entry = None
+            match = INSTITUTION.search(line)
+            institution = clean_text(match.group(1)) if match else None
+            if institution and institution != "N/A":
+                entry = {"institution": institution}
+        elif line.startswith("-") and entry:
+            for label, key in EDUCATION_FIELDS:
+                if label in line:
+                    value = clean_text(line.split(label, 1)[1])
+                    if value and value != "N/A":
+                        entry[key] = value
+                    break
+    if entry:
+        resume.education.append(entry)
+
+
+# Parse Skills
+def _parse_skills(lines, resume):
+    resume.as_written["skills"] = _split_listing(lines)
+    category = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if line.endswith(":"):
+            name = line.rstrip(":").strip("* ").strip()
+            if name and name != "N/A":
+                category = name
+            continue
+        name = clean_text(LIST_MARKER.sub("", line).strip())
+        if name and name != "N/A" and len(name) > 1:
+            resume.skills.append({"name": name, "category": category or "General", "subcategory": None})
+
+
+# Parse Languages
+def _parse_languages(lines, resume):
+    resume.as_written["languages"] = _split_listing(lines)
+    resume.languages = _simple_list(lines)
+
+
+# Parse Achievements
+def _parse_achievements(lines, resume):
+    resume.as_written["achievements"] = _split_listing(lines)
+    resume.achievements = _simple_list(lines)
+
+
+# Parse Projects
+def _parse_projects(lines, resume):
+    resume.as_written["projects"] = _written_lines(lines)
+    projects = resume.projects
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if PROJECT_START.match(line) or line[0] in "*-":
+            project = clean_text(PROJECT_MARKER.sub("", line).strip())
+            if project and project != "N/A":
+                projects.append(project)
+        else:
+            # Continuation of the previous project
+            cleaned = clean_text(line)
+            if cleaned and cleaned != "N/A" and projects:
+                projects[-1] += f" {cleaned}"
+
+
+# Parse Suitable Roles
+def _parse_suitable_roles(lines, resume):
+    text = "\n".join(lines).strip()
+    if text and text != "N/A":
+        separator = "," if "," in text else "\n"
+        resume.as_written["suitable_roles"] = [role.strip() for role in text.split(separator) if role.strip()]
+    resume.suitable_roles = _simple_list(lines)
+
+
+# Parse Links
+def _parse_links(lines, resume):
+    text = "\n".join(lines).strip()
+    if text and text != "N/A":
+        for line in text.split("\n"):
+            if ":" in line and line.strip():
+                title, url = line.split(":", 1)
+                resume.as_written["links"].append({"title": title.strip(), "url": url.strip()})
+
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        # [Link Text]: URL, or - Link Text: URL
+        match = BRACKET_LINK.match(line) or BULLET_LINK.match(line)
+        if match:
+            link_type = clean_text(match.group(1))
+            link_url = clean_text(match.group(2))
+            if link_type and link_url and link_url != "N/A":
+                resume.links.append({"type": link_type, "url": link_url, "original": line})
+            continue
+
+        # Direct URL or email
+        cleaned = clean_text(line.strip("- ").strip("* ").strip())
+        if not cleaned or cleaned == "N/A":
+            continue
+        lowered = cleaned.lower()
+        if "@" in cleaned:
+            resume.links.append({"type": "Email", "url": cleaned, "original": line})
+        elif any(domain in lowered for domain in ("http://", "https://", ".com", ".org", ".net")):
+            link_type = "Other"
+            if "linkedin" in lowered:
+                link_type = "LinkedIn"
+            elif "github" in lowered:
+                link_type = "GitHub"
+            resume.links.append({"type": link_type, "url": cleaned, "original": line})
+
+
+# Parse Detailed Analysis
+def _parse_detailed_analysis(lines, resume):
+    subsection = None
+    content = []
+    for line in lines:
+        if line.startswith("**") or line.endswith("**"):
+            if subsection:
+                resume.detailed_analysis[subsection] = "\n".join(content).strip().replace("\\n", "\n")
+            subsection = line.replace("**", "").strip().lower().replace(" ", "_").replace("/", "_")
+            if subsection.endswith(":"):
+                subsection = subsection[:-1]
+            content = []
+        else:
+            content.append(line)
+    if subsection and content:
+        resume.detailed_analysis[subsection] = "\n".join(content).strip().replace("\\n", "\n")
+
+
+SECTION_PARSERS = {
+    "CANDIDATE PROFILE": _parse_profile,
+    "EDUCATION": _parse_education,
+    "SKILLS": _parse_skills,
+    "LANGUAGES": _parse_languages,
+    "ACHIEVEMENTS": _parse_achievements,
+    "PROJECTS": _parse_projects,
+    "SUITABLE ROLES": _parse_suitable_roles,
+    "LINKS": _parse_links,
+    "DETAILED ANALYSIS": _parse_detailed_analysis,
+}
+
+
+# Iterate Sections
+def iter_sections(response_text):
+    """Yield (title, lines) for each `=== TITLE ===` section in a single pass over the lines"""
+    title = None
+    lines = []
+    for line in response_text.split("\n"):
+        match = SECTION_HEADER.match(line)
+        if match:
+            if title is not None:
+                yield title, lines
+            title = match.group(1).strip().upper()
+            lines = []
+        elif title is not None:
+            lines.append(line)
+    if title is not None:
+        yield title, lines
+
+
+# Parse Resume Response
+def parse_resume_response(response_text):
+    """Parse the structured LLM response into a ParsedResume"""
+    resume = ParsedResume(source_text=response_text)
+    for title, lines in iter_sections(response_text or ""):
+        # Trailing blank lines belong to no entry
+        while lines and not lines[-1].strip():
+            lines.pop()
+        parser = SECTION_PARSERS.get(title)
+        if parser:
+            parser(lines, resume)
+    return resume
+
+
+# JSON Schema helpers
+def _nullable(kind="string"):
+    return {"type": [kind, "null"]}
+
+
+def _strings():
+    return {"type": "array", "items": {"type": "string"}}
+
+
+def _object(properties):
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+# Structured-output schema of the extraction call. It mirrors parse_resume_data's
+# output, so the model spends no tokens on headers, labels or N/A placeholders.
+RESUME_JSON_SCHEMA = _object({
+    "profile": _object({
+        **{
+            info_key: _nullable()
+            for _, info_key in PROFILE_LABELS
+            if info_key not in ("years_experience", "previous_employer")
+        },
+        "years_experience": _nullable("number"),
+        "previous_employers": _strings(),
+    }),
+    "education": {"type": "array", "items": _object({
+        "institution": {"type": "string"},
+        "degree": _nullable(),
+        "grades": _nullable(),
+        "year": _nullable(),
+    })},
+    "skills": {"type": "array", "items": _object({"category": {"type": "string"}, "names": _strings()})},
+    "languages": _strings(),
+    "projects": _strings(),
+    "achievements": _strings(),
+    "suitable_roles": _strings(),
+    "links": {"type": "array", "items": _object({"type": {"type": "string"}, "url": {"type": "string"}})},
+    "analysis": _object({key: {"type": "string"} for _, key in ANALYSIS_LABELS}),
+})
+
+
+# Render Resume Text
+def render_resume_text(data):
+    """
+    Write a structured-output extraction (RESUME_JSON_SCHEMA) in the text report
+    format, so both extraction modes feed the same parser, embedding and JSON export
+    """
+    def value(item):
+        if item is None or item == "" or item == []:
+            return "N/A"
+        # One line per field; a line break would start a new entry
+        return " ".join(str(item).split())
+
+    def listing(items):
+        items = [item for item in items or [] if item]
+        return [f"- {item}" for item in items] or ["N/A"]
+
+    profile = data.get("profile") or {}
+    employers = [employer for employer in profile.get("previous_employers") or [] if employer]
+    lines = ["=== CANDIDATE PROFILE ==="]
+    for label, info_key in PROFILE_LABELS:
+        if info_key == "previous_employer":
+            lines.append(f"{label}: {value(employers[:1] and employers[0])}")
+            lines.extend(f"- {employer}" for employer in employers[1:])
+        elif info_key == "years_experience":
+            lines.append(f"{label}: {value(profile.get(info_key) or 0)}")
+        else:
+            lines.append(f"{label}: {value(profile.get(info_key))}")
+
+    lines += ["", "=== EDUCATION ==="]
+    education = [edu for edu in data.get("education") or [] if edu.get("institution")]
+    for edu in education:
+        lines += [
+            f"Institution: {edu['institution']}",
+            f"- Degree/Program: {value(edu.get('degree'))}",
+            f"- Grades/CGPA/Percentage: {value(edu.get('grades'))}",
+            f"- Year of Passing: {value(edu.get('year'))}",
+        ]
+    if not education:
+        lines.append("N/A")
+
+    lines += ["", "=== SKILLS ==="]
+    for group in data.get("skills") or []:
+        names = [name for name in group.get("names") or [] if name]
+        if names:
+            lines.append(f"{group.get('category') or 'General'}:")
+            lines.extend(f"  {name}" for name in names)
+
+    for title, key in (
+        ("LANGUAGES", "languages"),
+        ("PROJECTS", "projects"),
+        ("ACHIEVEMENTS", "achievements"),
+        ("SUITABLE ROLES", "suitable_roles"),
+    ):
+        lines += ["", f"=== {title} ===", *listing(data.get(key))]
+
+    lines += ["", "=== LINKS ==="]
+    for link in data.get("links") or []:
+        if link.get("url"):
+            lines.append(f"[{link.get('type') or 'Other'}]: {link['url']}")
+
+    lines += ["", "=== DETAILED ANALYSIS ==="]
+    analysis = data.get("analysis") or {}
+    for label, key in ANALYSIS_LABELS:
+        lines += [f"**{label}**:", (analysis.get(key) or "N/A").strip(), ""]
+    return "\n".join(lines).rstrip() + "\n"
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import re
+from datetime import datetime
+
+from neo4j import GraphDatabase
+
+from upload_and_get_resume.utils.vectorise_v1 import NEO4J_URI, NEO4J_USER, NEO4J_PASSWORD
+
+HASH_CHUNK_SIZE = 1 << 20
+
+
+# File SHA-256
+def file_sha256(file_path):
+    """SHA-256 of the file bytes, read in chunks"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# Normalized Text Hash
+def normalized_text_hash(text):
+    """
+    SHA-256 of the extracted text, lowercased with whitespace collapsed, so a
+    re-exported or re-saved copy of the same resume is still recognised
+    """
+    normalized = re.sub(r"\s+", " ", text or "").strip().lower()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+# Resume Registry Class
+class ResumeRegistry:
+    """
+    Content-hash registry of processed resumes. Each ResumeFingerprint node maps a
+    file hash and a normalized-text hash to the stored candidate, its Dropbox
+    links and the analysis result returned for the original upload.
+    """
+
+    def __init__(self, uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD, driver=None):
+        self._owns_driver = driver is None
+        self.driver = driver or GraphDatabase.driver(uri, auth=(user, password))
+
+    def close(self):
+        if self._owns_driver:
+            self.driver.close()
+
+    # Lookup
+    def lookup(self, file_hash=None, text_hash=None):
+        """Return the stored entry for a known file or text hash, or None"""
+        with self.driver.session() as session:
+            record = session.run(
+                """
+                MATCH (f:ResumeFingerprint)
+                WHERE f.fileHash = $file_hash OR f.textHash = $text_hash
+                RETURN f
+                ORDER BY f.createdDate
+                LIMIT 1
+                """,
+                {"file_hash": file_hash, "text_hash": text_hash},
+            ).single()
+        if record is None:
+            return None
+        fingerprint = record["f"]
+        return {
+            "candidate_id": fingerprint.get("candidateId"),
+            "resume_link": fingerprint.get("resumeLink"),
+            "json_link": fingerprint.get("jsonLink"),
+            "result": json.loads(fingerprint.get("result") or "null"),
+        }
+
+    # Register
+    def register(self, file_hash, text_hash, candidate_id, resume_link, json_link, result):
+        """Record the fingerprint of a processed resume"""
+        with self.driver.session() as session:
+            session.run(
+                """
+                MERGE (f:ResumeFingerprint {fileHash: $file_hash})
+                ON CREATE SET f.createdDate = $created_date
+                SET f.textHash = $text_hash,
+                    f.candidateId = $candidate_id,
+                    f.resumeLink = $resume_link,
+                    f.jsonLink = $json_link,
+                    f.result = $result
+                """,
+                {
+                    "file_hash": file_hash,
+                    "text_hash": text_hash,
+                    "candidate_id": candidate_id,
+                    "resume_link": resume_link,
+                    "json_link": json_link,
+                    "result": json.dumps(result),
+                    "created_date": datetime.now().isoformat(),
+                },
+            )
+
+    # Register Alias
+    def register_alias(self, file_hash, text_hash, known):
+        """Map new file bytes with already known text to the existing entry"""
+        self.register(
+            file_hash, text_hash, known["candidate_id"], known["resume_link"], known["json_link"], known["result"]
+        )
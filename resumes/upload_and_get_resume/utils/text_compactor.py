@@ -0,0 +1,232 @@
+import os
+import re
+import logging
+from collections import Counter
+from dataclasses import dataclass
+
+from upload_and_get_resume.utils.metrics import LLM_INPUT_TOKENS
+
+try:
+    import tiktoken
+except ImportError:  # optional; the regex estimate is used without it
+    tiktoken = None
+
+# Most input tokens of resume text sent to the LLM; 0 disables the budget
+LLM_TOKEN_BUDGET = int(os.environ.get("LLM_TOKEN_BUDGET", 6000))
+# tiktoken encoding used to count tokens when tiktoken is installed
+LLM_TOKENIZER = os.environ.get("LLM_TOKENIZER", "cl100k_base")
+# Lines at the top and bottom of each page searched for running headers and footers
+PAGE_EDGE_LINES = 3
+
+# extract_from_pdf separates pages with a form feed
+PAGE_BREAK = "\f"
+TRUNCATION_MARKER = "[... resume truncated to the token budget ...]"
+
+# Words, numbers and single punctuation marks: close to a BPE token count for resume text
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+PAGE_NUMBER_PATTERN = re.compile(r"^(page\s*)?[-–(\[]?\s*\d{1,3}\s*((/|of)\s*\d{1,3})?\s*[-–)\]]?$", re.IGNORECASE)
+# Contact details are never dropped as headers; the name, email and phone keys come from them
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+\.[\w.-]+")
+PHONE_PATTERN = re.compile(r"\+?\d[\d\s().-]{7,}\d")
+URL_PATTERN = re.compile(r"https?://|www\.|\b[\w-]+\.(com|org|net|io|dev|me|in|co|ai|app)\b", re.IGNORECASE)
+# Shortest line treated as wrapped prose; labels and short list lines keep their own line
+WRAP_MIN_LENGTH = 30
+
+_encoding = None
+
+
+# Get Encoding
+def get_encoding():
+    """tiktoken encoding for LLM_TOKENIZER, or None when it is not available offline"""
+    global _encoding
+    if _encoding is None and tiktoken is not None:
+        try:
+            _encoding = tiktoken.get_encoding(LLM_TOKENIZER)
+        except Exception:
+            _encoding = False
+    return _encoding or None
+
+
+# Count Tokens
+def count_tokens(text):
+    encoding = get_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(TOKEN_PATTERN.findall(text))
+
+
+# Compacted Text Class
+@dataclass(frozen=True)
+class CompactedText:
+    text: str
+    tokens_before: int
+    tokens_after: int
+    repeated_lines_removed: int
+    truncated: bool
+
+    @property
+    def tokens_saved(self):
+        return self.tokens_before - self.tokens_after
+
+
+def _line_key(line):
+    """Compare header/footer lines with page numbers and spacing ignored"""
+    return re.sub(r"\d+", "#", " ".join(line.split()).lower())
+
+
+# Remove Repeated Lines
+def remove_repeated_lines(pages):
+    """
+    Drop running headers and footers: lines near the top or bottom of a page that
+    recur on at least half of the pages (page numbers ignored), and bare page numbers.
+    The first occurrence of a repeated line is kept, since a running header is often
+    the candidate's name, and lines with an email address or phone number are never
+    dropped. Returns the pages as lists of lines and the number of lines removed.
+    """
+    page_lines = [page.split("\n") for page in pages]
+    page_edges = []
+    edge_counts = Counter()
+    for lines in page_lines:
+        content = [index for index, line in enumerate(lines) if line.strip()]
+        # Headers repeat at the top of pages and footers at the bottom
+        edges = {index: "top" for index in content[:PAGE_EDGE_LINES]}
+        edges.update({index: "bottom" for index in content[-PAGE_EDGE_LINES:]})
+        page_edges.append(edges)
+        if len(page_lines) > 1:
+            edge_counts.update({(edge, _line_key(lines[index])) for index, edge in edges.items()})
+    min_pages = max(2, -(-len(page_lines) // 2))
+    repeated = {key for key, count in edge_counts.items() if count >= min_pages}
+
+    removed = 0
+    seen = set()
+    kept_pages = []
+    for lines, edges in zip(page_lines, page_edges):
+        kept = []
+        for index, line in enumerate(lines):
+            if index in edges:
+                key = (edges[index], _line_key(line))
+                if PAGE_NUMBER_PATTERN.match(line.strip()) or (
+                    key in repeated
+                    and key in seen
+                    and not EMAIL_PATTERN.search(line)
+                    and not PHONE_PATTERN.search(line)
+                ):
+                    removed += 1
+                    continue
+                seen.add(key)
+            kept.append(line)
+        kept_pages.append(kept)
+    return kept_pages, removed
+
+
+def _has_contact(line):
+    return bool(EMAIL_PATTERN.search(line) or PHONE_PATTERN.search(line) or URL_PATTERN.search(line))
+
+
+def _is_wrapped(previous, line):
+    """line continues previous: it starts in lower case after a word hyphenated at the
+    break, or after a long line that ends mid-sentence (on a word or a comma)"""
+    if not previous or not line[:1].islower() or _has_contact(previous) or _has_contact(line):
+        return False
+    if re.search(r"\w-$", previous):
+        return True
+    return len(previous) >= WRAP_MIN_LENGTH and (previous[-1].isalnum() or previous.endswith(","))
+
+
+# Join Broken Lines
+def join_broken_lines(lines):
+    """
+    Rejoin lines that PDF layout wrapped mid-sentence: words hyphenated across a
+    line break, and long prose lines continued by one starting in lower case.
+    Short lines such as labels and skill lists, and lines with an email address,
+    URL or phone number, keep their own line.
+    """
+    joined = []
+    for line in lines:
+        if joined and _is_wrapped(joined[-1], line):
+            if joined[-1].endswith("-"):
+                joined[-1] = joined[-1][:-1] + line
+            else:
+                joined[-1] = f"{joined[-1]} {line}"
+        else:
+            joined.append(line)
+    return joined
+
+
+# Truncate to Budget
+def truncate_to_budget(lines, budget):
+    """Keep whole lines from the top of the resume until the budget is spent"""
+    kept = []
+    # Each line also costs about one token for its line break
+    spent = count_tokens(TRUNCATION_MARKER) + 1
+    for line in lines:
+        spent += count_tokens(line) + 1
+        if spent > budget:
+            break
+        kept.append(line)
+    kept.append(TRUNCATION_MARKER)
+    return kept
+
+
+# Compact Text
+def compact_text(text, budget=None):
+    """
+    Deterministic compaction of extracted resume text before it is sent to the LLM:
+    repeated page headers/footers and page numbers removed, broken lines joined,
+    whitespace collapsed, then whole lines cut from the end to fit the token budget.
+    """
+    budget = LLM_TOKEN_BUDGET if budget is None else budget
+    text = text or ""
+    tokens_before = count_tokens(text)
+
+    pages, removed = remove_repeated_lines(text.split(PAGE_BREAK))
+    lines = []
+    for page in pages:
+        for line in page:
+            line = " ".join(line.split())
+            # One blank line at most between blocks
+            if line or (lines and lines[-1]):
+                lines.append(line)
+    lines = join_broken_lines(lines)
+    while lines and not lines[-1]:
+        lines.pop()
+
+    compacted = "\n".join(lines)
+    truncated = False
+    if budget and count_tokens(compacted) > budget:
+        compacted = "\n".join(truncate_to_budget(lines, budget))
+        truncated = True
+
+    return CompactedText(
+        text=compacted,
+        tokens_before=tokens_before,
+        tokens_after=count_tokens(compacted),
+        repeated_lines_removed=removed,
+        truncated=truncated,
+    )
+
+
+# Compact for LLM
+def compact_for_llm(text, stage, trace=None):
+    """
+    Compact resume text for one LLM call and report the saving: the input token
+    metrics by stage, trace["compaction"] when a trace is given, and the log.
+    """
+    compacted = compact_text(text)
+    LLM_INPUT_TOKENS.inc(compacted.tokens_before, stage=stage, kind="raw")
+    LLM_INPUT_TOKENS.inc(compacted.tokens_after, stage=stage, kind="compacted")
+    if trace is not None:
+        trace["compaction"] = {
+            "tokens_before": compacted.tokens_before,
+            "tokens_after": compacted.tokens_after,
+            "repeated_lines_removed": compacted.repeated_lines_removed,
+            "truncated": compacted.truncated,
+        }
+    message = (
+        f"Compacted resume text for {stage}: {compacted.tokens_before} -> "
+        f"{compacted.tokens_after} tokens ({compacted.tokens_saved} saved"
+        f"{', truncated to the budget' if compacted.truncated else ''})"
+    )
+    print(f"[INFO] {message}")
+    logging.info(message)
+    return compacted
@@ -38,10 +38,20 @@ def get_unique_dropbox_path(folder_path: str, base_name: str, extension: str):
                 return dropbox_path, file_name, i
             else:
                 raise e
+# Upload File
+def upload_file(content: bytes, dropbox_path: str):
+    """Upload bytes to Dropbox and return a direct-download shared link (blocking)"""
+    dbx.files_upload(content, dropbox_path, mode=WriteMode("add"))
+    shared = dbx.sharing_create_shared_link_with_settings(dropbox_path)
+    # Replace `?dl=0` with `?dl=1` for direct download
+    return shared.url.replace("?dl=0", "?dl=1")
+
+
 # Save To DropBox
-async def save_to_dropbox(resume_path: str, json_data: dict, candidate_name: str):
+async def save_to_dropbox(resume, json_data: dict, candidate_name: str):
     """
-    Saves the resume and Json to Dropbox
+    Saves the resume (a file path or its bytes) and Json to Dropbox. The blocking SDK
+    calls run in worker threads, and the resume and JSON are uploaded concurrently.
     """
     try:
         resume_folder = "output_resumes"
@@ -51,24 +61,25 @@ async def save_to_dropbox(resume_path: str, json_data: dict, candidate_name: str
         base_name = sanitize_filename(candidate_name)
 
         # Get unique Dropbox paths
-        resume_dropbox_path, resume_filename, version = get_unique_dropbox_path(resume_folder, base_name, "pdf")
-        json_dropbox_path, json_filename, _ = get_unique_dropbox_path(json_folder, base_name, "json")
-
-        # Upload resume file
-        with open(resume_path, "rb") as f:
-            dbx.files_upload(f.read(), resume_dropbox_path, mode=WriteMode("add"))
-
-        # Upload JSON content
+        (resume_dropbox_path, resume_filename, version), (json_dropbox_path, json_filename, _) = (
+            await asyncio.gather(
+                asyncio.to_thread(get_unique_dropbox_path, resume_folder, base_name, "pdf"),
+                asyncio.to_thread(get_unique_dropbox_path, json_folder, base_name, "json"),
+            )
+        )
+
+        if isinstance(resume, str):
+            with open(resume, "rb") as f:
+                resume_bytes = f.read()
+        else:
+            resume_bytes = resume
         json_bytes = json.dumps(json_data, indent=4).encode("utf-8")
-        dbx.files_upload(json_bytes, json_dropbox_path, mode=WriteMode("add"))
 
-        # Generate temporary shared links
-        resume_shared = dbx.sharing_create_shared_link_with_settings(resume_dropbox_path)
-        json_shared = dbx.sharing_create_shared_link_with_settings(json_dropbox_path)
-
-        # Replace `?dl=0` with `?dl=1` for direct download
-        resume_url = resume_shared.url.replace("?dl=0", "?dl=1")
-        json_url = json_shared.url.replace("?dl=0", "?dl=1")
+        # Upload both files and create their shared links
+        resume_url, json_url = await asyncio.gather(
+            asyncio.to_thread(upload_file, resume_bytes, resume_dropbox_path),
+            asyncio.to_thread(upload_file, json_bytes, json_dropbox_path),
+        )
 
         print(f"[INFO] Resume uploaded to Dropbox: {resume_url}")
         print(f"[INFO] JSON uploaded to Dropbox: {json_url}")
@@ -82,5 +93,3 @@ async def save_to_dropbox(resume_path: str, json_data: dict, candidate_name: str
     except Exception as e:
         print(f"[ERROR] Failed to save to Dropbox: {e}")
         return None
-
-
@@ -52,6 +52,19 @@ def get_unique_dropbox_path(folder_path: str, base_name: str, extension: str):
                 raise e
 
 
+# Get Shared Link Revision
+def get_shared_link_revision(url):
+    """
+    Revision of the file behind a Dropbox shared link, or None if it cannot be read.
+    A metadata call, so the file itself is not downloaded.
+    """
+    try:
+        return getattr(dbx.sharing_get_shared_link_metadata(url), "rev", None)
+    except Exception as e:
+        print(f"[WARN] Could not read the shared link's revision: {e}")
+        return None
+
+
 # Save To Dropbox (Asybc)
 async def save_to_dropbox(resume_path: str, candidate_name: str):
     """
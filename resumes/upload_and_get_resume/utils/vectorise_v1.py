@@ -1,37 +1,108 @@
 import os
 import json
 import re
+import random
+import asyncio
+import time
 from datetime import datetime
 from neo4j import GraphDatabase
-from sentence_transformers import SentenceTransformer
+from neo4j.exceptions import TransientError, ServiceUnavailable, SessionExpired
 from dotenv import load_dotenv
 import uuid
+import hashlib
+from upload_and_get_resume.utils.embeddings import (
+    get_sentence_model,
+    get_active_embedding_model,
+    embedding_property,
+)
+from upload_and_get_resume.processes.saved_search import SavedSearchEngine
+from upload_and_get_resume.utils.resume_parser import ParsedResume, parse_resume_response
+from upload_and_get_resume.utils.metrics import REGISTRY
 
 load_dotenv()
 NEO4J_USER = os.environ.get('NEO4jUSER')
 NEO4J_PASSWORD = os.environ.get('NEO4jPASSWORD')
 NEO4J_URI = os.environ.get('NEO4jURI')
+
+# Retries of a candidate write transaction after a deadlock or other transient error
+INGEST_MAX_RETRIES = int(os.environ.get('INGEST_MAX_RETRIES', 8))
+# Upper bound of the first backoff in seconds; doubles per attempt, with full jitter
+INGEST_RETRY_BASE_DELAY = float(os.environ.get('INGEST_RETRY_BASE_DELAY', 0.05))
+
+# Fields recorded in Candidate.missingFields when the resume does not provide them
+MISSING_PROFILE_FIELDS = (
+    'age',
+    'gender',
+    'preferred_location',
+    'expected_ctc',
+    'current_ctc',
+    'interests_hobbies',
+    'current_notice_period',
+)
+MISSING_SECTION_FIELDS = ('languages', 'projects', 'achievements')
+
+# Opt-in: update the existing candidate with the same normalized email (or phone, for resumes
+# without an email) instead of creating a new one
+INGEST_UPSERT = os.environ.get('INGEST_UPSERT', 'false').lower() == 'true'
+
+# Relationships diffed on upsert: relationship types, target label, target key properties,
+# relationship properties that tell two edges to the same node apart, target id property.
+# Kept in the create path's order; both Company relationships are diffed in one pass
+RELATIONSHIP_SPECS = (
+    (('LOCATED_IN',), 'Location', ('name',), ('locationType',), 'locationId'),
+    (('WORKING_WORKED_AT', 'WORKED_AT'), 'Company', ('companyName',), (), 'companyId'),
+    (('HAS_DESIGNATION',), 'Designation', ('name',), (), 'designationId'),
+    (('STUDIED_AT',), 'Education', ('institutionName', 'degree'), (), 'educationId'),
+    (('HAS_SKILL',), 'Skill', ('skillName',), (), 'skillId'),
+    (('SPEAKS',), 'Language', ('languageName',), (), 'languageId'),
+    (('SUITABLE_FOR',), 'Role', ('roleName',), (), 'roleId'),
+    (('HAS_LINK',), 'Link', ('url',), (), 'linkId'),
+)
+
+INGEST_WRITE_RETRIES = REGISTRY.counter(
+    "resume_ingest_write_retries_total",
+    "Candidate write transactions retried after a deadlock or transient error.",
+    label_names=("code",),
+)
+
+
+# Normalize Email
+def normalize_email(email):
+    """Lowercased, trimmed email, or None"""
+    if not email or email == 'N/A':
+        return None
+    return email.strip().lower() or None
+
+
+# Normalize Phone
+def normalize_phone(phone):
+    """Last ten digits of the phone number (drops country code and punctuation), or None"""
+    digits = re.sub(r'\D', '', phone or '')
+    return digits[-10:] if len(digits) >= 7 else None
+
+
+# Text Hash
+def text_hash(text):
+    return hashlib.sha256((text or '').encode('utf-8')).hexdigest()
+
+
 class Neo4jResumeProcessor:
-    def __init__(self, uri="bolt://localhost:7687", user="neo4j", password="password"):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
-        self.model = SentenceTransformer('all-MiniLM-L6-v2')
-        self._ensure_na_node()
+    def __init__(self, uri="bolt://localhost:7687", user="neo4j", password="password", embedding_model=None):
+        # Transaction retries are handled by write_candidate's jittered backoff
+        self.driver = GraphDatabase.driver(uri, auth=(user, password), max_transaction_retry_time=0)
+        # Embeddings are written with the active model, into that model's property
+        self.embedding_model = embedding_model or get_active_embedding_model(self.driver)
+        self.embedding_property = embedding_property(self.embedding_model)
+        self.model = get_sentence_model(self.embedding_model)
     
     def close(self):
         self.driver.close()
-    
-    def _ensure_na_node(self):
-        """Ensure a single N/A node exists in the database"""
-        with self.driver.session() as session:
-            session.run("""
-                MERGE (na:NAValue {name: 'N/A'})
-                ON CREATE SET na.created = datetime()
-            """)
     # Get Embeddings
     async def get_embedding(self, text):
         """Generate embedding for given text"""
         try:
-            embedding = self.model.encode(text, normalize_embeddings=True)
+            # Model inference is CPU-bound; keep it off the event loop
+            embedding = await asyncio.to_thread(self.model.encode, text, normalize_embeddings=True)
             return embedding.tolist()
         except Exception as e:
             print(f"[ERROR] Local embedding failed: {e}")
@@ -42,7 +113,10 @@ class Neo4jResumeProcessor:
         with self.driver.session() as session:
             # Create indexes
             indexes = [
+                "CREATE INDEX candidate_id_index IF NOT EXISTS FOR (c:Candidate) ON (c.candidateId)",
                 "CREATE INDEX candidate_email_index IF NOT EXISTS FOR (c:Candidate) ON (c.email)",
+                "CREATE INDEX candidate_normalized_email_index IF NOT EXISTS FOR (c:Candidate) ON (c.normalizedEmail)",
+                "CREATE INDEX candidate_normalized_phone_index IF NOT EXISTS FOR (c:Candidate) ON (c.normalizedPhone)",
                 "CREATE INDEX company_name_index IF NOT EXISTS FOR (comp:Company) ON (comp.companyName)",
                 "CREATE INDEX skill_name_index IF NOT EXISTS FOR (s:Skill) ON (s.skillName)",
                 "CREATE INDEX location_name_index IF NOT EXISTS FOR (l:Location) ON (l.name)",
@@ -52,7 +126,10 @@ class Neo4jResumeProcessor:
                 "CREATE INDEX link_url_index IF NOT EXISTS FOR (l:Link) ON (l.url)",
                 "CREATE INDEX link_platform_index IF NOT EXISTS FOR (l:Link) ON (l.platform)",
                 "CREATE INDEX designation_name_index IF NOT EXISTS FOR (d:Designation) ON (d.name)",
-                "CREATE INDEX na_value_index IF NOT EXISTS FOR (na:NAValue) ON (na.name)"
+                "CREATE INDEX saved_search_id_index IF NOT EXISTS FOR (s:SavedSearch) ON (s.searchId)",
+                "CREATE CONSTRAINT resume_fingerprint_file_hash IF NOT EXISTS FOR (f:ResumeFingerprint) REQUIRE f.fileHash IS UNIQUE",
+                "CREATE INDEX resume_fingerprint_text_hash_index IF NOT EXISTS FOR (f:ResumeFingerprint) ON (f.textHash)",
+                "CREATE INDEX resume_fingerprint_candidate_index IF NOT EXISTS FOR (f:ResumeFingerprint) ON (f.candidateId)"
             ]
             
             for index in indexes:
@@ -62,404 +139,534 @@ class Neo4jResumeProcessor:
                 except Exception as e:
                     print(f"Index creation failed or already exists: {e}")
     
-    def clean_text(self, text):
-        """Clean text by removing extra whitespace and normalizing"""
-        if not text:
-            return None
-        text = text.strip()
-        # Check for N/A with or without explanation in brackets
-        if re.match(r'^n/?a\s*(\([^)]*\))?$', text.lower()):
-            return 'N/A'
-        if text.lower() in ['null', 'none', '']:
-            return None
-        return text
-    
     def parse_resume_data(self, resume_text):
-        """Parse structured resume data from new format"""
-        data = {
-            'personal_info': {},
-            'education': [],
-            'skills': [],
-            'languages': [],
-            'achievements': [],
-            'projects': [],
-            'suitable_roles': [],
-            'employers': [],
-            'links': []
-        }
-        
-        # Extract sections
-        sections = self._extract_sections(resume_text)
-        
-        # Parse candidate profile section
-        if 'CANDIDATE PROFILE' in sections:
-            data['personal_info'] = self._parse_candidate_profile(sections['CANDIDATE PROFILE'])
-        
-        # Parse education section
-        if 'EDUCATION' in sections:
-            data['education'] = self._parse_education_new_format(sections['EDUCATION'])
-        
-        # Parse skills section
-        if 'SKILLS' in sections:
-            data['skills'] = self._parse_skills_new_format(sections['SKILLS'])
-        
-        # Parse other sections
-        if 'LANGUAGES' in sections:
-            data['languages'] = self._parse_simple_list_section(sections['LANGUAGES'])
-        
-        if 'ACHIEVEMENTS' in sections:
-            data['achievements'] = self._parse_simple_list_section(sections['ACHIEVEMENTS'])
-        
-        if 'PROJECTS' in sections:
-            data['projects'] = self._parse_projects_new_format(sections['PROJECTS'])
-        
-        if 'SUITABLE ROLES' in sections:
-            data['suitable_roles'] = self._parse_simple_list_section(sections['SUITABLE ROLES'])
-        
-        if 'LINKS' in sections:
-            data['links'] = self._parse_links_new_format(sections['LINKS'])
-        
-        return data
-    
-    def _extract_sections(self, resume_text):
-        """Extract sections from resume text"""
-        sections = {}
-        current_section = None
-        current_content = []
-        
-        lines = resume_text.split('\n')
-        for line in lines:
-            # Check if it's a section header
-            if line.strip().startswith('===') and line.strip().endswith('==='):
-                # Save previous section
-                if current_section:
-                    sections[current_section] = '\n'.join(current_content)
-                
-                # Extract new section name
-                section_name = line.strip().replace('===', '').strip()
-                current_section = section_name
-                current_content = []
+        """Graph data of an LLM response, or of an already parsed ParsedResume"""
+        if isinstance(resume_text, ParsedResume):
+            return resume_text.to_graph_data()
+        return parse_resume_response(resume_text).to_graph_data()
+
+    # Store Resume To Neo4J 
+    async def store_resume_to_neo4j(self, resume_text, resume_file_path, json_file_path, years_of_experience,
+                                    upsert=False, source_text_hash=None, parsed=None):
+        """
+        Store resume data in Neo4j graph database By making Nodes and extablish relationships(edge) between them.
+        With upsert=True an existing candidate with the same normalized email or phone is updated in place.
+        source_text_hash identifies the resume content (defaults to a hash of resume_text); the embedding
+        is only recomputed when it changed. parsed is the ParsedResume of resume_text, if the caller
+        already has it. Returns (candidate_id, created).
+        """
+        try:
+            # Parse resume data
+            data = self.parse_resume_data(parsed or resume_text)
+            personal_info = data['personal_info']
+            content_hash = source_text_hash or text_hash(resume_text)
+
+            existing = None
+            if upsert:
+                existing = await asyncio.to_thread(
+                    self.find_existing_candidate,
+                    normalize_email(personal_info.get('email')),
+                    normalize_phone(personal_info.get('phone')),
+                )
+
+            if existing and existing['textHash'] == content_hash and existing['embedding']:
+                embedding = existing['embedding']
+                changed_embedding = None
             else:
-                if current_section:
-                    current_content.append(line)
-        
-        # Save last section
-        if current_section:
-            sections[current_section] = '\n'.join(current_content)
-        
-        return sections
-    
-    def _parse_candidate_profile(self, profile_text):
-        """Parse candidate profile section"""
-        personal_info = {}
-        
-        patterns = {
-            'name': r'Name:\s*(.*?)(?:\n|$)',
-            'gender': r'Gender:\s*(.*?)(?:\n|$)',
-            'age': r'Age:\s*(.*?)(?:\n|$)',
-            'email': r'E-mail:\s*(.*?)(?:\n|$)',
-            'phone': r'Phone number:\s*(.*?)(?:\n|$)',
-            'location': r'Location:\s*(.*?)(?:\n|$)',
-            'preferred_location': r'Preferred Location:\s*(.*?)(?:\n|$)',
-            'years_experience': r'Years of Experience:\s*(\d+\.?\d*)',
-            'current_designation': r'Current/Last Designation:\s*(.*?)(?:\n|$)',
-            'current_employer': r'Current/Last Employer:\s*(.*?)(?:\n|$)',
-            'expected_ctc': r'Expected CTC:\s*(.*?)(?:\n|$)',
-            'current_ctc': r'Current CTC:\s*(.*?)(?:\n|$)',
-            'previous_employer': r'Previous Employer:\s*(.*?)(?:\n|$)',
-            'interests_hobbies': r'Interests/Hobbies:\s*(.*?)(?:\n|$)',
-            'current_notice_period': r'Current Notice Period:\s*(.*?)(?:\n|$)'
-        }
-        
-        for key, pattern in patterns.items():
-            match = re.search(pattern, profile_text, re.IGNORECASE | re.MULTILINE)
-            if match:
-                value = self.clean_text(match.group(1))
-                if value and value != 'N/A':
-                    personal_info[key] = value
-        
-        # Handle previous employers separately (can be multi-line)
-        if 'previous_employer' in patterns:
-            prev_emp_match = re.search(r'Previous Employer:\s*(.*?)(?=\n[A-Z]|\n===|$)', 
-                                     profile_text, re.IGNORECASE | re.DOTALL)
-            if prev_emp_match:
-                employers_text = prev_emp_match.group(1)
-                employers = []
-                for line in employers_text.split('\n'):
-                    cleaned = self.clean_text(line.strip('- ').strip())
-                    if cleaned and cleaned != 'N/A':
-                        employers.append(cleaned)
-                if employers:
-                    personal_info['previous_employers'] = employers
-        
-        return personal_info
-    
-    def _parse_education_new_format(self, education_text):
-        """Parse education section in new format"""
-        education_list = []
-        current_institution = None
-        current_entry = {}
-        
-        lines = education_text.strip().split('\n')
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Check if it's an institution line (not starting with -)
-            if not line.startswith('-') and ':' in line:
-                # Save previous entry
-                if current_entry and 'institution' in current_entry:
-                    education_list.append(current_entry.copy())
-                
-                # Start new entry
-                inst_match = re.search(r'Institution:\s*(.*?)(?:,|$)', line)
-                if inst_match:
-                    current_institution = self.clean_text(inst_match.group(1))
-                    if current_institution and current_institution != 'N/A':
-                        current_entry = {'institution': current_institution}
-            
-            # Parse sub-items
-            elif line.startswith('-') and current_entry:
-                if 'Degree/Program:' in line:
-                    degree_match = re.search(r'Degree/Program:\s*(.*?)$', line)
-                    if degree_match:
-                        degree = self.clean_text(degree_match.group(1))
-                        if degree and degree != 'N/A':
-                            current_entry['degree'] = degree
-                
-                elif 'Grades/CGPA/Percentage:' in line:
-                    grade_match = re.search(r'Grades/CGPA/Percentage:\s*(.*?)$', line)
-                    if grade_match:
-                        grades = self.clean_text(grade_match.group(1))
-                        if grades and grades != 'N/A':
-                            current_entry['grades'] = grades
+                # Generate embedding for the entire resume text
+                embedding = changed_embedding = await self.get_embedding(resume_text)
+
+            if existing:
+                candidate_id = existing['candidateId']
+                changes = await asyncio.to_thread(
+                    self._execute_write_with_retry,
+                    f"candidate {candidate_id}",
+                    self._update_candidate_tx,
+                    candidate_id, data, changed_embedding, resume_file_path, json_file_path,
+                    years_of_experience, content_hash
+                )
+                print(f"Updated existing candidate {candidate_id} for {personal_info.get('name', 'Unknown')}: {changes}")
+            else:
+                # Generate unique candidate ID
+                candidate_id = await asyncio.to_thread(
+                    self.write_candidate,
+                    str(uuid.uuid4()), data, embedding, resume_file_path, json_file_path, years_of_experience,
+                    text_hash=content_hash
+                )
+                print(f"Successfully stored resume data for {personal_info.get('name', 'Unknown')}")
+
+            # Score the new candidate against every saved search
+            await asyncio.to_thread(
+                self._percolate_saved_searches,
+                candidate_id, personal_info, data, years_of_experience, embedding
+            )
+            return candidate_id, existing is None
                 
-                elif 'Year of Passing:' in line:
-                    year_match = re.search(r'Year of Passing:\s*(.*?)$', line)
-                    if year_match:
-                        year = self.clean_text(year_match.group(1))
-                        if year and year != 'N/A':
-                            current_entry['year'] = year
-        
-        # Add last entry
-        if current_entry and 'institution' in current_entry:
-            education_list.append(current_entry)
-        
-        return education_list
-    
-    def _parse_skills_new_format(self, skills_text):
-        """Parse skills section in new format"""
-        skills_list = []
-        current_category = None
-        
-        lines = skills_text.strip().split('\n')
-        for line in lines:
-            original_line = line
-            line = line.strip()
-            
-            if not line:
-                continue
-            
-            # Calculate indentation
-            indent_level = len(original_line) - len(original_line.lstrip())
-            
-            # Check if it's a category (ends with colon or is a header)
-            if line.endswith(':'):
-                category_name = line.rstrip(':').strip('* ').strip()
-                if category_name and category_name != 'N/A':
-                    current_category = category_name
-                continue
-            
-            # It's a skill - remove bullets and markers
-            skill_name = re.sub(r'^[\s\-\*\•]+', '', line).strip()
-            skill_name = self.clean_text(skill_name)
-            
-            if skill_name and skill_name != 'N/A' and len(skill_name) > 1:
-                skills_list.append({
-                    'name': skill_name,
-                    'category': current_category or 'General',
-                    'subcategory': None
+        except Exception as e:
+            print(f"[ERROR] Unable to store in Neo4j: {e}")
+            raise e
+
+    # Find Existing Candidate
+    def find_existing_candidate(self, normalized_email, normalized_phone):
+        """
+        Most recent candidate with the same normalized email, or None. The phone is only
+        matched when the resume has no email: phone numbers are shared (family, office
+        lines) far more often than email addresses.
+        """
+        if normalized_email:
+            match_key = 'c.normalizedEmail = $email'
+        elif normalized_phone:
+            match_key = 'c.normalizedPhone = $phone'
+        else:
+            return None
+        with self.driver.session() as session:
+            record = session.run(f"""
+                MATCH (c:Candidate)
+                WHERE {match_key}
+                RETURN c.candidateId as candidateId, c.textHash as textHash, c[$embedding_property] as embedding
+                ORDER BY c.createdDate DESC
+                LIMIT 1
+            """, {
+                'email': normalized_email,
+                'phone': normalized_phone,
+                'embedding_property': self.embedding_property
+            }).single()
+        return record.data() if record else None
+
+    # Update Candidate Transaction Function
+    def _update_candidate_tx(self, tx, candidate_id, data, embedding, resume_file_path, json_file_path,
+                             years_of_experience, content_hash):
+        """Update the candidate's properties and apply only the relationship changes"""
+        personal_info = data['personal_info']
+        tx.run("""
+            MATCH (c:Candidate {candidateId: $candidate_id})
+            SET c.name = $name,
+                c.email = $email,
+                c.phoneNumber = $phone,
+                c.normalizedEmail = $normalized_email,
+                c.normalizedPhone = $normalized_phone,
+                c.yearsOfExperience = $years_exp,
+                c.resumePath = coalesce($resume_path, c.resumePath),
+                c.jsonPath = coalesce($json_path, c.jsonPath),
+                c.resumeText = $resume_text,
+                c.textHash = $text_hash,
+                c.missingFields = $missing_fields,
+                c.updatedDate = $updated_date
+            SET c += $embedding_props
+        """, {
+            'candidate_id': candidate_id,
+            'name': personal_info.get('name', 'Unknown'),
+            'email': personal_info.get('email'),
+            'phone': personal_info.get('phone'),
+            'normalized_email': normalize_email(personal_info.get('email')),
+            'normalized_phone': normalize_phone(personal_info.get('phone')),
+            'years_exp': float(years_of_experience),
+            'resume_path': resume_file_path,
+            'json_path': json_file_path,
+            'embedding_props': {self.embedding_property: embedding} if embedding else {},
+            'resume_text': data.get('source_text'),
+            'text_hash': content_hash,
+            'missing_fields': self._missing_fields(personal_info, data),
+            'updated_date': datetime.now().isoformat()
+        })
+        # Fingerprints of the previous resume would short-circuit to its stale analysis
+        tx.run("""
+            MATCH (f:ResumeFingerprint {candidateId: $candidate_id})
+            WHERE f.textHash <> $text_hash
+            DELETE f
+        """, {'candidate_id': candidate_id, 'text_hash': content_hash})
+
+        changes = {'added': 0, 'removed': 0, 'updated': 0}
+        desired = self._desired_relationships(personal_info, data)
+        for spec in RELATIONSHIP_SPECS:
+            for change, count in self._diff_relationships(tx, candidate_id, spec, desired[spec[1]]).items():
+                changes[change] += count
+
+        # Achievements and projects are owned by the candidate: replace them only if they changed
+        for rel_type, label, items, process in (
+            ('ACHIEVED', 'Achievement', data['achievements'], self._process_achievements),
+            ('WORKED_ON', 'Project', data['projects'], self._process_projects),
+        ):
+            wanted = sorted(item for item in items if item and item != 'N/A')
+            current = tx.run(f"""
+                MATCH (:Candidate {{candidateId: $candidate_id}})-[:{rel_type}]->(n:{label})
+                RETURN n.description as description
+            """, {'candidate_id': candidate_id})
+            current = sorted(record['description'] for record in current)
+            if current != wanted:
+                tx.run(f"""
+                    MATCH (:Candidate {{candidateId: $candidate_id}})-[:{rel_type}]->(n:{label})
+                    DETACH DELETE n
+                """, {'candidate_id': candidate_id})
+                process(tx, candidate_id, wanted)
+                changes['removed'] += len(current)
+                changes['added'] += len(wanted)
+        return changes
+
+    # Desired Relationships
+    def _desired_relationships(self, personal_info, data):
+        """
+        The relationships the parsed resume implies, per target label: key (node keys,
+        relationship keys, relationship type) -> (node properties set on create,
+        relationship properties, relationship properties set on create)
+        """
+        now = datetime.now().isoformat()
+        desired = {spec[1]: {} for spec in RELATIONSHIP_SPECS}
+
+        for location_type, field in (('current', 'location'), ('preferred', 'preferred_location')):
+            location_str = personal_info.get(field)
+            if location_str:
+                city, state, country = self._split_location(location_str)
+                desired['Location'][(location_str, location_type, 'LOCATED_IN')] = (
+                    {'city': city, 'state': state, 'country': country}, {'locationType': location_type}, {}
+                )
+
+        current_employer = personal_info.get('current_employer')
+        if current_employer:
+            desired['Company'][(current_employer, 'WORKING_WORKED_AT')] = (
+                {}, {'isCurrent': True, 'designation': personal_info.get('current_designation')}, {}
+            )
+        for order, employer in enumerate(personal_info.get('previous_employers', [])):
+            if employer and employer != 'N/A':
+                desired['Company'].setdefault((employer, 'WORKED_AT'), ({}, {'isCurrent': False, 'order': order}, {}))
+
+        designation = personal_info.get('current_designation')
+        if designation:
+            desired['Designation'][(designation, 'HAS_DESIGNATION')] = (
+                {}, {'isCurrent': True, 'company': current_employer}, {}
+            )
+
+        for edu in data['education']:
+            if edu.get('institution'):
+                desired['Education'][(edu['institution'], edu.get('degree', 'Unknown'), 'STUDIED_AT')] = (
+                    {'grades': edu.get('grades')}, {'graduationYear': edu.get('year'), 'grades': edu.get('grades')}, {}
+                )
+
+        for skill in data['skills']:
+            if skill and skill.get('name'):
+                category = skill.get('category', 'General')
+                desired['Skill'][(skill['name'], 'HAS_SKILL')] = (
+                    {'category': category, 'createdDate': now}, {'category': category}, {'acquiredDate': now}
+                )
+
+        for language in data['languages']:
+            if language and language != 'N/A':
+                desired['Language'][(language, 'SPEAKS')] = ({}, {}, {})
+
+        for role in data['suitable_roles']:
+            if role and role != 'N/A':
+                desired['Role'][(role, 'SUITABLE_FOR')] = ({}, {}, {})
+
+        for link in data['links']:
+            if link and link.get('url'):
+                link_type = link.get('type', 'Other')
+                desired['Link'][(link['url'], 'HAS_LINK')] = (
+                    {'linkType': link_type, 'platform': link_type, 'createdDate': now},
+                    {'linkType': link_type},
+                    {'addedDate': now}
+                )
+        return desired
+
+    # Diff Relationships
+    def _diff_relationships(self, tx, candidate_id, spec, desired):
+        """Delete edges the resume no longer implies, update changed ones and create the new ones"""
+        rel_types, label, node_keys, rel_keys, id_prop = spec
+        key_expr = ", ".join([f"n.{key}" for key in node_keys] + [f"r.{key}" for key in rel_keys] + ["type(r)"])
+        current = {}
+        for record in tx.run(f"""
+            MATCH (:Candidate {{candidateId: $candidate_id}})-[r:{'|'.join(rel_types)}]->(n:{label})
+            RETURN [{key_expr}] as key, properties(r) as props, elementId(r) as rel_id
+        """, {'candidate_id': candidate_id}):
+            current[tuple(record['key'])] = (record['rel_id'], record['props'])
+
+        removed = {key: rel_id for key, (rel_id, _) in current.items() if key not in desired}
+        updated = {
+            key: rel_props
+            for key, (_, rel_props, _) in desired.items()
+            if key in current and any(current[key][1].get(k) != v for k, v in rel_props.items())
+        }
+        added = {key: value for key, value in desired.items() if key not in current}
+
+        # Deleting, updating or creating an edge locks its target node, so every change
+        # is applied in one sorted key order: the order the create path MERGEs them in
+        node_match = ", ".join(f"{key}: $key[{i}]" for i, key in enumerate(node_keys))
+        for key in sorted(set(removed) | set(updated) | set(added)):
+            if key in removed:
+                tx.run("""
+                    MATCH (:Candidate {candidateId: $candidate_id})-[r]->()
+                    WHERE elementId(r) = $rel_id
+                    DELETE r
+                """, {'candidate_id': candidate_id, 'rel_id': removed[key]})
+            elif key in updated:
+                tx.run("""
+                    MATCH (:Candidate {candidateId: $candidate_id})-[r]->()
+                    WHERE elementId(r) = $rel_id
+                    SET r += $props
+                """, {'candidate_id': candidate_id, 'rel_id': current[key][0], 'props': updated[key]})
+            else:
+                node_props, rel_props, stamp_props = added[key]
+                tx.run(f"""
+                    MATCH (c:Candidate {{candidateId: $candidate_id}})
+                    MERGE (n:{label} {{{node_match}}})
+                    ON CREATE SET n += $node, n.{id_prop} = randomUUID()
+                    CREATE (c)-[r:{key[-1]}]->(n)
+                    SET r += $rel
+                """, {
+                    'candidate_id': candidate_id,
+                    'key': list(key[:len(node_keys)]),
+                    'node': node_props,
+                    'rel': {**rel_props, **stamp_props},
                 })
-        
-        return skills_list
-    
-    def _parse_simple_list_section(self, section_text):
-        """Parse simple list sections"""
-        items = []
-        
-        for line in section_text.strip().split('\n'):
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Remove markers
-            cleaned = re.sub(r'^[\s\-\*\•]+', '', line).strip()
-            cleaned = self.clean_text(cleaned)
-            
-            if cleaned and cleaned != 'N/A' and cleaned not in items:
-                items.append(cleaned)
-        
-        return items
-    
-    def _parse_projects_new_format(self, projects_text):
-        """Parse projects section in new format"""
-        projects = []
-        
-        # Split by numbered items or bullet points
-        lines = projects_text.strip().split('\n')
-        current_project = None
-        
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Check if it's a numbered project or bullet
-            if re.match(r'^\d+\.', line) or line.startswith('*') or line.startswith('-'):
-                # Remove number/bullet and clean
-                project = re.sub(r'^[\d\.\-\*\s]+', '', line).strip()
-                project = self.clean_text(project)
-                if project and project != 'N/A':
-                    projects.append(project)
+        return {'added': len(added), 'removed': len(removed), 'updated': len(updated)}
+
+    # Attach Resume Links
+    def attach_resume_links(self, candidate_id, resume_file_path, json_file_path):
+        """Set the Dropbox links of a candidate stored before its upload finished"""
+        with self.driver.session() as session:
+            session.run("""
+                MATCH (c:Candidate {candidateId: $candidate_id})
+                SET c.resumePath = $resume_path, c.jsonPath = $json_path
+            """, {
+                'candidate_id': candidate_id,
+                'resume_path': resume_file_path,
+                'json_path': json_file_path
+            })
+
+    # Delete Candidate
+    def delete_candidate(self, candidate_id):
+        """Remove a candidate with the achievement and project nodes and resume fingerprints only it owns"""
+        with self.driver.session() as session:
+            session.run("""
+                MATCH (c:Candidate {candidateId: $candidate_id})
+                OPTIONAL MATCH (c)-[:ACHIEVED|WORKED_ON]->(owned)
+                OPTIONAL MATCH (f:ResumeFingerprint {candidateId: $candidate_id})
+                DETACH DELETE c, owned, f
+            """, {'candidate_id': candidate_id})
+
+    # Write Candidate
+    def write_candidate(self, candidate_id, data, embedding, resume_file_path, json_file_path,
+                        years_of_experience, autocommit=False, text_hash=None):
+        """
+        Write the candidate node and all of its relationships.
+
+        By default everything goes through one managed write transaction: a single
+        commit per resume and nothing half-written on failure. Shared nodes are
+        MERGEd in a deterministic order, and a transaction that still hits a
+        deadlock or transient error is retried with jittered exponential backoff.
+        autocommit=True runs every statement as its own auto-commit transaction
+        (the old behaviour, kept for benchmarking; never retried).
+        """
+        if autocommit:
+            with self.driver.session() as session:
+                return self._write_candidate_tx(
+                    session, candidate_id, data, embedding, resume_file_path, json_file_path, years_of_experience,
+                    text_hash
+                )
+
+        return self._execute_write_with_retry(
+            f"candidate {candidate_id}",
+            self._write_candidate_tx,
+            candidate_id, data, embedding, resume_file_path, json_file_path, years_of_experience, text_hash
+        )
+
+    # Execute Write With Retry
+    def _execute_write_with_retry(self, label, transaction_function, *args):
+        """Run a managed write transaction, retrying deadlocks and transient errors with full jitter"""
+        for attempt in range(INGEST_MAX_RETRIES + 1):
+            try:
+                with self.driver.session() as session:
+                    return session.execute_write(transaction_function, *args)
+            except (TransientError, ServiceUnavailable, SessionExpired) as e:
+                if attempt == INGEST_MAX_RETRIES:
+                    raise
+                code = getattr(e, 'code', None) or type(e).__name__
+                INGEST_WRITE_RETRIES.inc(code=code)
+                delay = random.uniform(0, INGEST_RETRY_BASE_DELAY * (2 ** attempt))
+                print(f"[WARNING] {code} while writing {label}, "
+                      f"retry {attempt + 1}/{INGEST_MAX_RETRIES} in {delay * 1000:.0f} ms")
+                time.sleep(delay)
+
+    # Store Resumes Batch
+    def store_resumes_batch(self, items, upsert=False):
+        """
+        Store many analysed resumes at once: one embedding call for the whole batch
+        and one write transaction for all candidates, then saved-search percolation.
+        With upsert=True a resume whose normalized email (or phone, without an email)
+        matches a stored candidate, or an earlier resume of the batch, updates it in place.
+
+        Parameters:
+        items (list): Dicts with response, resume_link, json_link and years_of_experience,
+            and optionally the response's ParsedResume as parsed and the source text_hash
+        upsert (bool): Update known candidates instead of creating new ones
+        Returns:
+        list: (candidate_id, created) in the order of items
+        """
+        parsed = [self.parse_resume_data(item.get('parsed') or item['response']) for item in items]
+        content_hashes = [item.get('text_hash') or text_hash(item['response']) for item in items]
+
+        existing = [None] * len(items)
+        candidate_ids = []
+        # Candidate id of each contact key seen so far, stored or earlier in this batch
+        claimed = {}
+        for i, data in enumerate(parsed):
+            email = normalize_email(data['personal_info'].get('email'))
+            phone = normalize_phone(data['personal_info'].get('phone'))
+            key = ('email', email) if email else ('phone', phone) if phone else None
+            if upsert and key in claimed:
+                existing[i] = {'candidateId': claimed[key], 'textHash': None, 'embedding': None}
+            elif upsert and key:
+                existing[i] = self.find_existing_candidate(email, phone)
+            candidate_ids.append(existing[i]['candidateId'] if existing[i] else str(uuid.uuid4()))
+            if key:
+                claimed[key] = candidate_ids[-1]
+
+        # The stored embedding is reused when the resume text did not change
+        unchanged = [
+            bool(known and known['textHash'] == content_hash and known['embedding'])
+            for known, content_hash in zip(existing, content_hashes)
+        ]
+        to_embed = [i for i, same in enumerate(unchanged) if not same]
+        encoded = self.model.encode(
+            [items[i]['response'] for i in to_embed], normalize_embeddings=True
+        ).tolist() if to_embed else []
+        embeddings = [existing[i]['embedding'] if same else None for i, same in enumerate(unchanged)]
+        for i, embedding in zip(to_embed, encoded):
+            embeddings[i] = embedding
+
+        batch = [
+            (candidate_id, data, None if same else embedding, item['resume_link'], item['json_link'],
+             item['years_of_experience'], content_hash, known is None)
+            for item, candidate_id, data, embedding, content_hash, known, same
+            in zip(items, candidate_ids, parsed, embeddings, content_hashes, existing, unchanged)
+        ]
+        self._execute_write_with_retry(
+            f"batch of {len(batch)} candidates", self._write_candidates_tx, batch
+        )
+        for candidate_id, data, embedding, item in zip(candidate_ids, parsed, embeddings, items):
+            self._percolate_saved_searches(
+                candidate_id, data['personal_info'], data, item['years_of_experience'], embedding
+            )
+        return [(candidate_id, known is None) for candidate_id, known in zip(candidate_ids, existing)]
+
+    # Write Candidates Transaction Function
+    def _write_candidates_tx(self, tx, batch):
+        """Create or update every candidate of a batch inside one transaction"""
+        for candidate_id, data, embedding, resume_link, json_link, years_of_experience, content_hash, created in batch:
+            if created:
+                self._write_candidate_tx(
+                    tx, candidate_id, data, embedding, resume_link, json_link, years_of_experience, content_hash
+                )
             else:
-                # Could be continuation of previous project
-                cleaned = self.clean_text(line)
-                if cleaned and cleaned != 'N/A' and projects:
-                    projects[-1] += f" {cleaned}"
-        
-        return projects
-    
-    def _parse_links_new_format(self, links_text):
-        """Parse links section in new format"""
-        links = []
+                self._update_candidate_tx(
+                    tx, candidate_id, data, embedding, resume_link, json_link, years_of_experience, content_hash
+                )
+
+    # Write Candidate Transaction Function
+    def _write_candidate_tx(self, tx, candidate_id, data, embedding, resume_file_path, json_file_path,
+                            years_of_experience, text_hash=None):
+        """Create the candidate node and process all relationships inside one transaction"""
+        # Create candidate node
+        candidate_query = """
+        CREATE (c:Candidate {
+            candidateId: $candidate_id,
+            name: $name,
+            email: $email,
+            phoneNumber: $phone,
+            normalizedEmail: $normalized_email,
+            normalizedPhone: $normalized_phone,
+            yearsOfExperience: $years_exp,
+            resumePath: $resume_path,
+            jsonPath: $json_path,
+            resumeText: $resume_text,
+            textHash: $text_hash,
+            missingFields: $missing_fields,
+            createdDate: $created_date
+        })
+        SET c += $embedding_props
+        RETURN c.candidateId as candidateId
+        """
         
-        # Match pattern like [Link Text]: URL or - Link Text: URL
-        lines = links_text.strip().split('\n')
+        personal_info = data['personal_info']
+        result = tx.run(candidate_query, {
+            'candidate_id': candidate_id,
+            'name': personal_info.get('name', 'Unknown'),
+            'email': personal_info.get('email'),
+            'phone': personal_info.get('phone'),
+            'normalized_email': normalize_email(personal_info.get('email')),
+            'normalized_phone': normalize_phone(personal_info.get('phone')),
+            'years_exp': float(years_of_experience),
+            'resume_path': resume_file_path,
+            'json_path': json_file_path,
+            'embedding_props': {self.embedding_property: embedding},
+            'resume_text': data.get('source_text'),
+            'text_hash': text_hash,
+            'missing_fields': self._missing_fields(personal_info, data),
+            'created_date': datetime.now().isoformat()
+        })
         
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-            
-            # Pattern 1: [Link Text]: URL
-            match1 = re.match(r'\[(.*?)\]:\s*(.*?)$', line)
-            if match1:
-                link_type = self.clean_text(match1.group(1))
-                link_url = self.clean_text(match1.group(2))
-                if link_type and link_url and link_url != 'N/A':
-                    links.append({
-                        'type': link_type,
-                        'url': link_url,
-                        'original': line
-                    })
-                continue
-            
-            # Pattern 2: - Link Text: URL
-            match2 = re.match(r'^[\-\*]\s*(.*?):\s*(.*?)$', line)
-            if match2:
-                link_type = self.clean_text(match2.group(1))
-                link_url = self.clean_text(match2.group(2))
-                if link_type and link_url and link_url != 'N/A':
-                    links.append({
-                        'type': link_type,
-                        'url': link_url,
-                        'original': line
-                    })
-                continue
-            
-            # Pattern 3: Direct URL or email
-            cleaned = self.clean_text(line.strip('- ').strip('* ').strip())
-            if cleaned and cleaned != 'N/A':
-                if '@' in cleaned:
-                    links.append({
-                        'type': 'Email',
-                        'url': cleaned,
-                        'original': line
-                    })
-                elif any(domain in cleaned.lower() for domain in ['http://', 'https://', '.com', '.org', '.net']):
-                    link_type = 'Other'
-                    if 'linkedin' in cleaned.lower():
-                        link_type = 'LinkedIn'
-                    elif 'github' in cleaned.lower():
-                        link_type = 'GitHub'
-                    
-                    links.append({
-                        'type': link_type,
-                        'url': cleaned,
-                        'original': line
-                    })
+        created_candidate_id = result.single()['candidateId']
+        print(f"Created candidate: {personal_info.get('name', 'Unknown')} with ID: {created_candidate_id}")
         
-        return links
-    # Store Resume To Neo4J 
-    async def store_resume_to_neo4j(self, resume_text, resume_file_path, json_file_path, years_of_experience):
-        """Store resume data in Neo4j graph database By making Nodes and extablish relationships(edge) between them """
+        # Process all relationships
+        self._process_locations(tx, created_candidate_id, personal_info)
+        self._process_companies(tx, created_candidate_id, personal_info)
+        self._process_designation(tx, created_candidate_id, personal_info)
+        self._process_education(tx, created_candidate_id, data['education'])
+        self._process_skills(tx, created_candidate_id, data['skills'])
+        self._process_languages(tx, created_candidate_id, data['languages'])
+        self._process_achievements(tx, created_candidate_id, data['achievements'])
+        self._process_projects(tx, created_candidate_id, data['projects'])
+        self._process_suitable_roles(tx, created_candidate_id, data['suitable_roles'])
+        self._process_links(tx, created_candidate_id, data['links'])
+        return created_candidate_id
+
+    # Split Location
+    def _split_location(self, location_str):
+        """Split a 'City, State, Country' location string into its parts"""
+        parts = [part.strip() for part in location_str.split(',')]
+        city = parts[0] if parts else location_str
+        state = parts[1] if len(parts) > 1 else None
+        country = parts[2] if len(parts) > 2 else None
+        return city, state, country
+
+    # Percolate Saved Searches
+    def _percolate_saved_searches(self, candidate_id, personal_info, data, years_of_experience, embedding):
+        """Match the new candidate against all saved searches without rerunning them"""
+        row = {
+            'candidate': {
+                'candidateId': candidate_id,
+                'name': personal_info.get('name', 'Unknown'),
+                'email': personal_info.get('email'),
+                'phoneNumber': personal_info.get('phone'),
+                'yearsOfExperience': float(years_of_experience),
+            },
+            'total_skills': list(dict.fromkeys(
+                skill['name'] for skill in data['skills'] if skill and skill.get('name')
+            )),
+            'all_roles': (
+                [personal_info['current_designation']] if personal_info.get('current_designation') else []
+            ) + data['suitable_roles'],
+            'locations': [
+                dict(zip(('name', 'city', 'state', 'country'), (location_str, *self._split_location(location_str))))
+                for location_str in (personal_info.get('location'), personal_info.get('preferred_location'))
+                if location_str
+            ],
+            'education': [
+                {'institution': edu['institution'], 'degree': edu.get('degree', 'Unknown'), 'grades': edu.get('grades')}
+                for edu in data['education'] if edu.get('institution')
+            ],
+        }
         try:
-            # Generate embedding for the entire resume text
-            embedding = await self.get_embedding(resume_text)
-            
-            # Parse resume data
-            data = self.parse_resume_data(resume_text)
-            
-            # Generate unique candidate ID
-            candidate_id = str(uuid.uuid4())
-            
-            with self.driver.session() as session:
-                # Create candidate node
-                candidate_query = """
-                CREATE (c:Candidate {
-                    candidateId: $candidate_id,
-                    name: $name,
-                    email: $email,
-                    phoneNumber: $phone,
-                    yearsOfExperience: $years_exp,
-                    resumePath: $resume_path,
-                    jsonPath: $json_path,
-                    embedding: $embedding,
-                    createdDate: $created_date
-                })
-                RETURN c.candidateId as candidateId
-                """
-                
-                personal_info = data['personal_info']
-                result = session.run(candidate_query, {
-                    'candidate_id': candidate_id,
-                    'name': personal_info.get('name', 'Unknown'),
-                    'email': personal_info.get('email'),
-                    'phone': personal_info.get('phone'),
-                    'years_exp': float(years_of_experience),
-                    'resume_path': resume_file_path,
-                    'json_path': json_file_path,
-                    'embedding': embedding,
-                    'created_date': datetime.now().isoformat()
-                })
-                
-                created_candidate_id = result.single()['candidateId']
-                print(f"Created candidate: {personal_info.get('name', 'Unknown')} with ID: {created_candidate_id}")
-                
-                # Process all relationships
-                await self._process_locations(session, created_candidate_id, personal_info)
-                await self._process_companies(session, created_candidate_id, personal_info)
-                await self._process_designation(session, created_candidate_id, personal_info)
-                await self._process_education(session, created_candidate_id, data['education'])
-                await self._process_skills(session, created_candidate_id, data['skills'])
-                await self._process_languages(session, created_candidate_id, data['languages'])
-                await self._process_achievements(session, created_candidate_id, data['achievements'])
-                await self._process_projects(session, created_candidate_id, data['projects'])
-                await self._process_suitable_roles(session, created_candidate_id, data['suitable_roles'])
-                await self._process_links(session, created_candidate_id, data['links'])
-                
-                # Handle N/A relationships for missing data
-                await self._process_na_relationships(session, created_candidate_id, personal_info, data)
-                
-                print(f"Successfully stored resume data for {personal_info.get('name', 'Unknown')}")
-                return created_candidate_id
-                
+            percolator = SavedSearchEngine(driver=self.driver)
+            matches = percolator.percolate_candidate(candidate_id, row, embedding)
+            if matches:
+                print(f"Candidate {candidate_id} matched {len(matches)} saved search(es)")
         except Exception as e:
-            print(f"[ERROR] Unable to store in Neo4j: {e}")
-            raise e
-    # Process Locations (Async)
-    async def _process_locations(self, session, candidate_id, personal_info):
+            # A percolation failure must not fail the ingest itself
+            print(f"[ERROR] Saved search percolation failed: {e}")
+
+    # Process Locations
+    def _process_locations(self, tx, candidate_id, personal_info):
         """Process location information"""
         locations = []
         
@@ -468,12 +675,10 @@ class Neo4jResumeProcessor:
         if personal_info.get('preferred_location'):
             locations.append(('preferred', personal_info['preferred_location']))
         
-        for location_type, location_str in locations:
+        # Shared nodes are locked in sorted key order to avoid deadlocks between concurrent ingests
+        for location_type, location_str in sorted(locations, key=lambda loc: loc[1]):
             # Parse location (City, State format)
-            parts = [part.strip() for part in location_str.split(',')]
-            city = parts[0] if parts else location_str
-            state = parts[1] if len(parts) > 1 else None
-            country = parts[2] if len(parts) > 2 else None
+            city, state, country = self._split_location(location_str)
             
             # Create or get location node
             location_query = """
@@ -482,7 +687,7 @@ class Neo4jResumeProcessor:
             RETURN l.locationId as locationId
             """
             
-            session.run(location_query, {
+            tx.run(location_query, {
                 'location_name': location_str,
                 'city': city,
                 'state': state,
@@ -496,53 +701,50 @@ class Neo4jResumeProcessor:
             CREATE (c)-[:LOCATED_IN {locationType: $location_type}]->(l)
             """
             
-            session.run(rel_query, {
+            tx.run(rel_query, {
                 'candidate_id': candidate_id,
                 'location_name': location_str,
                 'location_type': location_type
             })
-    # Process Companies (Async)
-    async def _process_companies(self, session, candidate_id, personal_info):
+    # Process Companies
+    def _process_companies(self, tx, candidate_id, personal_info):
         """Process company information with different relationships"""
-        # Process current/last employer
+        # Current/last employer (order None) and previous employers, MERGEd in sorted
+        # name order so concurrent ingests lock shared Company nodes consistently
+        employers = []
         current_employer = personal_info.get('current_employer')
         if current_employer:
+            employers.append((current_employer, None))
+        for i, employer in enumerate(personal_info.get('previous_employers', [])):
+            if employer and employer != 'N/A':
+                employers.append((employer, i))
+
+        for company_name, order in sorted(employers, key=lambda emp: emp[0]):
             # Create company node
             company_query = """
             MERGE (comp:Company {companyName: $company_name})
             ON CREATE SET comp.companyId = randomUUID()
             RETURN comp.companyId as companyId
             """
-            session.run(company_query, {'company_name': current_employer})
-            
-            # Create WORKING_WORKED_AT relationship
-            rel_query = """
-            MATCH (c:Candidate {candidateId: $candidate_id})
-            MATCH (comp:Company {companyName: $company_name})
-            CREATE (c)-[:WORKING_WORKED_AT {
-                isCurrent: true,
-                designation: $designation
-            }]->(comp)
-            """
-            
-            session.run(rel_query, {
-                'candidate_id': candidate_id,
-                'company_name': current_employer,
-                'designation': personal_info.get('current_designation')
-            })
-        
-        # Process previous employers
-        previous_employers = personal_info.get('previous_employers', [])
-        for i, employer in enumerate(previous_employers):
-            if employer and employer != 'N/A':
-                # Create company node
-                company_query = """
-                MERGE (comp:Company {companyName: $company_name})
-                ON CREATE SET comp.companyId = randomUUID()
-                RETURN comp.companyId as companyId
+            tx.run(company_query, {'company_name': company_name})
+
+            if order is None:
+                # Create WORKING_WORKED_AT relationship
+                rel_query = """
+                MATCH (c:Candidate {candidateId: $candidate_id})
+                MATCH (comp:Company {companyName: $company_name})
+                CREATE (c)-[:WORKING_WORKED_AT {
+                    isCurrent: true,
+                    designation: $designation
+                }]->(comp)
                 """
-                session.run(company_query, {'company_name': employer})
                 
+                tx.run(rel_query, {
+                    'candidate_id': candidate_id,
+                    'company_name': company_name,
+                    'designation': personal_info.get('current_designation')
+                })
+            else:
                 # Create WORKED_AT relationship
                 rel_query = """
                 MATCH (c:Candidate {candidateId: $candidate_id})
@@ -553,13 +755,13 @@ class Neo4jResumeProcessor:
                 }]->(comp)
                 """
                 
-                session.run(rel_query, {
+                tx.run(rel_query, {
                     'candidate_id': candidate_id,
-                    'company_name': employer,
-                    'order': i
+                    'company_name': company_name,
+                    'order': order
                 })
-    # Process Designation (Async)
-    async def _process_designation(self, session, candidate_id, personal_info):
+    # Process Designation
+    def _process_designation(self, tx, candidate_id, personal_info):
         """Process designation information"""
         designation = personal_info.get('current_designation')
         if designation:
@@ -569,7 +771,7 @@ class Neo4jResumeProcessor:
             ON CREATE SET d.designationId = randomUUID()
             RETURN d.designationId as designationId
             """
-            session.run(designation_query, {'designation_name': designation})
+            tx.run(designation_query, {'designation_name': designation})
             
             # Create relationship
             rel_query = """
@@ -581,14 +783,18 @@ class Neo4jResumeProcessor:
             }]->(d)
             """
             
-            session.run(rel_query, {
+            tx.run(rel_query, {
                 'candidate_id': candidate_id,
                 'designation_name': designation,
                 'company': personal_info.get('current_employer')
             })
-    # Process education (Async)
-    async def _process_education(self, session, candidate_id, education_list):
+    # Process education
+    def _process_education(self, tx, candidate_id, education_list):
         """Process education information"""
+        education_list = sorted(
+            (edu for edu in education_list if edu.get('institution')),
+            key=lambda edu: (edu['institution'], edu.get('degree', 'Unknown'))
+        )
         for edu in education_list:
             if not edu.get('institution'):
                 continue
@@ -605,7 +811,7 @@ class Neo4jResumeProcessor:
             RETURN e.educationId as educationId
             """
             
-            session.run(edu_query, {
+            tx.run(edu_query, {
                 'institution': edu['institution'],
                 'degree': edu.get('degree', 'Unknown'),
                 'grades': edu.get('grades')
@@ -621,16 +827,20 @@ class Neo4jResumeProcessor:
             }]->(e)
             """
             
-            session.run(rel_query, {
+            tx.run(rel_query, {
                 'candidate_id': candidate_id,
                 'institution': edu['institution'],
                 'degree': edu.get('degree', 'Unknown'),
                 'year': edu.get('year'),
                 'grades': edu.get('grades')
             })
-    # Process Skills (Async)
-    async def _process_skills(self, session, candidate_id, skills_list):
+    # Process Skills
+    def _process_skills(self, tx, candidate_id, skills_list):
         """Process skills information with categories"""
+        skills_list = sorted(
+            (skill for skill in skills_list if skill and skill.get('name')),
+            key=lambda skill: skill['name']
+        )
         for skill_info in skills_list:
             if not skill_info or not skill_info.get('name'):
                 continue
@@ -648,7 +858,7 @@ class Neo4jResumeProcessor:
             RETURN s.skillId as skillId
             """
             
-            session.run(skill_query, {
+            tx.run(skill_query, {
                 'skill_name': skill_name,
                 'category': skill_category,
                 'created_date': datetime.now().isoformat()
@@ -664,17 +874,17 @@ class Neo4jResumeProcessor:
             }]->(s)
             """
             
-            session.run(rel_query, {
+            tx.run(rel_query, {
                 'candidate_id': candidate_id,
                 'skill_name': skill_name,
                 'category': skill_category,
                 'acquired_date': datetime.now().isoformat()
             })
 
-    # Process Languages (Async)
-    async def _process_languages(self, session, candidate_id, languages_list):
+    # Process Languages
+    def _process_languages(self, tx, candidate_id, languages_list):
         """Process languages information"""
-        for language in languages_list:
+        for language in sorted(lang for lang in languages_list if lang):
             if not language or language == 'N/A':
                 continue
             
@@ -685,7 +895,7 @@ class Neo4jResumeProcessor:
             RETURN lang.languageId as languageId
             """
             
-            session.run(lang_query, {'language_name': language})
+            tx.run(lang_query, {'language_name': language})
             
             # Create relationship
             rel_query = """
@@ -694,13 +904,13 @@ class Neo4jResumeProcessor:
             CREATE (c)-[:SPEAKS]->(lang)
             """
             
-            session.run(rel_query, {
+            tx.run(rel_query, {
                 'candidate_id': candidate_id,
                 'language_name': language
             })
     
-    # Process Achivements (Async)
-    async def _process_achievements(self, session, candidate_id, achievements_list):
+    # Process Achivements
+    def _process_achievements(self, tx, candidate_id, achievements_list):
         """Process achievements information"""
         for achievement in achievements_list:
             if not achievement or achievement == 'N/A':
@@ -718,14 +928,14 @@ class Neo4jResumeProcessor:
             CREATE (c)-[:ACHIEVED]->(a)
             """
             
-            session.run(ach_query, {
+            tx.run(ach_query, {
                 'candidate_id': candidate_id,
                 'title': achievement[:100] + '...' if len(achievement) > 100 else achievement,
                 'description': achievement
             })
     
-    # Process Projects (Async)
-    async def _process_projects(self, session, candidate_id, projects_list):
+    # Process Projects
+    def _process_projects(self, tx, candidate_id, projects_list):
         """Process projects information"""
         for project in projects_list:
             if not project or project == 'N/A':
@@ -743,16 +953,16 @@ class Neo4jResumeProcessor:
             CREATE (c)-[:WORKED_ON]->(p)
             """
             
-            session.run(proj_query, {
+            tx.run(proj_query, {
                 'candidate_id': candidate_id,
                 'name': project[:100] + '...' if len(project) > 100 else project,
                 'description': project
             })
     
-    # Process Suitable Roles (Async)
-    async def _process_suitable_roles(self, session, candidate_id, roles_list):
+    # Process Suitable Roles
+    def _process_suitable_roles(self, tx, candidate_id, roles_list):
         """Process suitable roles information"""
-        for role in roles_list:
+        for role in sorted(role for role in roles_list if role):
             if not role or role == 'N/A':
                 continue
             
@@ -763,7 +973,7 @@ class Neo4jResumeProcessor:
             RETURN r.roleId as roleId
             """
             
-            session.run(role_query, {'role_name': role})
+            tx.run(role_query, {'role_name': role})
             
             # Create relationship
             rel_query = """
@@ -772,14 +982,18 @@ class Neo4jResumeProcessor:
             CREATE (c)-[:SUITABLE_FOR]->(r)
             """
             
-            session.run(rel_query, {
+            tx.run(rel_query, {
                 'candidate_id': candidate_id,
                 'role_name': role
             })
     
-    # Process Links (Async)
-    async def _process_links(self, session, candidate_id, links_list):
+    # Process Links
+    def _process_links(self, tx, candidate_id, links_list):
         """Process links information"""
+        links_list = sorted(
+            (link for link in links_list if link and link.get('url')),
+            key=lambda link: link['url']
+        )
         for link_info in links_list:
             if not link_info or not link_info.get('url'):
                 continue
@@ -801,7 +1015,7 @@ class Neo4jResumeProcessor:
             # Determine platform
             platform = link_type
             
-            session.run(link_query, {
+            tx.run(link_query, {
                 'url': link_url,
                 'link_type': link_type,
                 'platform': platform,
@@ -818,84 +1032,89 @@ class Neo4jResumeProcessor:
             }]->(l)
             """
             
-            session.run(rel_query, {
+            tx.run(rel_query, {
                 'candidate_id': candidate_id,
                 'url': link_url,
                 'link_type': link_type,
                 'added_date': datetime.now().isoformat()
             })
     
-    # Process N/A Relationships (Async)
-    async def _process_na_relationships(self, session, candidate_id, personal_info, data):
-        """Create relationships to N/A node for missing data"""
-        # Check for N/A values in personal info
-        na_fields = []
-        
-        # Personal info N/A checks
-        if personal_info.get('age') == 'N/A':
-            na_fields.append(('age', 'HAS_AGE'))
-        if personal_info.get('gender') == 'N/A':
-            na_fields.append(('gender', 'HAS_GENDER'))
-        if personal_info.get('preferred_location') == 'N/A':
-            na_fields.append(('preferred_location', 'PREFERS_LOCATION'))
-        if personal_info.get('expected_ctc') == 'N/A':
-            na_fields.append(('expected_ctc', 'EXPECTS_CTC'))
-        if personal_info.get('current_ctc') == 'N/A':
-            na_fields.append(('current_ctc', 'HAS_CURRENT_CTC'))
-        if personal_info.get('interests_hobbies') == 'N/A':
-            na_fields.append(('interests_hobbies', 'HAS_INTERESTS'))
-        if personal_info.get('current_notice_period') == 'N/A':
-            na_fields.append(('current_notice_period', 'HAS_NOTICE_PERIOD'))
-        
-        # Check if entire sections are N/A or empty
-        if not data.get('languages') or (len(data['languages']) == 1 and data['languages'][0] == 'N/A'):
-            na_fields.append(('languages', 'SPEAKS'))
-        if not data.get('projects') or (len(data['projects']) == 1 and data['projects'][0] == 'N/A'):
-            na_fields.append(('projects', 'WORKED_ON'))
-        if not data.get('achievements') or (len(data['achievements']) == 1 and data['achievements'][0] == 'N/A'):
-            na_fields.append(('achievements', 'ACHIEVED'))
-        
-        # Create relationships to N/A node
-        for field_name, relationship_type in na_fields:
-            rel_query = f"""
-            MATCH (c:Candidate {{candidateId: $candidate_id}})
-            MATCH (na:NAValue {{name: 'N/A'}})
-            CREATE (c)-[:{relationship_type} {{field: $field}}]->(na)
-            """
-            
-            session.run(rel_query, {
-                'candidate_id': candidate_id,
-                'field': field_name
-            })
+    # Missing Fields
+    def _missing_fields(self, personal_info, data):
+        """
+        List the fields the resume does not provide. Stored on the candidate as the
+        missingFields property instead of edges to a shared N/A node.
+        """
+        missing = [
+            field for field in MISSING_PROFILE_FIELDS
+            if personal_info.get(field) in (None, 'N/A')
+        ]
+        for field in MISSING_SECTION_FIELDS:
+            values = data.get(field)
+            if not values or (len(values) == 1 and values[0] == 'N/A'):
+                missing.append(field)
+        return missing
 
 # Store Resume To Neo4J
-async def store_resume_to_neo4j(details, resume_file_path, json_file_path, years_of_experience):
-    # Initialize processor
-    processor = Neo4jResumeProcessor(
+async def store_resume_to_neo4j(details, resume_file_path, json_file_path, years_of_experience,
+                                upsert=INGEST_UPSERT, source_text_hash=None, parsed=None):
+    """
+    Store an analysed resume. Returns (candidate_id, created); created is False when an
+    existing candidate was updated, and candidate_id is None when storing failed.
+    """
+    # Initialize processor (the first call loads the embedding model)
+    processor = await asyncio.to_thread(
+        Neo4jResumeProcessor,
         uri=NEO4J_URI,
         user=NEO4J_USER, 
         password=NEO4J_PASSWORD
     )
     
     # Create indexes
-    processor.create_indexes()
+    await asyncio.to_thread(processor.create_indexes)
     
     try:
         # Store resume in Neo4j
-        candidate_id = await processor.store_resume_to_neo4j(
+        candidate_id, created = await processor.store_resume_to_neo4j(
             resume_text=details,
             years_of_experience=years_of_experience,
             resume_file_path=resume_file_path,
-            json_file_path=json_file_path
+            json_file_path=json_file_path,
+            upsert=upsert,
+            source_text_hash=source_text_hash,
+            parsed=parsed
         )
         print(f"Successfully processed candidate with ID: {candidate_id}")
+        return candidate_id, created
         
     except Exception as e:
         print(f"Error processing resume: {e}")
+        return None, False
     
     finally:
         processor.close()
 
+# Attach Resume Links (Async)
+async def attach_resume_links(candidate_id, resume_file_path, json_file_path):
+    processor = await asyncio.to_thread(
+        Neo4jResumeProcessor, uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD
+    )
+    try:
+        await asyncio.to_thread(processor.attach_resume_links, candidate_id, resume_file_path, json_file_path)
+    finally:
+        processor.close()
+
+
+# Delete Candidate (Async)
+async def delete_candidate(candidate_id):
+    processor = await asyncio.to_thread(
+        Neo4jResumeProcessor, uri=NEO4J_URI, user=NEO4J_USER, password=NEO4J_PASSWORD
+    )
+    try:
+        await asyncio.to_thread(processor.delete_candidate, candidate_id)
+    finally:
+        processor.close()
+
 # if __name__ == "__main__":
 #     import asyncio
 #     asyncio.run(store_resume_to_neo4j())
\ No newline at end of file
@@ -3,16 +3,39 @@
 REST APIs that handles Upload, Search and analysis of resumes.
 """
 import tempfile
-import os
 import asyncio
+from django.conf import settings
+from django.http import HttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
 from rest_framework.parsers import MultiPartParser
 from upload_and_get_resume.processes.extract_keys import extract_keys
-from upload_and_get_resume.processes.search_resume import search_resume
+from upload_and_get_resume.processes.search_resume import (
+    search_resume,
+    search_resume_batch,
+    timed_stage,
+)
+from upload_and_get_resume.processes.search_query import compile_search_query
+from upload_and_get_resume.processes.saved_search import (
+    save_search,
+    list_saved_searches,
+    get_saved_search_matches,
+)
 from upload_and_get_resume.processes.analyse_resume import analyse_resume
-from .serializer import SearchSerializer, AnalyseSerializer
+from upload_and_get_resume.utils.extract_text_link import ResumeSource
+from upload_and_get_resume.utils.prevalidation import ResumeRejected
+from upload_and_get_resume.utils.metrics import (
+    REGISTRY,
+    SEARCH_REQUESTS,
+    observe_search_trace,
+)
+from .serializer import (
+    SearchSerializer,
+    BatchSearchSerializer,
+    SavedSearchSerializer,
+    AnalyseSerializer,
+)
 
 
 # Upload PDF API view Class
@@ -31,14 +54,20 @@ class UploadPDFView(APIView):
                 {"error": "No file provided"}, status=status.HTTP_400_BAD_REQUEST
             )
 
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-            for chunk in pdf_file.chunks():
-                temp_file.write(chunk)
-            print(f"Saved file to temporary path: {temp_file.name}")
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        response = loop.run_until_complete(extract_keys(temp_file.name))
-        os.remove(temp_file.name)
+        # Extraction, hashing and the Dropbox upload share one in-memory buffer;
+        # only uploads above UPLOAD_SPILL_BYTES go to disk
+        resume = ResumeSource.from_upload(pdf_file)
+        try:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            response = loop.run_until_complete(extract_keys(resume))
+        except ResumeRejected as e:
+            return Response(
+                {"error": str(e), "reasons": e.report.reasons, "checks": e.report.stats},
+                status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            )
+        finally:
+            resume.close()
 
         return Response(response, status=status.HTTP_200_OK)
 
@@ -51,6 +80,9 @@ class SearchResumeView(APIView):
 
     # POST request
     def post(self, request, *args, **kwargs):
+        # Stage timings and row counts of this request, exported as metrics
+        self.trace = {}
+        self.rows_returned = 0
         try:
             data = request.data
             if not data:
@@ -61,15 +93,20 @@ class SearchResumeView(APIView):
             # print(f"Received data: {data}")
 
             # Serialise Data
-            serializer = SearchSerializer(data=data)
-            if not serializer.is_valid():
+            with timed_stage(self.trace, "serializer_parse"):
+                serializer = SearchSerializer(data=data)
+                is_valid = serializer.is_valid()
+            if not is_valid:
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
             # Get validated data
             validated_data = serializer.validated_data
             search_query = validated_data["search_query"]
-            
-            search_query = serializer.parse_search_query_improved(search_query)
+            explain = validated_data["explain"]
+            collapse_duplicates = validated_data["collapse_duplicates"]
+
+            with timed_stage(self.trace, "query_parsing"):
+                search_query = compile_search_query(search_query)
             from_experience = validated_data["from_experience"]
             to_experience = validated_data["to_experience"]
             similarity_threshold = validated_data["similarity_threshold"]
@@ -79,10 +116,101 @@ class SearchResumeView(APIView):
             # Searches Resumes based on the User Input.
             response = loop.run_until_complete(
                 search_resume(
-                    search_query, from_experience, to_experience, similarity_threshold
+                    search_query,
+                    from_experience,
+                    to_experience,
+                    similarity_threshold,
+                    explain=explain,
+                    trace=self.trace,
+                    collapse_duplicates=collapse_duplicates,
                 )
             )
+            self.rows_returned = len(response or [])
+
+            if explain:
+                response = {"results": response, "explain": self.trace}
+            return Response(response, status=status.HTTP_200_OK)
+
+        except Exception as e:
+            print(f"Error occurred: {e}")
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    # Finalize Response
+    def finalize_response(self, request, response, *args, **kwargs):
+        """Render the response inside a timed stage and record the search metrics"""
+        response = super().finalize_response(request, response, *args, **kwargs)
+        trace = getattr(self, "trace", None)
+        if trace is not None:
+            with timed_stage(trace, "serialization"):
+                response.render()
+            observe_search_trace(trace, self.rows_returned)
+        SEARCH_REQUESTS.inc(status=response.status_code)
+        return response
+
+
+# Metrics View Class
+class MetricsView(APIView):
+    """
+    Exposes search latency histograms and row counters in Prometheus text format. Only reachable from the addresses in METRICS_ALLOWED_IPS.
+    """
+
+    # GET request
+    def get(self, request, *args, **kwargs):
+        if request.META.get("REMOTE_ADDR") not in settings.METRICS_ALLOWED_IPS:
+            return HttpResponse(status=status.HTTP_403_FORBIDDEN)
+        return HttpResponse(
+            REGISTRY.render(), content_type="text/plain; version=0.0.4; charset=utf-8"
+        )
+
+
+# Batch Search Resume API View Class
+class BatchSearchResumeView(APIView):
+    """
+    Handles REST APIs Post request to search resumes for many requisitions at once and gets a ranked candidate list per query.
+    """
 
+    # POST request
+    def post(self, request, *args, **kwargs):
+        try:
+            data = request.data
+            if not data:
+                return Response(
+                    {"error": "No data provided"}, status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # Serialise Data
+            serializer = BatchSearchSerializer(data=data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+            # Get validated data
+            validated_data = serializer.validated_data
+            query_parser = SearchSerializer()
+            queries = [
+                {
+                    "search_params": query_parser.parse_search_query_improved(
+                        query["search_query"]
+                    ),
+                    "from_experience": query["from_experience"],
+                    "to_experience": query["to_experience"],
+                    "similarity_threshold": query["similarity_threshold"],
+                    "collapse_duplicates": query["collapse_duplicates"],
+                }
+                for query in validated_data["queries"]
+            ]
+
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            # Searches Resumes for every query with a single candidate scan.
+            results = loop.run_until_complete(
+                search_resume_batch(queries, top_k=validated_data["top_k"])
+            )
+            response = [
+                {"search_query": query["search_query"], "results": ranked}
+                for query, ranked in zip(validated_data["queries"], results)
+            ]
             return Response(response, status=status.HTTP_200_OK)
 
         except Exception as e:
@@ -92,6 +220,84 @@ class SearchResumeView(APIView):
             )
 
 
+# Saved Search API View Class
+class SavedSearchView(APIView):
+    """
+    Handles REST APIs to list standing searches (GET) and save a new one (POST). New uploads are matched against saved searches on ingest.
+    """
+
+    # GET request
+    def get(self, request, *args, **kwargs):
+        try:
+            return Response(list_saved_searches(), status=status.HTTP_200_OK)
+
+        except Exception as e:
+            print(f"Error occurred: {e}")
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+    # POST request
+    def post(self, request, *args, **kwargs):
+        try:
+            data = request.data
+            if not data:
+                return Response(
+                    {"error": "No data provided"}, status=status.HTTP_400_BAD_REQUEST
+                )
+
+            # Serialise Data
+            serializer = SavedSearchSerializer(data=data)
+            if not serializer.is_valid():
+                return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+            validated_data = serializer.validated_data
+            search_params = serializer.parse_search_query_improved(
+                validated_data["search_query"]
+            )
+
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            # Saves the search with its precomputed query embedding.
+            response = loop.run_until_complete(
+                save_search(
+                    validated_data["name"],
+                    validated_data["search_query"],
+                    search_params,
+                    validated_data["from_experience"],
+                    validated_data["to_experience"],
+                    validated_data["similarity_threshold"],
+                )
+            )
+            return Response(response, status=status.HTTP_201_CREATED)
+
+        except Exception as e:
+            print(f"Error occurred: {e}")
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
+# Saved Search Matches API View Class
+class SavedSearchMatchesView(APIView):
+    """
+    Handles REST APIs Get request to list the candidates matched by a saved search since it was created.
+    """
+
+    # GET request
+    def get(self, request, search_id, *args, **kwargs):
+        try:
+            return Response(
+                get_saved_search_matches(search_id), status=status.HTTP_200_OK
+            )
+
+        except Exception as e:
+            print(f"Error occurred: {e}")
+            return Response(
+                {"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
+
 # Analyse Resume API View
 class AnalyseResumeView(APIView):
     """